@@ -3,19 +3,118 @@ from tkinter import filedialog, messagebox, ttk
 import shutil
 import os
 import predict
-import pandas as pd
+import batch
+import export
+import multiprocessing
+from file_io import COLUMNAR_FORMATS, columnar_available
+from preview import PagedTable
 from tkinter.ttk import Style
+import queue
 import threading
 import webbrowser
+from concurrent.futures import ThreadPoolExecutor
 from logger import system_logger
 from pathlib import Path
 from config import Config
+from training import training_cache
+from dashboard_server import dashboard_server
+
+class TaskCancelled(Exception):
+    """La tarea se detuvo porque el usuario la canceló"""
+
+
+class Task:
+    """Tarea en segundo plano: permite informar progreso y consultar si se canceló"""
+
+    def __init__(self, runner, name):
+        self.runner = runner
+        self.name = name
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise TaskCancelled(self.name)
+
+    def progress(self, *args):
+        """Enviar progreso al hilo de la interfaz (se entrega a on_progress)"""
+        self.runner._post(self, 'progress', args)
+
+
+class TaskRunner:
+    """Ejecuta el trabajo lento fuera del hilo de Tk
+
+    Las funciones corren en un pool de hilos y reciben la Task como primer
+    argumento. Sus resultados, errores y avisos de progreso vuelven por una
+    cola que el hilo de la interfaz revisa con root.after, de modo que los
+    callbacks (y cualquier messagebox) se ejecutan siempre en el hilo de Tk.
+    """
+
+    POLL_MS = 50
+
+    def __init__(self, root, max_workers=2):
+        self.root = root
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gui-task')
+        self._events = queue.Queue()
+        self._callbacks = {}
+        self._poll()
+
+    def submit(self, name, func, *args, on_done=None, on_error=None, on_progress=None, on_cancel=None):
+        task = Task(self, name)
+        self._callbacks[task] = {'done': on_done, 'error': on_error, 'progress': on_progress, 'cancelled': on_cancel}
+
+        def run():
+            try:
+                self._post(task, 'done', (func(task, *args),))
+            except TaskCancelled:
+                self._post(task, 'cancelled', ())
+            except Exception as e:
+                system_logger.log_error(e, f"Error in background task: {name}")
+                self._post(task, 'error', (e,))
+
+        self._executor.submit(run)
+        return task
+
+    def _post(self, task, kind, args):
+        self._events.put((task, kind, args))
+
+    def _poll(self):
+        while True:
+            try:
+                task, kind, args = self._events.get_nowait()
+            except queue.Empty:
+                break
+            callbacks = self._callbacks.get(task, {})
+            if kind != 'progress':
+                self._callbacks.pop(task, None)
+            callback = callbacks.get(kind)
+            if callback:
+                callback(*args)
+        self._after_id = self.root.after(self.POLL_MS, self._poll)
+
+    def shutdown(self):
+        for task in list(self._callbacks):
+            task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
 
 class FileProcessorApp:
     def __init__(self, root):
         self.root = root
         self.config = Config()
         self.selected_files = []
+        self.tasks = TaskRunner(root)
+        self.current_task = None
+        self._preview_task = None
+        # Vista previa virtualizada: tabla paginada y primera fila visible
+        self.preview_table = None
+        self.preview_offset = 0
         
         # Cargar configuración
         self.root.title("Procesador de Archivos AMEF")
@@ -35,6 +134,7 @@ class FileProcessorApp:
         help_menu.add_command(label="About", command=self.show_about)
         help_menu.add_command(label="View Logs", command=self.show_logs)
         help_menu.add_command(label="View Dashboard", command=self.show_dashboard)
+        help_menu.add_command(label="Live Dashboard", command=self.show_live_dashboard)
         
         # Menú de exportación
         export_menu = tk.Menu(self.menubar, tearoff=0)
@@ -42,6 +142,10 @@ class FileProcessorApp:
         export_menu.add_command(label="CSV", command=lambda: self.export_selected('csv'))
         export_menu.add_command(label="Excel", command=lambda: self.export_selected('xlsx'))
         export_menu.add_command(label="JSON", command=lambda: self.export_selected('json'))
+        export_menu.add_command(label="JSON Lines", command=lambda: self.export_selected('jsonl'))
+        if columnar_available():
+            export_menu.add_command(label="Parquet", command=lambda: self.export_selected('parquet'))
+            export_menu.add_command(label="Feather (Arrow IPC)", command=lambda: self.export_selected('feather'))
         
         # Crear frame principal
         self.main_frame = ttk.Frame(root, padding="20")
@@ -66,6 +170,10 @@ class FileProcessorApp:
         process_button = ttk.Button(left_button_frame, text="Procesar Archivos", command=self.process_files_with_progress)
         process_button.pack(side='left')
         
+        # Botón para cancelar la tarea larga en curso
+        self.cancel_button = ttk.Button(left_button_frame, text="Cancelar", command=self.cancel_current_task, state='disabled')
+        self.cancel_button.pack(side='left', padx=(10, 0))
+        
         # Botón de Dashboard
         dashboard_button = ttk.Button(left_button_frame, text="Dashboard", command=self.show_dashboard)
         dashboard_button.pack(side='left', padx=10)
@@ -94,13 +202,18 @@ class FileProcessorApp:
         self.preview_tree = ttk.Treeview(preview_frame, show='headings')
         self.preview_tree.pack(side='left', fill='both', expand=True)
         
-        # Scrollbars para el Treeview
-        vsb = ttk.Scrollbar(preview_frame, orient="vertical", command=self.preview_tree.yview)
-        vsb.pack(side='right', fill='y')
+        # Scrollbars para el Treeview. La vertical recorre el archivo completo:
+        # el Treeview solo contiene las filas visibles y se rellena al desplazarse
+        self.preview_vsb = ttk.Scrollbar(preview_frame, orient="vertical", command=self.on_preview_scroll)
+        self.preview_vsb.pack(side='right', fill='y')
         hsb = ttk.Scrollbar(preview_frame, orient="horizontal", command=self.preview_tree.xview)
         hsb.pack(side='bottom', fill='x')
         
-        self.preview_tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.preview_tree.configure(xscrollcommand=hsb.set)
+        self.preview_tree.bind('<Configure>', lambda event: self.render_preview_window())
+        self.preview_tree.bind('<MouseWheel>', lambda event: self.scroll_preview(-3 if event.delta > 0 else 3))
+        self.preview_tree.bind('<Button-4>', lambda event: self.scroll_preview(-3))
+        self.preview_tree.bind('<Button-5>', lambda event: self.scroll_preview(3))
         
         # Frame inferior para las listas
         lists_frame = ttk.Frame(content_frame)
@@ -152,12 +265,23 @@ class FileProcessorApp:
 
     def show_dashboard(self):
         """Abrir el dashboard en el navegador predeterminado"""
+        if dashboard_server.running:
+            webbrowser.open(dashboard_server.url)
+            return
         dashboard_path = Path('logs/dashboard.html')
         if dashboard_path.exists():
             webbrowser.open(dashboard_path.absolute().as_uri())
         else:
             messagebox.showinfo("Info", "El dashboard aún no está disponible. Procese algunos archivos primero.")
 
+    def show_live_dashboard(self):
+        """Iniciar (si hace falta) el servidor local del dashboard y abrirlo"""
+        try:
+            webbrowser.open(dashboard_server.start())
+        except OSError as e:
+            system_logger.log_error(e, "Error starting dashboard server")
+            messagebox.showerror("Error", f"No se pudo iniciar el dashboard en vivo: {str(e)}")
+
     def show_logs(self):
         """Mostrar ventana con logs del sistema"""
         logs_window = tk.Toplevel(self.root)
@@ -280,7 +404,7 @@ class FileProcessorApp:
         # Actualizar lista de salida
         os.makedirs('salida', exist_ok=True)
         for file in sorted(os.listdir('salida')):
-            if file.endswith(('.csv', '.xlsx')):
+            if file.endswith(('.csv', '.xlsx') + COLUMNAR_FORMATS):
                 self.salida_listbox.insert(tk.END, file)
 
     def select_files(self):
@@ -297,17 +421,25 @@ class FileProcessorApp:
             self.selected_files = list(file_paths)
             self.file_label.config(text=f"Archivos seleccionados: {len(file_paths)}")
             
-            # Copiar archivos a la carpeta entrada
-            os.makedirs('entrada', exist_ok=True)
-            for file_path in file_paths:
-                shutil.copy(file_path, os.path.join('entrada', os.path.basename(file_path)))
-            
-            messagebox.showinfo("Éxito", f"{len(file_paths)} archivos copiados exitosamente a la carpeta entrada/")
-            self.update_file_lists()
+            def copy_files(task, file_paths):
+                # Copiar archivos a la carpeta entrada
+                os.makedirs('entrada', exist_ok=True)
+                for done, file_path in enumerate(file_paths, start=1):
+                    task.check_cancelled()
+                    shutil.copy(file_path, os.path.join('entrada', os.path.basename(file_path)))
+                    task.progress(done / len(file_paths) * 100)
+                return file_paths
             
-            # Mostrar preview del primer archivo
-            if file_paths:
+            def on_done(file_paths):
+                messagebox.showinfo("Éxito", f"{len(file_paths)} archivos copiados exitosamente a la carpeta entrada/")
+                # Mostrar preview del primer archivo
                 self.show_preview(file_paths[0])
+            
+            self.start_long_task(
+                "copy files", copy_files, list(file_paths),
+                on_done=on_done,
+                error_message="Error al copiar archivos"
+            )
 
     def download_file(self):
         # Obtener el archivo seleccionado de la lista de salida
@@ -319,32 +451,31 @@ class FileProcessorApp:
         selected_file = self.salida_listbox.get(selection[0])
         source_path = os.path.join('salida', selected_file)
         
-        try:
-            # Determinar la extensión del archivo
-            file_ext = os.path.splitext(selected_file)[1].lower()
-            
-            # Configurar los tipos de archivo según la extensión
-            if file_ext == '.csv':
-                filetypes = [("Archivos CSV", "*.csv")]
-            elif file_ext == '.xlsx':
-                filetypes = [("Archivos Excel", "*.xlsx")]
-            else:
-                filetypes = [("Todos los archivos", "*.*")]
-            
-            # Abrir diálogo para seleccionar dónde guardar el archivo
-            save_path = filedialog.asksaveasfilename(
-                defaultextension=file_ext,
-                initialfile=selected_file,
-                filetypes=filetypes
+        # Determinar la extensión del archivo
+        file_ext = os.path.splitext(selected_file)[1].lower()
+        
+        # Configurar los tipos de archivo según la extensión
+        if file_ext == '.csv':
+            filetypes = [("Archivos CSV", "*.csv")]
+        elif file_ext == '.xlsx':
+            filetypes = [("Archivos Excel", "*.xlsx")]
+        else:
+            filetypes = [("Todos los archivos", "*.*")]
+        
+        # Abrir diálogo para seleccionar dónde guardar el archivo
+        save_path = filedialog.asksaveasfilename(
+            defaultextension=file_ext,
+            initialfile=selected_file,
+            filetypes=filetypes
+        )
+        
+        if save_path:
+            self.tasks.submit(
+                f"download {source_path}",
+                lambda task: shutil.copy2(source_path, save_path),
+                on_done=lambda _: messagebox.showinfo("Éxito", f"Archivo descargado exitosamente como:\n{save_path}"),
+                on_error=lambda e: messagebox.showerror("Error", f"Error al descargar archivo: {str(e)}")
             )
-            
-            if save_path:
-                shutil.copy2(source_path, save_path)
-                messagebox.showinfo("Éxito", f"Archivo descargado exitosamente como:\n{save_path}")
-                
-        except Exception as e:
-            system_logger.log_error(e, f"Error downloading file: {source_path}")
-            messagebox.showerror("Error", f"Error al descargar archivo: {str(e)}")
 
     def export_selected(self, format_type):
         """Exportar archivos seleccionados en el formato especificado"""
@@ -357,66 +488,153 @@ class FileProcessorApp:
         if not export_dir:
             return
         
-        try:
-            for index in selection:
-                filename = self.salida_listbox.get(index)
-                source_path = os.path.join('salida', filename)
-                
-                # Leer el archivo
-                if filename.endswith('.csv'):
-                    df = pd.read_csv(source_path)
-                else:
-                    df = pd.read_excel(source_path)
-                
-                # Exportar en el formato seleccionado
-                base_name = os.path.splitext(filename)[0]
-                if format_type == 'csv':
-                    export_path = os.path.join(export_dir, f"{base_name}.csv")
-                    df.to_csv(export_path, index=False)
-                elif format_type == 'xlsx':
-                    export_path = os.path.join(export_dir, f"{base_name}.xlsx")
-                    df.to_excel(export_path, index=False)
-                elif format_type == 'json':
-                    export_path = os.path.join(export_dir, f"{base_name}.json")
-                    df.to_json(export_path, orient='records', indent=2)
+        sources = [os.path.join('salida', self.salida_listbox.get(index)) for index in selection]
+        
+        def run_export(task, sources):
+            # Varios archivos a la vez, por bloques; si la salida tiene copia
+            # Parquet vigente se lee esa en lugar del CSV/Excel
+            def on_file_done(done, total, result):
+                task.progress((done / total) * 100)
             
-            messagebox.showinfo("Éxito", f"Archivos exportados exitosamente a {export_dir}")
-        except Exception as e:
-            system_logger.log_error(e, "Error exporting files")
-            messagebox.showerror("Error", f"Error al exportar archivos: {str(e)}")
+            return export.export_files(sources, export_dir, format_type, progress_callback=on_file_done, cancel_event=task.cancel_event)
+        
+        def on_done(results):
+            failed = [result for result in results if result['status'] == 'error']
+            if failed:
+                detalle = "\n".join(f"{os.path.basename(result['source'])}: {result['error']}" for result in failed)
+                messagebox.showerror("Error", f"Error al exportar archivos:\n\n{detalle}")
+            else:
+                messagebox.showinfo("Éxito", f"Archivos exportados exitosamente a {export_dir}")
+        
+        self.start_long_task("export files", run_export, sources, on_done=on_done, error_message="Error al exportar archivos")
 
     def on_closing(self):
         """Guardar configuración antes de cerrar"""
         self.config.set('window_size', self.root.geometry())
+        self.tasks.shutdown()
         self.root.destroy()
 
+    def start_long_task(self, name, func, *args, on_done=None, error_message="Error"):
+        """Ejecutar una tarea larga con barra de progreso y botón de cancelar
+        
+        Solo se ejecuta una tarea larga a la vez; los callbacks corren en el
+        hilo de la interfaz.
+        """
+        if self.current_task is not None:
+            messagebox.showwarning("Advertencia", "Ya hay una tarea en curso")
+            return None
+        
+        def finish():
+            self.current_task = None
+            self.cancel_button.config(state='disabled')
+            self.progress_var.set(0)
+            self.update_file_lists()
+        
+        def done(result):
+            finish()
+            if on_done:
+                on_done(result)
+        
+        def error(e):
+            finish()
+            messagebox.showerror("Error", f"{error_message}: {str(e)}")
+        
+        def cancelled():
+            finish()
+            messagebox.showinfo("Cancelado", "La tarea fue cancelada")
+        
+        self.current_task = self.tasks.submit(
+            name, func, *args,
+            on_done=done, on_error=error, on_cancel=cancelled,
+            on_progress=self.progress_var.set
+        )
+        self.cancel_button.config(state='normal')
+        return self.current_task
+
+    def cancel_current_task(self):
+        if self.current_task is not None:
+            self.current_task.cancel()
+            self.cancel_button.config(state='disabled')
+
     def show_preview(self, filepath):
-        try:
-            # Limpiar vista previa actual
-            for item in self.preview_tree.get_children():
-                self.preview_tree.delete(item)
-            
-            # Leer archivo según su extensión
-            if filepath.endswith('.csv'):
-                df = pd.read_csv(filepath, nrows=100)  # Limitar a 100 filas para rendimiento
-            elif filepath.endswith('.xlsx'):
-                df = pd.read_excel(filepath, nrows=100)
-            else:
+        if not filepath.endswith(('.csv', '.xlsx') + COLUMNAR_FORMATS):
+            return
+        
+        # Solo se muestra la vista previa más reciente: la anterior, si sigue
+        # indexándose, se cancela
+        if self._preview_task is not None:
+            self._preview_task.cancel()
+        
+        def open_table(task):
+            # Archivos pequeños: la lectura queda en caché para la validación y
+            # el procesamiento posteriores. Grandes: solo se indexan
+            table = PagedTable(filepath).open(cancelled=lambda: task.cancelled)
+            task.check_cancelled()
+            return table
+        
+        def on_done(table):
+            if task is not self._preview_task:
                 return
-            
             # Configurar columnas
-            self.preview_tree['columns'] = list(df.columns)
-            for col in df.columns:
-                self.preview_tree.heading(col, text=col)
-                self.preview_tree.column(col, width=100)
-            
-            # Insertar datos
-            for idx, row in df.iterrows():
-                self.preview_tree.insert('', 'end', values=list(row))
-                
-        except Exception as e:
-            system_logger.log_error(e, f"Error showing preview for file: {filepath}")
-            messagebox.showerror("Error", f"Error al mostrar vista previa: {str(e)}")
+            self.preview_tree.delete(*self.preview_tree.get_children())
+            self.preview_tree['columns'] = list(range(len(table.columns)))
+            for index, col in enumerate(table.columns):
+                self.preview_tree.heading(index, text=col)
+                self.preview_tree.column(index, width=100)
+            self.preview_table = table
+            self.preview_offset = 0
+            self.render_preview_window()
+        
+        def on_error(e):
+            if task is self._preview_task:
+                messagebox.showerror("Error", f"Error al mostrar vista previa: {str(e)}")
+        
+        task = self.tasks.submit(f"preview {filepath}", open_table, on_done=on_done, on_error=on_error)
+        self._preview_task = task
+
+    def _visible_preview_rows(self):
+        row_height = self.style.lookup('Treeview', 'rowheight') or 20
+        header_height = 25
+        return max((self.preview_tree.winfo_height() - header_height) // int(row_height), 1)
+
+    def render_preview_window(self):
+        """Mostrar en el Treeview solo las filas visibles a partir de preview_offset"""
+        table = self.preview_table
+        if table is None:
+            return
+        visible = self._visible_preview_rows()
+        total = table.total_rows
+        self.preview_offset = max(min(self.preview_offset, total - visible), 0)
+        rows = table.rows(self.preview_offset, visible)
+        
+        # Reutilizar los ítems existentes en lugar de borrarlos y crearlos
+        items = self.preview_tree.get_children()
+        for item, values in zip(items, rows):
+            self.preview_tree.item(item, values=values)
+        if len(items) > len(rows):
+            self.preview_tree.delete(*items[len(rows):])
+        for values in rows[len(items):]:
+            self.preview_tree.insert('', 'end', values=values)
+        
+        if total:
+            self.preview_vsb.set(self.preview_offset / total, (self.preview_offset + len(rows)) / total)
+        else:
+            self.preview_vsb.set(0, 1)
+
+    def scroll_preview(self, rows):
+        self.preview_offset += rows
+        self.render_preview_window()
+
+    def on_preview_scroll(self, action, amount, unit=None):
+        """Comando de la barra vertical: 'moveto' fracción o 'scroll' n unidades/páginas"""
+        if self.preview_table is None:
+            return
+        if action == 'moveto':
+            self.preview_offset = int(float(amount) * self.preview_table.total_rows)
+            self.render_preview_window()
+        elif action == 'scroll':
+            step = self._visible_preview_rows() if unit == 'pages' else 1
+            self.scroll_preview(int(amount) * step)
 
     def on_file_select(self, event):
         widget = event.widget
@@ -433,44 +651,53 @@ class FileProcessorApp:
 
     def process_files_with_progress(self):
         """Procesar múltiples archivos con barra de progreso"""
-        def update_progress(value):
-            self.progress_var.set(value)
-            self.root.update_idletasks()
-
-        def run_process():
-            try:
-                total_files = len(os.listdir('entrada'))
-                if total_files == 0:
-                    messagebox.showwarning("Advertencia", "No hay archivos para procesar")
-                    return
-                
-                for i, filename in enumerate(os.listdir('entrada')):
-                    if filename.endswith(('.csv', '.xlsx')):
-                        filepath = os.path.join('entrada', filename)
-                        progress = (i / total_files) * 100
-                        update_progress(progress)
-                        
-                        try:
-                            # Procesar archivo
-                            predict.main()
-                        except ValueError as e:
-                            messagebox.showerror("Error de Validación", str(e))
-                            return
-                
-                update_progress(100)
+        input_files = batch.list_input_files('entrada')
+        total_files = len(input_files)
+        if total_files == 0:
+            messagebox.showwarning("Advertencia", "No hay archivos para procesar")
+            return
+        
+        def run_process(task, input_files):
+            def on_file_done(done, total, result):
+                task.progress((done / total) * 100)
+            
+            return batch.process_batch(input_files, progress_callback=on_file_done, cancel_event=task.cancel_event)
+        
+        def on_done(results):
+            processed = [result for result in results if result['status'] == 'ok']
+            failed = [result for result in results if result['status'] == 'error']
+            cancelled = len(results) - len(processed) - len(failed)
+            missing = set().union(*(result['missing_elements'] for result in processed))
+            if missing:
+                sugerencias = {}
+                for result in processed:
+                    sugerencias.update(result['suggestions'])
+                messagebox.showwarning("Elementos No Encontrados", predict.missing_elements_message(missing, sugerencias))
+            if failed:
+                detalle = "\n".join(f"{result['file']}: {result['error']}" for result in failed)
+                messagebox.showerror(
+                    "Error de Validación",
+                    f"{len(processed)} de {total_files} archivos procesados.\n\n{detalle}"
+                )
+            elif cancelled:
+                messagebox.showinfo("Cancelado", f"{len(processed)} de {total_files} archivos procesados antes de cancelar")
+            else:
                 messagebox.showinfo("Éxito", f"{total_files} archivos procesados exitosamente")
-                self.update_file_lists()
-            except Exception as e:
-                system_logger.log_error(e, "Error processing files")
-                messagebox.showerror("Error", f"Error al procesar archivos: {str(e)}")
-            finally:
-                update_progress(0)
-
-        thread = threading.Thread(target=run_process)
-        thread.start()
+        
+        self.start_long_task(
+            "process files", run_process, input_files,
+            on_done=on_done,
+            error_message="Error al procesar archivos"
+        )
 
 if __name__ == "__main__":
+    # Necesario para el pool de procesos en el ejecutable de PyInstaller
+    multiprocessing.freeze_support()
     root = tk.Tk()
+    # Aplicar los cambios del archivo de entrenamiento sin reiniciar la aplicación
+    training_cache.start_watcher()
+    if Config().get('dashboard_server'):
+        dashboard_server.start()
     app = FileProcessorApp(root)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
     root.mainloop()
@@ -0,0 +1,160 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import predict
+from config import Config
+from logger import system_logger
+from pipeline import input_cache
+from tracing import flatten, format_trace
+from training import get_training_index
+
+
+def _init_worker():
+    """Preparar un proceso de trabajo: cargar el entrenamiento una sola vez"""
+    system_logger.metrics_enabled = False
+    input_cache.enabled = False
+    get_training_index()
+
+
+def _run_file(input_file, df_input=None, options=None):
+    """Procesar un archivo y devolver su resultado sin propagar la excepción"""
+    start_time = time.time()
+    try:
+        result = predict.process_file(input_file, df_input=df_input, **(options or {}))
+        result['status'] = 'ok'
+    except Exception as e:
+        result = {
+            'file': os.path.basename(input_file),
+            'status': 'error',
+            'error': f"{type(e).__name__}: {e}"
+        }
+    result['input_file'] = input_file
+    result['seconds'] = time.time() - start_time
+    return result
+
+
+def _cancelled_result(input_file):
+    return {
+        'file': os.path.basename(input_file),
+        'status': 'cancelled',
+        'error': "Cancelado",
+        'input_file': input_file,
+        'seconds': 0.0
+    }
+
+
+class BatchEngine:
+    """Motor de procesamiento por lotes sobre un pool de procesos
+
+    El pool se crea la primera vez que se necesita y se reutiliza entre lotes,
+    de modo que cada proceso carga el índice de entrenamiento una sola vez.
+    output_dir, output_format y backup se pasan a predict.process_file.
+    """
+
+    def __init__(self, max_workers=None, output_dir='salida', output_format=None, backup=True):
+        self.max_workers = max_workers or Config().get('max_workers') or os.cpu_count() or 1
+        self.options = {'output_dir': output_dir, 'output_format': output_format, 'backup': backup}
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+        return self._executor
+
+    def process(self, input_files, progress_callback=None, cancel_event=None):
+        """Procesar una lista explícita de archivos
+
+        Devuelve un resultado por archivo, en el mismo orden de entrada, con su
+        estado ('ok', 'error' o 'cancelled') y su tiempo. progress_callback(completados,
+        total, resultado) se llama en este hilo a medida que termina cada archivo.
+        Si cancel_event (threading.Event) se activa, los archivos que aún no
+        empezaron se marcan como cancelados y quedan en la carpeta de entrada.
+        """
+        input_files = list(input_files)
+        total = len(input_files)
+        results = [None] * total
+        if not input_files:
+            return results
+
+        batch_start = time.time()
+        workers = min(total, self.max_workers)
+        system_logger.progress.start_batch(total, workers)
+        # Los archivos ya leídos (por ejemplo, en la vista previa) no se vuelven a leer
+        frames = [input_cache.peek(path) for path in input_files]
+        futures = {}
+        if self.max_workers == 1 or total == 1:
+            # Sin pool: evita el costo de arrancar procesos para un solo archivo
+            def run_inline():
+                for i, path in enumerate(input_files):
+                    if cancel_event is not None and cancel_event.is_set():
+                        yield i, _cancelled_result(path)
+                    else:
+                        yield i, _run_file(path, frames[i], self.options)
+            completed = run_inline()
+        else:
+            executor = self._get_executor()
+            futures = {executor.submit(_run_file, path, frames[i], self.options): i for i, path in enumerate(input_files)}
+            completed = (
+                (futures[future], _cancelled_result(input_files[futures[future]]) if future.cancelled() else future.result())
+                for future in as_completed(futures)
+            )
+
+        for done, (i, result) in enumerate(completed, start=1):
+            results[i] = result
+            input_cache.evict(input_files[i])
+            self._record(result)
+            system_logger.progress.file_done(result)
+            if progress_callback:
+                progress_callback(done, total, result)
+            if cancel_event is not None and cancel_event.is_set():
+                for future in futures:
+                    future.cancel()
+
+        failed = sum(1 for result in results if result['status'] == 'error')
+        system_logger.logger.info(
+            f"Batch processed {total} files ({failed} failed) in {time.time() - batch_start:.2f} seconds "
+            f"with {self.max_workers} workers"
+        )
+        dashboard_path = system_logger.generate_html_dashboard()
+        system_logger.logger.info(f"Dashboard actualizado en: {dashboard_path}")
+        return results
+
+    def _record(self, result):
+        """Registrar en este proceso las métricas de un archivo terminado"""
+        if result['status'] == 'cancelled':
+            return
+        if result['status'] != 'ok':
+            system_logger.log_error(RuntimeError(result['error']), f"Error processing file: {result['input_file']}")
+            return
+        if result['missing_elements']:
+            system_logger.log_missing_elements(result['missing_elements'], source=result['file'])
+        system_logger.log_file_processed(
+            result['file'], result['input_rows'], result['output_rows'], result['resources'], flatten(result['trace'])
+        )
+        system_logger.logger.info(
+            f"File {result['file']} processed in {result['seconds']:.2f} seconds\n{format_trace(result['trace'])}"
+        )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def list_input_files(folder='entrada'):
+    """Listar los archivos CSV/XLSX pendientes en una carpeta"""
+    os.makedirs(folder, exist_ok=True)
+    return [
+        os.path.join(folder, filename)
+        for filename in sorted(os.listdir(folder))
+        if filename.endswith(('.csv', '.xlsx'))
+    ]
+
+
+def process_batch(input_files, max_workers=None, progress_callback=None, cancel_event=None, **options):
+    """Procesar una lista de archivos con un pool de procesos de un solo uso"""
+    engine = BatchEngine(max_workers, **options)
+    try:
+        return engine.process(input_files, progress_callback, cancel_event)
+    finally:
+        engine.shutdown()
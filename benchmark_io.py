@@ -0,0 +1,83 @@
+"""Comparar los motores de lectura y escritura de Excel disponibles
+
+Uso:
+    python benchmark_io.py                    # archivos de muestra en backup/
+    python benchmark_io.py archivo.xlsx --repeat 5 --scale 1000
+
+--scale replica las filas de cada muestra para medir con archivos más grandes.
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+import pandas as pd
+import file_io
+
+
+def _best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _scaled_sample(path, scale, temp_dir):
+    """Crear una copia del archivo con sus filas replicadas scale veces"""
+    if scale <= 1:
+        return path
+    df = file_io.read_table(path)
+    df = pd.concat([df] * scale, ignore_index=True)
+    scaled_path = os.path.join(temp_dir, f"scaled_{os.path.basename(path)}")
+    file_io.write_table(df, scaled_path, engine=file_io.available_writers()[0])
+    return scaled_path
+
+
+def benchmark_file(path, repeat, temp_dir):
+    """Medir cada motor disponible sobre un archivo; devuelve filas de resultados"""
+    results = []
+    df = file_io.read_table(path)
+
+    for engine in file_io.available_readers():
+        seconds = _best_time(lambda: file_io.read_table(path, engine=engine), repeat)
+        results.append(('lectura', engine, seconds))
+    chunk_rows = max(len(df) // 10, 1)
+    seconds = _best_time(lambda: sum(len(chunk) for chunk in file_io.iter_table_chunks(path, chunk_rows)), repeat)
+    results.append(('lectura', 'openpyxl (por bloques)', seconds))
+
+    for engine in file_io.available_writers():
+        output_path = os.path.join(temp_dir, f"{engine}.xlsx")
+        seconds = _best_time(lambda: file_io.write_table(df, output_path, engine=engine), repeat)
+        results.append(('escritura', engine, seconds))
+    return len(df), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparar motores de E/S de Excel")
+    parser.add_argument('files', nargs='*', help="Archivos XLSX (predeterminado: backup/*.xlsx)")
+    parser.add_argument('--repeat', type=int, default=3, help="Repeticiones por medición; se toma la mejor")
+    parser.add_argument('--scale', type=int, default=1, help="Factor de replicación de filas")
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob('backup/*.xlsx'))
+    if not files:
+        parser.error("No se encontraron archivos XLSX para medir")
+
+    print(f"Lectores disponibles: {', '.join(file_io.available_readers())}")
+    print(f"Escritores disponibles: {', '.join(file_io.available_writers())}")
+    print(f"Seleccionados: lectura={file_io.get_reader_engine()} escritura={file_io.get_writer_engine()}")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for path in files:
+            sample = _scaled_sample(path, args.scale, temp_dir)
+            rows, results = benchmark_file(sample, args.repeat, temp_dir)
+            print(f"\n{path} ({rows} filas)")
+            for operation, engine, seconds in sorted(results, key=lambda r: (r[0], r[2])):
+                print(f"  {operation:<10} {engine:<24} {seconds * 1000:10.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Procesar archivos desde la línea de comandos, sin interfaz gráfica
+
+Uso:
+    python cli.py                                  # todos los CSV/XLSX de entrada/
+    python cli.py "datos/*.xlsx" -o resultados -f csv --workers 4
+    python cli.py archivo.csv --keep-input --json
+    python cli.py entrada --watch                  # servicio: procesa cada archivo que llega
+
+Códigos de salida:
+    0  todos los archivos se procesaron
+    1  al menos un archivo falló
+    2  argumentos inválidos o ningún archivo que procesar
+    3  hubo elementos sin entrenamiento y se pidió --fail-on-missing
+"""
+import argparse
+import glob
+import json
+import os
+import signal
+import sys
+import time
+import batch
+from file_io import available_output_formats
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_MISSING = 3
+
+INPUT_EXTENSIONS = ('.csv', '.xlsx')
+
+
+def expand_inputs(patterns):
+    """Resolver rutas, carpetas y patrones glob a una lista de archivos sin repetidos
+
+    Devuelve (archivos, patrones_sin_coincidencias).
+    """
+    files = []
+    unmatched = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = batch.list_input_files(pattern)
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True))
+        matches = [path for path in matches if path.endswith(INPUT_EXTENSIONS) and os.path.isfile(path)]
+        if not matches:
+            unmatched.append(pattern)
+        files.extend(matches)
+    unique = list(dict.fromkeys(os.path.normpath(path) for path in files))
+    return unique, unmatched
+
+
+def build_summary(results, seconds):
+    """Resumen JSON del lote: un registro por archivo y totales"""
+    files = []
+    missing = set()
+    for result in results:
+        entry = {
+            'input_file': result['input_file'],
+            'status': result['status'],
+            'seconds': round(result['seconds'], 3)
+        }
+        if result['status'] == 'ok':
+            entry.update({
+                'output_file': result['output_file'],
+                'input_rows': result['input_rows'],
+                'output_rows': result['output_rows'],
+                'missing_elements': sorted(map(str, result['missing_elements'])),
+                'suggestions': {str(elemento): matches for elemento, matches in result['suggestions'].items()}
+            })
+            missing |= set(entry['missing_elements'])
+        else:
+            entry['error'] = result['error']
+        files.append(entry)
+    failed = sum(1 for entry in files if entry['status'] != 'ok')
+    return {
+        'total': len(files),
+        'ok': len(files) - failed,
+        'failed': failed,
+        'seconds': round(seconds, 3),
+        'missing_elements': sorted(missing),
+        'files': files
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Procesar archivos CSV/XLSX con los datos de entrenamiento, sin interfaz gráfica"
+    )
+    parser.add_argument('inputs', nargs='*', default=['entrada'],
+                        help="Archivos, carpetas o patrones glob (predeterminado: entrada/)")
+    parser.add_argument('-o', '--output-dir', default='salida', help="Carpeta de salida (predeterminado: salida/)")
+    parser.add_argument('-f', '--format', choices=available_output_formats(),
+                        help="Formato de salida (predeterminado: el del archivo de entrada)")
+    parser.add_argument('-w', '--workers', type=int, help="Procesos de trabajo (predeterminado: max_workers o núcleos)")
+    parser.add_argument('--keep-input', action='store_true', help="No mover los archivos de entrada a backup/")
+    parser.add_argument('--json', action='store_true', help="Escribir el resumen JSON en la salida estándar")
+    parser.add_argument('--summary', metavar='RUTA', help="Guardar el resumen JSON en un archivo")
+    parser.add_argument('--fail-on-missing', action='store_true',
+                        help="Terminar con código 3 si hay elementos sin entrenamiento")
+    parser.add_argument('--watch', action='store_true',
+                        help="Quedarse vigilando la carpeta de entrada y procesar cada archivo nuevo")
+    parser.add_argument('--debounce', type=float,
+                        help="Segundos sin cambios antes de procesar un archivo vigilado (predeterminado: watch_debounce_seconds)")
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers debe ser al menos 1")
+    if args.watch and (len(args.inputs) != 1 or not os.path.isdir(args.inputs[0])):
+        parser.error("--watch requiere una sola carpeta de entrada")
+    return args
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def watch(args):
+    """Modo servicio: vigilar la carpeta hasta Ctrl+C o SIGTERM"""
+    from watcher import FolderWatcher
+
+    engine = batch.BatchEngine(
+        args.workers,
+        output_dir=args.output_dir,
+        output_format=args.format,
+        backup=not args.keep_input
+    )
+    service = FolderWatcher(args.inputs[0], debounce=args.debounce, engine=engine)
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    print(f"Vigilando {args.inputs[0]} (Ctrl+C para terminar)", file=sys.stderr)
+    service.run_forever()
+    print(f"{service.processed} archivos procesados", file=sys.stderr)
+    return EXIT_OK
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.watch:
+        return watch(args)
+    input_files, unmatched = expand_inputs(args.inputs)
+    for pattern in unmatched:
+        print(f"Sin archivos CSV/XLSX para: {pattern}", file=sys.stderr)
+    if not input_files:
+        print("No hay archivos para procesar", file=sys.stderr)
+        return EXIT_USAGE
+
+    def on_file_done(done, total, result):
+        if args.json:
+            return
+        estado = 'ok' if result['status'] == 'ok' else f"error: {result['error']}"
+        print(f"[{done}/{total}] {result['input_file']} ({result['seconds']:.2f}s) {estado}", file=sys.stderr)
+
+    start_time = time.time()
+    results = batch.process_batch(
+        input_files,
+        max_workers=args.workers,
+        progress_callback=on_file_done,
+        output_dir=args.output_dir,
+        output_format=args.format,
+        backup=not args.keep_input
+    )
+    summary = build_summary(results, time.time() - start_time)
+
+    if summary['failed']:
+        exit_code = EXIT_FAILED
+    elif summary['missing_elements'] and args.fail_on_missing:
+        exit_code = EXIT_MISSING
+    else:
+        exit_code = EXIT_OK
+    summary['exit_code'] = exit_code
+
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write('\n')
+    else:
+        if summary['missing_elements']:
+            print(f"Elementos sin entrenamiento: {', '.join(summary['missing_elements'])}", file=sys.stderr)
+        print(f"{summary['ok']} de {summary['total']} archivos procesados en {summary['seconds']:.2f}s", file=sys.stderr)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
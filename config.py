@@ -18,7 +18,23 @@ class Config:
             'window_size': '1000x700',
             'last_directory': '',
             'auto_backup': True,
-            'max_recent_files': 5
+            'max_recent_files': 5,
+            'stream_threshold_mb': 50,
+            'stream_chunk_rows': 50000,
+            'max_workers': None,
+            'excel_reader': 'auto',
+            'excel_writer': 'auto',
+            'dashboard_max_missing': 200,
+            'dashboard_server': False,
+            'dashboard_port': 8765,
+            'watch_debounce_seconds': 2.0,
+            'columnar_sidecar': True,
+            'elemento_matching': 'normalized',
+            'elemento_match_threshold': 0.8,
+            'training_store': True,
+            'resource_sample_interval': 0.05,
+            'profile_runs': False,
+            'profile_keep': 20
         }
         
         if os.path.exists(self._config_file):
@@ -0,0 +1,140 @@
+import html
+import os
+import threading
+from string import Template
+
+# Plantillas compiladas una sola vez al importar el módulo
+PAGE_TEMPLATE = Template("""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Dashboard de Procesamiento</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; }
+        .metric { background: #f5f5f5; padding: 15px; margin: 10px 0; border-radius: 5px; }
+        .metric h3 { margin: 0 0 10px 0; }
+        .missing-elements { margin-top: 20px; }
+        .missing-element { background: #fff3f3; padding: 10px; margin: 5px 0; border-left: 3px solid #ff4444; }
+        .timestamp { color: #666; font-size: 0.9em; }
+        .note { color: #666; font-style: italic; }
+    </style>
+</head>
+<body>
+    <h1>Dashboard de Procesamiento</h1>
+
+    <div class="metric">
+        <h3>Métricas Generales</h3>
+        <p>Total de Predicciones: $total_predictions</p>
+        <p>Archivos Procesados: $total_files</p>
+        <p>Predicciones Procesadas: $lines_processed</p>
+        <p>Tiempo Promedio de Procesamiento: ${average_processing_time}s</p>
+        <p>Tiempo por Archivo p50 / p95 / p99: ${p50}s / ${p95}s / ${p99}s</p>
+        <p>Última Ejecución: $last_execution</p>
+        <p>Uso de Memoria: $memory_usage MB (máximo reciente: $peak_memory_usage MB)</p>
+        <p>CPU por Archivo: ${cpu_seconds_per_file}s (promedio)</p>
+    </div>
+
+    <div class="metric">
+        <h3>Tiempo por Etapa</h3>
+$stage_items
+    </div>
+
+    <div class="metric missing-elements">
+        <h3>Elementos Faltantes en Entrenamiento ($missing_total)</h3>
+$missing_note$missing_items
+    </div>
+</body>
+</html>
+""")
+
+MISSING_ITEM_TEMPLATE = Template("""        <div class="missing-element">
+            <strong>$elemento</strong><br>
+            <span class="timestamp">
+                Primer avistamiento: $first_seen<br>
+                Último avistamiento: $last_seen<br>
+                Veces encontrado: $count
+            </span>
+        </div>
+""")
+
+STAGE_ITEM_TEMPLATE = Template("""        <p style="margin-left: ${indent}em">$stage: ${mean}s promedio, ${max}s máximo ($count)</p>
+""")
+
+MISSING_NOTE_TEMPLATE = Template("""        <p class="note">Mostrando los $shown elementos vistos más recientemente de $total.</p>
+""")
+
+
+def write_text_atomic(path, content):
+    """Escribir un archivo de texto completo reemplazando el anterior de una vez"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+
+
+class DashboardRenderer:
+    """Genera logs/dashboard.html solo cuando cambian los datos
+
+    El llamador entrega una versión de sus datos; si coincide con la última
+    renderizada y el archivo existe, no se recalcula ni se escribe nada. La
+    sección de elementos faltantes se limita a max_missing entradas.
+    """
+
+    def __init__(self, path, max_missing=200):
+        self.path = path
+        self.max_missing = max_missing
+        self._rendered_version = None
+        self._lock = threading.Lock()
+
+    def render(self, get_data, version):
+        """Renderizar si hace falta; get_data(limit) devuelve los datos del dashboard"""
+        with self._lock:
+            if version is not None and version == self._rendered_version and os.path.exists(self.path):
+                return str(self.path)
+            data = get_data(self.max_missing)
+            write_text_atomic(self.path, self.build_html(data))
+            self._rendered_version = version
+            return str(self.path)
+
+    def build_html(self, data):
+        missing = data['missing_elements']
+        shown = missing['elements'][:self.max_missing]
+        items = ''.join(
+            MISSING_ITEM_TEMPLATE.substitute(
+                elemento=html.escape(str(elemento)),
+                first_seen=html.escape(str(info['first_seen'])),
+                last_seen=html.escape(str(info['last_seen'])),
+                count=info['count']
+            )
+            for elemento, info in shown
+        )
+        stage_items = ''.join(
+            STAGE_ITEM_TEMPLATE.substitute(
+                indent=stage.count('/') * 1.5,
+                stage=html.escape(stage.rsplit('/', 1)[-1]),
+                mean=stats['mean'],
+                max=stats['max'],
+                count=stats['count']
+            )
+            for stage, stats in sorted(data.get('stages', {}).items())
+        )
+        note = ''
+        if missing['total'] > len(shown):
+            note = MISSING_NOTE_TEMPLATE.substitute(shown=len(shown), total=missing['total'])
+        return PAGE_TEMPLATE.substitute(
+            total_predictions=data['total_predictions'],
+            total_files=data['total_files'],
+            lines_processed=data['lines_processed'],
+            average_processing_time=data['average_processing_time'],
+            p50=data['latency']['p50'],
+            p95=data['latency']['p95'],
+            p99=data['latency']['p99'],
+            last_execution=html.escape(str(data['last_execution'])),
+            memory_usage=round(data['memory_usage'], 2),
+            peak_memory_usage=round(data['peak_memory_usage'], 2),
+            cpu_seconds_per_file=data['cpu_seconds_per_file'],
+            stage_items=stage_items,
+            missing_total=missing['total'],
+            missing_note=note,
+            missing_items=items
+        )
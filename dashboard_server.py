@@ -0,0 +1,222 @@
+"""Servidor local del dashboard en vivo
+
+Rutas:
+    /                        página que se actualiza sola por server-sent events
+    /dashboard.html          dashboard estático generado en memoria
+    /api/metrics             métricas generales del SystemLogger (JSON)
+    /api/missing-elements    elementos faltantes, ?limit=N&offset=M&order=recent|count (JSON)
+    /api/progress            progreso del lote en curso (JSON)
+    /api/events              flujo SSE con progreso y métricas en vivo
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from config import Config
+from logger import system_logger
+
+# Segundos entre mensajes SSE cuando no hay cambios (mantiene viva la conexión)
+SSE_HEARTBEAT = 15.0
+MISSING_PAGE_SIZE = 100
+
+LIVE_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Dashboard en Vivo</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; }
+        .metric { background: #f5f5f5; padding: 15px; margin: 10px 0; border-radius: 5px; }
+        .metric h3 { margin: 0 0 10px 0; }
+        progress { width: 100%; }
+        .status { color: #666; font-size: 0.9em; }
+    </style>
+</head>
+<body>
+    <h1>Dashboard en Vivo</h1>
+    <p class="status" id="status">Conectando...</p>
+
+    <div class="metric">
+        <h3>Lote en Curso</h3>
+        <progress id="progress" value="0" max="1"></progress>
+        <p>Archivos: <span id="done">0</span> / <span id="total">0</span> (fallidos: <span id="failed">0</span>)</p>
+        <p>En proceso: <span id="running">0</span> - En cola: <span id="queue_depth">0</span></p>
+        <p>Rendimiento: <span id="files_per_second">0</span> archivos/s, <span id="rows_per_second">0</span> filas/s</p>
+        <p>Latencia por archivo (promedio / recientes / máxima): <span id="file_mean">0</span>s / <span id="file_recent">0</span>s / <span id="file_max">0</span>s</p>
+        <p>Último archivo: <span id="last_file">-</span></p>
+    </div>
+
+    <div class="metric">
+        <h3>Métricas Generales</h3>
+        <p>Total de Predicciones: <span id="total_predictions">0</span></p>
+        <p>Archivos Procesados: <span id="total_files">0</span></p>
+        <p>Tiempo por archivo p50 / p95 / p99 (histórico): <span id="p50">0</span>s / <span id="p95">0</span>s / <span id="p99">0</span>s</p>
+        <p>Uso de Memoria: <span id="memory_usage">0</span> MB</p>
+        <p>CPU por Archivo: <span id="cpu_seconds_per_file">0</span>s (promedio)</p>
+        <p>Elementos Faltantes: <span id="missing_total">0</span> (<a href="/api/missing-elements">detalle</a>)</p>
+    </div>
+
+    <p><a href="/dashboard.html">Dashboard completo</a></p>
+
+    <script>
+        function setText(id, value) { document.getElementById(id).textContent = value; }
+        var source = new EventSource('/api/events');
+        source.onopen = function () { setText('status', 'Conectado'); };
+        source.onerror = function () { setText('status', 'Reconectando...'); };
+        source.onmessage = function (event) {
+            var data = JSON.parse(event.data);
+            var p = data.progress, m = data.metrics;
+            var bar = document.getElementById('progress');
+            bar.max = Math.max(p.total, 1);
+            bar.value = p.done;
+            ['done', 'total', 'failed', 'running', 'queue_depth', 'files_per_second', 'rows_per_second']
+                .forEach(function (key) { setText(key, p[key]); });
+            setText('file_mean', p.file_latency.mean);
+            setText('file_recent', p.file_latency.recent_mean);
+            setText('file_max', p.file_latency.max);
+            setText('last_file', p.last_file || '-');
+            setText('total_predictions', m.total_predictions);
+            setText('total_files', m.total_files);
+            setText('p50', m.latency.p50);
+            setText('p95', m.latency.p95);
+            setText('p99', m.latency.p99);
+            setText('memory_usage', m.memory_usage.toFixed(2));
+            setText('cpu_seconds_per_file', m.cpu_seconds_per_file);
+            setText('missing_total', m.missing_elements.total);
+        };
+    </script>
+</body>
+</html>
+"""
+
+
+def metrics_summary():
+    """Métricas generales sin la lista de elementos faltantes"""
+    data = system_logger.generate_dashboard_data(missing_limit=0)
+    data['missing_elements'] = {'total': data['missing_elements']['total']}
+    return data
+
+
+def missing_elements_page(limit=MISSING_PAGE_SIZE, offset=0, order='recent'):
+    """Una página del registro de elementos faltantes, por fecha ('recent') o por conteo ('count')"""
+    registry = system_logger.missing_elements
+    page = registry.most_frequent if order == 'count' else registry.recent
+    return {
+        'total': len(registry),
+        'offset': offset,
+        'limit': limit,
+        'order': order,
+        'elements': [dict(info, elemento=elemento) for elemento, info in page(limit, offset)]
+    }
+
+
+class DashboardRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'DashboardServer/1.0'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        try:
+            if url.path in ('/', '/index.html'):
+                self._send(LIVE_PAGE.encode('utf-8'), 'text/html; charset=utf-8')
+            elif url.path == '/dashboard.html':
+                renderer = system_logger.dashboard
+                html = renderer.build_html(system_logger.generate_dashboard_data(renderer.max_missing))
+                self._send(html.encode('utf-8'), 'text/html; charset=utf-8')
+            elif url.path == '/api/metrics':
+                self._send_json(metrics_summary())
+            elif url.path == '/api/missing-elements':
+                limit = int(query.get('limit', [MISSING_PAGE_SIZE])[0])
+                offset = int(query.get('offset', [0])[0])
+                order = query.get('order', ['recent'])[0]
+                if limit < 0 or offset < 0:
+                    raise ValueError("limit y offset deben ser no negativos")
+                if order not in ('recent', 'count'):
+                    raise ValueError("order debe ser 'recent' o 'count'")
+                self._send_json(missing_elements_page(limit, offset, order))
+            elif url.path == '/api/progress':
+                self._send_json(system_logger.progress.snapshot())
+            elif url.path == '/api/events':
+                self._stream_events()
+            else:
+                self.send_error(404)
+        except ValueError as e:
+            self.send_error(400, str(e))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data):
+        self._send(json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8')
+
+    def _stream_events(self):
+        """Enviar un evento por cada cambio en el progreso; nada se escribe en disco"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('Connection', 'keep-alive')
+        self.end_headers()
+        progress = system_logger.progress
+        version = None
+        while not self.server.stopping.is_set():
+            payload = {'progress': progress.snapshot(), 'metrics': metrics_summary()}
+            version = payload['progress']['version']
+            self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            progress.wait_for_change(version, timeout=self.server.heartbeat)
+
+    def log_message(self, format, *args):
+        system_logger.logger.debug(f"Dashboard server: {format % args}")
+
+
+class DashboardServer:
+    """Servidor HTTP local del dashboard en un hilo en segundo plano"""
+
+    def __init__(self, host='127.0.0.1', port=None, heartbeat=SSE_HEARTBEAT):
+        self.host = host
+        self.port = Config().get('dashboard_port') if port is None else port
+        self.heartbeat = heartbeat
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/"
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return self.url
+        self._httpd = ThreadingHTTPServer((self.host, self.port), DashboardRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.stopping = threading.Event()
+        self._httpd.heartbeat = self.heartbeat
+        # Con port=0 el sistema asigna un puerto libre
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='dashboard-server', daemon=True)
+        self._thread.start()
+        system_logger.logger.info(f"Dashboard server listening on {self.url}")
+        return self.url
+
+    def stop(self):
+        if self._httpd is None:
+            return
+        self._httpd.stopping.set()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join(timeout=5)
+        self._httpd = None
+        self._thread = None
+
+
+dashboard_server = DashboardServer()
@@ -0,0 +1,200 @@
+"""Exportar muchos archivos de salida a otro formato en paralelo
+
+Uso:
+    python export.py salida -f jsonl -o exportados
+    python export.py "salida/2024-05*.xlsx" -f parquet -o exportados --workers 8
+
+Cada archivo se convierte por bloques (CSV a JSON Lines, por ejemplo, nunca
+carga el archivo completo) y, si la salida tiene copia Parquet vigente en
+.sidecar/, se lee esa copia en lugar del CSV o el Excel.
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from config import Config
+from file_io import (
+    COLUMNAR_FORMATS, available_output_formats, columnar_sidecar, conform_dtypes, iter_table_chunks,
+    open_table_writer, scan_dtypes
+)
+from logger import system_logger
+
+SOURCE_EXTENSIONS = ('.csv', '.xlsx', '.json', '.jsonl') + COLUMNAR_FORMATS
+
+
+def _init_worker():
+    """Los procesos de exportación no escriben métricas (solo el proceso principal)"""
+    system_logger.metrics_enabled = False
+
+
+def _source_chunks(source_path, chunk_rows, dtypes=None):
+    """Bloques del archivo de origen, leídos de su copia Parquet si está vigente"""
+    return iter_table_chunks(columnar_sidecar(source_path) or source_path, chunk_rows, dtypes)
+
+
+def _source_dtypes(source_path, chunk_rows):
+    """Tipos de columna de todo el archivo de origen, o None si ya vienen fijados
+
+    Parquet y Feather guardan un esquema único. En CSV, Excel y JSON cada bloque
+    se interpreta por separado, así que se recorre el archivo una vez antes de
+    escribir para que el primer bloque no fije un tipo que los siguientes no
+    cumplen (una columna numérica que más adelante tiene texto).
+    """
+    source = columnar_sidecar(source_path) or source_path
+    if source.endswith(COLUMNAR_FORMATS):
+        return None
+    return scan_dtypes(iter_table_chunks(source, chunk_rows))
+
+
+def export_file(source_path, export_path, chunk_rows=None):
+    """Convertir un archivo al formato de export_path sin cargarlo completo
+
+    Devuelve el resultado del archivo con su estado ('ok' o 'error'), las filas
+    escritas y el tiempo; no propaga la excepción para poder usarse en un pool.
+    """
+    chunk_rows = chunk_rows or Config().get('stream_chunk_rows')
+    start_time = time.time()
+    temp_path = export_path + '.part'
+    result = {'source': source_path, 'target': export_path}
+    try:
+        if os.path.splitext(source_path)[1] == os.path.splitext(export_path)[1]:
+            # Mismo formato: copia directa del archivo
+            shutil.copyfile(source_path, temp_path)
+            rows = None
+        else:
+            dtypes = _source_dtypes(source_path, chunk_rows)
+            with open_table_writer(temp_path, file_format=os.path.splitext(export_path)[1], dtypes=dtypes) as writer:
+                for df_chunk in _source_chunks(source_path, chunk_rows, dtypes):
+                    writer.write(conform_dtypes(df_chunk, dtypes) if dtypes else df_chunk)
+                rows = writer.rows_written
+        os.replace(temp_path, export_path)
+        result.update(status='ok', rows=rows)
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        result.update(status='error', error=f"{type(e).__name__}: {e}")
+    result['seconds'] = time.time() - start_time
+    return result
+
+
+def export_targets(sources, export_dir, format_type):
+    """Ruta de destino de cada archivo, sin que dos archivos compartan destino
+
+    El destino es <nombre>.<formato>; si varios archivos tienen el mismo nombre
+    con distinta extensión (x.csv y x.xlsx), se conserva la extensión de origen
+    (x_csv.parquet, x_xlsx.parquet), y si aun así coinciden (archivos de
+    carpetas distintas) se agrega un número. Los nombres se comparan sin
+    distinguir mayúsculas, como en Windows.
+    """
+    stems = Counter(os.path.splitext(os.path.basename(source))[0].casefold() for source in sources)
+    used = set()
+    targets = []
+    for source in sources:
+        stem, extension = os.path.splitext(os.path.basename(source))
+        name = stem if stems[stem.casefold()] == 1 else f"{stem}_{extension.lstrip('.')}"
+        candidate = name
+        counter = 2
+        while candidate.casefold() in used:
+            candidate = f"{name}_{counter}"
+            counter += 1
+        used.add(candidate.casefold())
+        targets.append(os.path.join(export_dir, f"{candidate}.{format_type}"))
+    return targets
+
+
+class ExportEngine:
+    """Convierte varios archivos a la vez con un pool de hilos o de procesos
+
+    Los hilos bastan cuando el trabajo es sobre todo E/S o pyarrow (CSV, JSON,
+    Parquet); escribir o leer Excel es código Python puro y rinde más con
+    procesos, así que es lo que se usa en ese caso.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or Config().get('max_workers') or os.cpu_count() or 1
+
+    def _executor_class(self, sources, format_type):
+        uses_excel = format_type == 'xlsx' or any(
+            source.endswith('.xlsx') and not columnar_sidecar(source) for source in sources
+        )
+        return ProcessPoolExecutor if uses_excel else ThreadPoolExecutor
+
+    def export(self, sources, export_dir, format_type, progress_callback=None, cancel_event=None):
+        """Exportar los archivos a export_dir; un resultado por archivo, en orden
+
+        progress_callback(completados, total, resultado) se llama al terminar
+        cada archivo. Con cancel_event activado, los que no empezaron quedan
+        con estado 'cancelled'.
+        """
+        sources = list(sources)
+        total = len(sources)
+        results = [None] * total
+        if not sources:
+            return results
+        os.makedirs(export_dir, exist_ok=True)
+        targets = export_targets(sources, export_dir, format_type)
+        batch_start = time.time()
+        workers = min(total, self.max_workers)
+        executor_class = self._executor_class(sources, format_type) if workers > 1 else ThreadPoolExecutor
+        options = {'initializer': _init_worker} if executor_class is ProcessPoolExecutor else {}
+        with executor_class(max_workers=workers, **options) as executor:
+            futures = {executor.submit(export_file, source, target): i for i, (source, target) in enumerate(zip(sources, targets))}
+            for done, future in enumerate(as_completed(futures), start=1):
+                i = futures[future]
+                if future.cancelled():
+                    result = {'source': sources[i], 'target': targets[i], 'status': 'cancelled', 'error': "Cancelado", 'seconds': 0.0}
+                else:
+                    result = future.result()
+                results[i] = result
+                if result['status'] == 'error':
+                    system_logger.log_error(RuntimeError(result['error']), f"Error exporting file: {result['source']}")
+                if progress_callback:
+                    progress_callback(done, total, result)
+                if cancel_event is not None and cancel_event.is_set():
+                    for pending in futures:
+                        pending.cancel()
+        failed = sum(1 for result in results if result['status'] == 'error')
+        system_logger.logger.info(
+            f"Exported {total} files to {format_type} ({failed} failed) in {time.time() - batch_start:.2f} seconds "
+            f"with {workers} {executor_class.__name__} workers"
+        )
+        return results
+
+
+def export_files(sources, export_dir, format_type, max_workers=None, progress_callback=None, cancel_event=None):
+    return ExportEngine(max_workers).export(sources, export_dir, format_type, progress_callback, cancel_event)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportar archivos de salida a otro formato en paralelo")
+    parser.add_argument('inputs', nargs='+', help="Archivos, carpetas o patrones glob")
+    parser.add_argument('-f', '--format', required=True, choices=available_output_formats(), help="Formato de destino")
+    parser.add_argument('-o', '--output-dir', required=True, help="Carpeta de destino")
+    parser.add_argument('-w', '--workers', type=int, help="Archivos simultáneos (predeterminado: max_workers o núcleos)")
+    args = parser.parse_args()
+
+    sources = []
+    for pattern in args.inputs:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in sorted(os.listdir(pattern))]
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True))
+        sources.extend(path for path in matches if path.endswith(SOURCE_EXTENSIONS) and os.path.isfile(path))
+    sources = list(dict.fromkeys(sources))
+    if not sources:
+        parser.error("No se encontraron archivos para exportar")
+
+    def on_file_done(done, total, result):
+        estado = 'ok' if result['status'] == 'ok' else f"error: {result['error']}"
+        print(f"[{done}/{total}] {result['source']} -> {result['target']} ({result['seconds']:.2f}s) {estado}", file=sys.stderr)
+
+    results = export_files(sources, args.output_dir, args.format, args.workers, on_file_done)
+    return 1 if any(result['status'] != 'ok' for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,603 @@
+import importlib.util
+import os
+from abc import ABC, abstractmethod
+import pandas as pd
+from config import Config
+
+# Motores en orden de preferencia: se usa el primero disponible salvo que
+# config.json indique otro en 'excel_reader' / 'excel_writer'
+EXCEL_READERS = ['calamine', 'openpyxl']
+EXCEL_WRITERS = ['xlsxwriter', 'openpyxl', 'pandas']
+
+# Formatos columnares (requieren pyarrow) y carpeta de copias auxiliares
+COLUMNAR_FORMATS = ('.parquet', '.feather')
+SIDECAR_DIR = '.sidecar'
+# Filas por grupo en Parquet: permite leer una parte del archivo sin cargarlo todo
+PARQUET_ROW_GROUP_ROWS = 50000
+
+
+def _pandas_version():
+    return tuple(int(part) for part in pd.__version__.split('.')[:2])
+
+
+def _module_available(name):
+    return importlib.util.find_spec(name) is not None
+
+
+def available_readers():
+    """Lectores de Excel instalados, en orden de preferencia"""
+    modules = {'calamine': 'python_calamine', 'openpyxl': 'openpyxl'}
+    readers = [name for name in EXCEL_READERS if _module_available(modules[name])]
+    # pandas admite engine='calamine' a partir de la versión 2.2
+    if 'calamine' in readers and _pandas_version() < (2, 2):
+        readers.remove('calamine')
+    return readers
+
+
+def available_writers():
+    """Escritores de Excel instalados, en orden de preferencia"""
+    # 'pandas' usa openpyxl por debajo, pero acumula todo en memoria
+    return [name for name in EXCEL_WRITERS if name == 'pandas' or _module_available(name)]
+
+
+def _select_engine(config_key, available):
+    configured = Config().get(config_key)
+    if configured and configured != 'auto':
+        if configured not in available:
+            raise ValueError(f"Motor '{configured}' de '{config_key}' no está disponible. Disponibles: {available}")
+        return configured
+    if not available:
+        raise ValueError("No hay ningún motor de Excel instalado")
+    return available[0]
+
+
+def columnar_available():
+    """Parquet y Arrow IPC (Feather) necesitan pyarrow"""
+    return _module_available('pyarrow')
+
+
+def available_output_formats():
+    """Extensiones de salida que se pueden escribir con las librerías instaladas"""
+    formats = ['csv', 'xlsx', 'json', 'jsonl']
+    if columnar_available():
+        formats += [extension.lstrip('.') for extension in COLUMNAR_FORMATS]
+    return formats
+
+
+def sidecar_path(path, extension):
+    """Ruta de la copia auxiliar de un archivo: <carpeta>/.sidecar/<archivo><extensión>"""
+    folder, filename = os.path.split(path)
+    return os.path.join(folder, SIDECAR_DIR, filename + extension)
+
+
+def sidecar_is_fresh(path, sidecar):
+    """La copia auxiliar es válida si existe y es posterior al archivo original"""
+    try:
+        return os.stat(sidecar).st_mtime_ns >= os.stat(path).st_mtime_ns
+    except OSError:
+        return False
+
+
+def columnar_sidecar(path):
+    """Copia Parquet vigente de un archivo, o None si no existe o quedó desactualizada"""
+    sidecar = sidecar_path(path, '.parquet')
+    if columnar_available() and sidecar_is_fresh(path, sidecar):
+        return sidecar
+    return None
+
+
+def get_reader_engine(engine=None):
+    """Motor de lectura de Excel a usar: el indicado, el de config.json o el más rápido"""
+    return engine or _select_engine('excel_reader', available_readers())
+
+
+def get_writer_engine(engine=None):
+    """Motor de escritura de Excel a usar: el indicado, el de config.json o el más rápido"""
+    return engine or _select_engine('excel_writer', available_writers())
+
+
+def read_table(path, nrows=None, engine=None, use_sidecar=True):
+    """Leer un archivo CSV, XLSX, Parquet o Feather en un DataFrame
+
+    Si el archivo tiene una copia Parquet vigente en .sidecar/ se lee esa copia,
+    que es mucho más rápida de cargar que el CSV o el Excel original.
+    """
+    sidecar = columnar_sidecar(path) if use_sidecar and nrows is None else None
+    if sidecar:
+        return pd.read_parquet(sidecar)
+    if path.endswith('.csv'):
+        return pd.read_csv(path, nrows=nrows)
+    elif path.endswith('.xlsx'):
+        return pd.read_excel(path, nrows=nrows, engine=get_reader_engine(engine))
+    elif path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+        return df.head(nrows) if nrows is not None else df
+    elif path.endswith('.feather'):
+        df = pd.read_feather(path)
+        return df.head(nrows) if nrows is not None else df
+    raise ValueError("Formato de archivo no soportado")
+
+
+def iter_table_chunks(path, chunk_rows, dtypes=None):
+    """Leer un archivo CSV, XLSX, Parquet, Feather, JSON o JSON Lines por bloques de a lo sumo chunk_rows filas
+
+    dtypes (ver scan_dtypes) hace que el CSV lea como texto las columnas que son
+    texto en el archivo completo, aunque en un bloque parezcan números.
+    """
+    if path.endswith('.csv'):
+        text_columns = {column: str for column, dtype in (dtypes or {}).items() if dtype == object}
+        with pd.read_csv(path, chunksize=chunk_rows, dtype=text_columns or None) as reader:
+            yield from reader
+    elif path.endswith('.xlsx'):
+        yield from _iter_excel_chunks(path, chunk_rows)
+    elif path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    elif path.endswith('.feather'):
+        yield from _iter_feather_chunks(path, chunk_rows)
+    elif path.endswith('.jsonl'):
+        with pd.read_json(path, lines=True, chunksize=chunk_rows) as reader:
+            yield from reader
+    elif path.endswith('.json'):
+        yield from _iter_json_chunks(path, chunk_rows)
+    else:
+        raise ValueError("Formato de archivo no soportado")
+
+
+def _iter_feather_chunks(path, chunk_rows):
+    """Recorrer los lotes de un archivo Arrow IPC sin cargar los demás"""
+    import pyarrow as pa
+
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            for start in range(0, batch.num_rows, chunk_rows):
+                yield batch.slice(start, chunk_rows).to_pandas()
+
+
+def _iter_json_chunks(path, chunk_rows, read_size=1 << 20):
+    """Leer un arreglo JSON de registros por bloques, sin cargar todo el archivo
+
+    Los registros se decodifican uno a uno a medida que se lee el archivo.
+    """
+    import json
+
+    decoder = json.JSONDecoder()
+    records = []
+    with open(path, encoding='utf-8') as f:
+        buffer = f.read(read_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError("El archivo JSON no es un arreglo de registros")
+        position = 1
+        eof = False
+        while True:
+            # Saltar espacios y la coma entre registros
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) and buffer[position] == ']':
+                break
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # El registro quedó cortado: leer más del archivo
+                more = f.read(read_size)
+                eof = not more
+                buffer = buffer[position:] + more
+                position = 0
+                continue
+            records.append(record)
+            position = end
+            if len(records) >= chunk_rows:
+                yield pd.DataFrame.from_records(records)
+                records = []
+    if records:
+        yield pd.DataFrame.from_records(records)
+
+
+def _iter_excel_chunks(path, chunk_rows):
+    """Recorrer la primera hoja con openpyxl en modo de solo lectura"""
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=columns)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns)
+    finally:
+        workbook.close()
+
+
+def scan_dtypes(chunks):
+    """Tipo de cada columna en el archivo completo a partir de sus bloques
+
+    Cada bloque se interpreta por separado, así que una columna puede ser
+    numérica en uno y texto en otro. Se unifican como lo haría read_csv sobre
+    todo el archivo: enteros con algún vacío pasan a float64, enteros y
+    decimales a float64, y cualquier otra mezcla a texto (object). Las columnas
+    que nunca tienen valores no se incluyen.
+    """
+    kinds = {}
+    has_nulls = set()
+    for df_chunk in chunks:
+        for column in df_chunk.columns:
+            values = df_chunk[column]
+            nulls = values.isna()
+            if nulls.any():
+                has_nulls.add(column)
+            if nulls.all():
+                continue
+            kind = 'O' if isinstance(values.dtype, pd.CategoricalDtype) else values.dtype.kind
+            kinds.setdefault(column, set()).add(kind)
+    dtypes = {}
+    for column, column_kinds in kinds.items():
+        if column_kinds == {'i'} and column not in has_nulls:
+            dtypes[column] = pd.api.types.pandas_dtype('int64')
+        elif column_kinds <= {'i', 'f'}:
+            dtypes[column] = pd.api.types.pandas_dtype('float64')
+        elif column_kinds == {'b'} and column not in has_nulls:
+            dtypes[column] = pd.api.types.pandas_dtype('bool')
+        elif column_kinds == {'M'}:
+            dtypes[column] = pd.api.types.pandas_dtype('datetime64[ns]')
+        else:
+            dtypes[column] = pd.api.types.pandas_dtype(object)
+    return dtypes
+
+
+def conform_dtypes(df, dtypes):
+    """Convertir las columnas de un bloque a los tipos fijados para todo el archivo
+
+    Así todos los bloques se escriben igual (1.0 y no 1 en una columna float64,
+    "1" y no 1 en una de texto), también en CSV, JSON y Excel.
+    """
+    columns = {}
+    for i, column in enumerate(df.columns):
+        dtype = dtypes.get(column)
+        if dtype is None or df.dtypes.iloc[i] == dtype:
+            continue
+        values = df.iloc[:, i]
+        if dtype == object:
+            if not pd.api.types.is_string_dtype(values):
+                columns[i] = values.astype(str).astype(object).where(values.notna(), None)
+        else:
+            columns[i] = values.astype(dtype)
+    if not columns:
+        return df
+    df = df.copy()
+    for i, values in columns.items():
+        df.isetitem(i, values)
+    return df
+
+
+def _to_rows(df):
+    """Convertir un DataFrame en tuplas de valores nativos, con None en lugar de NaN"""
+    df = df.astype(object).where(df.notna(), None)
+    return df.itertuples(index=False, name=None)
+
+
+class TableWriter(ABC):
+    """Escritor incremental: recibe DataFrames por bloques y los agrega al archivo"""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows_written = 0
+        self._header_written = False
+
+    @abstractmethod
+    def write(self, df):
+        """Agregar un bloque al archivo"""
+
+    @abstractmethod
+    def close(self):
+        """Terminar el archivo y liberar los recursos"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CsvTableWriter(TableWriter):
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+
+    def write(self, df):
+        df.to_csv(self._file, header=not self._header_written, index=False)
+        self._header_written = True
+        self.rows_written += len(df)
+
+    def close(self):
+        self._file.close()
+
+
+class JsonTableWriter(TableWriter):
+    """Arreglo JSON de registros (indentado) escrito por bloques
+
+    El resultado es el mismo que DataFrame.to_json(orient='records', indent=2)
+    sobre el DataFrame completo, pero sin tenerlo entero en memoria.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, df):
+        if df.empty:
+            return
+        records = df.to_json(orient='records', indent=2)
+        # Quitar los corchetes del bloque: "[\n  {...},\n  {...}\n]"
+        self._file.write(',\n' if self.rows_written else '[\n')
+        self._file.write(records[2:-2])
+        self.rows_written += len(df)
+
+    def close(self):
+        # pandas escribe '[\n\n]' para un DataFrame vacío
+        self._file.write('\n]' if self.rows_written else '[\n\n]')
+        self._file.close()
+
+
+class JsonLinesTableWriter(TableWriter):
+    """JSON Lines: un registro por línea, agregado bloque a bloque"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, df):
+        if df.empty:
+            return
+        self._file.write(df.to_json(orient='records', lines=True, force_ascii=False).rstrip('\n') + '\n')
+        self.rows_written += len(df)
+
+    def close(self):
+        self._file.close()
+
+
+class RowTableWriter(TableWriter):
+    """Escritor que vuelca el encabezado y luego cada fila (hojas de Excel)"""
+
+    def write(self, df):
+        if not self._header_written:
+            self._write_header(list(df.columns))
+            self._header_written = True
+        self._write_rows(df)
+        self.rows_written += len(df)
+
+    @abstractmethod
+    def _write_header(self, columns):
+        """Escribir la fila de nombres de columna"""
+
+    @abstractmethod
+    def _write_rows(self, df):
+        """Escribir las filas de un bloque a continuación de las anteriores"""
+
+
+class XlsxWriterTableWriter(RowTableWriter):
+    """Escritura con xlsxwriter en modo constant_memory: cada fila se vuelca al disco"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        import xlsxwriter
+        # El archivo temporal puede no terminar en .xlsx; xlsxwriter no lo valida
+        self._workbook = xlsxwriter.Workbook(path, {
+            'constant_memory': True,
+            'default_date_format': 'yyyy-mm-dd hh:mm:ss'
+        })
+        self._sheet = self._workbook.add_worksheet('Sheet1')
+        self._row = 0
+
+    def _write_header(self, columns):
+        self._sheet.write_row(0, 0, columns)
+        self._row = 1
+
+    def _write_rows(self, df):
+        for values in _to_rows(df):
+            self._sheet.write_row(self._row, 0, values)
+            self._row += 1
+
+    def close(self):
+        self._workbook.close()
+
+
+class OpenpyxlTableWriter(RowTableWriter):
+    """Escritura con openpyxl en modo write_only"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        import openpyxl
+        self._workbook = openpyxl.Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet('Sheet1')
+
+    def _write_header(self, columns):
+        self._sheet.append(columns)
+
+    def _write_rows(self, df):
+        for values in _to_rows(df):
+            self._sheet.append(values)
+
+    def close(self):
+        self._workbook.save(self.path)
+
+
+class PandasTableWriter(TableWriter):
+    """Escritura con el motor predeterminado de pandas; acumula los bloques en memoria"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._chunks = []
+
+    def write(self, df):
+        self._chunks.append(df)
+        self.rows_written += len(df)
+
+    def close(self):
+        df = pd.concat(self._chunks, ignore_index=True) if self._chunks else pd.DataFrame()
+        # Se indica el motor porque la ruta puede ser un temporal sin extensión .xlsx
+        df.to_excel(self.path, index=False, engine='openpyxl')
+
+
+def _arrow_type(dtype):
+    """Tipo de Arrow de una columna con el que se lee igual que desde el CSV
+
+    Los enteros se guardan como int64 con nulos: se leen como int64 si no hay
+    valores vacíos y como float64 si los hay, igual que read_csv. Las categorías
+    y los objetos se guardan como texto.
+    """
+    import pyarrow as pa
+
+    if pd.api.types.is_bool_dtype(dtype):
+        return pa.bool_()
+    if pd.api.types.is_integer_dtype(dtype):
+        return pa.int64()
+    if pd.api.types.is_float_dtype(dtype):
+        return pa.float64()
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return pa.timestamp('ns')
+    return pa.string()
+
+
+class ArrowTableWriter(TableWriter):
+    """Escritura por bloques en Parquet o Arrow IPC (Feather v2) con pyarrow
+
+    El esquema se fija con el primer bloque. dtypes indica los tipos conocidos
+    de antemano (por ejemplo, los del entrenamiento), que se respetan aunque el
+    primer bloque no tenga ningún valor en esas columnas; las demás columnas
+    toman el tipo del primer bloque y, si están vacías en él, se guardan como
+    texto para que los bloques siguientes encajen.
+    """
+
+    def __init__(self, path, file_format='.parquet', dtypes=None):
+        super().__init__(path)
+        self.file_format = file_format
+        self.dtypes = dict(dtypes or {})
+        self._schema = None
+        self._writer = None
+
+    def _build_schema(self, df):
+        import pyarrow as pa
+
+        fields = []
+        for i, column in enumerate(df.columns):
+            if column in self.dtypes:
+                arrow_type = _arrow_type(self.dtypes[column])
+            elif df.iloc[:, i].isna().all():
+                arrow_type = pa.string()
+            else:
+                arrow_type = _arrow_type(df.iloc[:, i].dtype)
+            fields.append(pa.field(str(column), arrow_type))
+        return pa.schema(fields)
+
+    def write(self, df):
+        import pyarrow as pa
+
+        if self._schema is None:
+            self._schema = self._build_schema(df)
+            self._writer = self._open(self._schema)
+        table = pa.Table.from_pandas(self._conform(df), schema=self._schema, preserve_index=False)
+        if self.file_format == '.parquet':
+            self._writer.write_table(table, row_group_size=PARQUET_ROW_GROUP_ROWS)
+        else:
+            # Lotes del mismo tamaño que los grupos de Parquet: la vista previa lee uno a la vez
+            self._writer.write_table(table, max_chunksize=PARQUET_ROW_GROUP_ROWS)
+        self.rows_written += len(df)
+
+    def _conform(self, df):
+        """Pasar a texto los valores de las columnas que el esquema guarda como texto"""
+        import pyarrow as pa
+
+        columns = {}
+        for i, field in enumerate(self._schema):
+            column = df.iloc[:, i]
+            if not pa.types.is_string(field.type) or pd.api.types.is_string_dtype(column):
+                continue
+            # Las categorías de texto las convierte pyarrow sin pasar por Python
+            if isinstance(column.dtype, pd.CategoricalDtype) and pd.api.types.is_string_dtype(column.cat.categories):
+                continue
+            columns[i] = column.astype(str).where(column.notna(), None)
+        if not columns:
+            return df
+        df = df.copy()
+        for i, column in columns.items():
+            df.isetitem(i, column)
+        return df
+
+    def _open(self, schema):
+        if self.file_format == '.parquet':
+            import pyarrow.parquet as pq
+            return pq.ParquetWriter(self.path, schema)
+        import pyarrow as pa
+        return pa.ipc.new_file(self.path, schema)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+_EXCEL_WRITER_CLASSES = {
+    'xlsxwriter': XlsxWriterTableWriter,
+    'openpyxl': OpenpyxlTableWriter,
+    'pandas': PandasTableWriter,
+}
+
+
+def open_table_writer(path, engine=None, file_format=None, dtypes=None):
+    """Abrir un escritor incremental según la extensión del archivo
+
+    file_format permite escribir en una ruta temporal con otra extensión.
+    dtypes fija los tipos de columna de los formatos columnares (ver ArrowTableWriter).
+    """
+    file_format = file_format or os.path.splitext(path)[1]
+    if file_format == '.csv':
+        return CsvTableWriter(path)
+    elif file_format == '.xlsx':
+        return _EXCEL_WRITER_CLASSES[get_writer_engine(engine)](path)
+    elif file_format == '.json':
+        return JsonTableWriter(path)
+    elif file_format == '.jsonl':
+        return JsonLinesTableWriter(path)
+    elif file_format in COLUMNAR_FORMATS:
+        if not columnar_available():
+            raise ValueError(f"El formato {file_format} requiere pyarrow")
+        return ArrowTableWriter(path, file_format, dtypes)
+    raise ValueError("Formato de archivo no soportado")
+
+
+def write_table(df, path, engine=None):
+    """Guardar un DataFrame en CSV, XLSX, JSON, JSON Lines, Parquet o Feather según la extensión"""
+    with open_table_writer(path, engine) as writer:
+        writer.write(df)
+
+
+def write_columnar_sidecar(df, path):
+    """Guardar una copia Parquet de un archivo recién escrito en .sidecar/
+
+    Exportaciones y vistas previas la leen en lugar de volver a interpretar el
+    CSV o el Excel. Devuelve la ruta, o None si pyarrow no está instalado.
+    """
+    if not columnar_available():
+        return None
+    sidecar = sidecar_path(path, '.parquet')
+    os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+    temp_path = sidecar + '.part'
+    # Una columna sin valores se lee del CSV como float64
+    dtypes = {column: 'float64' for column in df.columns[df.isna().all().to_numpy()]}
+    with ArrowTableWriter(temp_path, dtypes=dtypes) as writer:
+        writer.write(df)
+    os.replace(temp_path, sidecar)
+    return sidecar
@@ -1,4 +1,7 @@
+import atexit
+from collections import deque
 import logging
+import threading
 import time
 import json
 import os
@@ -6,6 +9,17 @@ from datetime import datetime
 import psutil
 import pandas as pd
 from pathlib import Path
+from config import Config
+from dashboard import DashboardRenderer
+from metrics import EventJournal, ProgressTracker, QuantileSketch, RunningStats, write_json_atomic
+from missing_registry import MissingElementsRegistry
+
+# Cada cuántos segundos se vuelcan los eventos de métricas al diario
+METRICS_FLUSH_INTERVAL = 2.0
+# Eventos acumulados en el diario antes de consolidarlos en metrics.json
+METRICS_COMPACT_EVENTS = 5000
+# Muestras de memoria recientes que se conservan
+MEMORY_SAMPLES = 100
 
 class SystemLogger:
     def __init__(self):
@@ -33,182 +47,227 @@ class SystemLogger:
         self.logger.addHandler(error_handler)
         
         # Performance metrics
+        # Los procesos de trabajo desactivan la persistencia: solo el proceso
+        # principal escribe metrics.json y missing_elements.json
+        self.metrics_enabled = True
         self.metrics_file = self.logs_dir / 'metrics.json'
         self.missing_elements_file = self.logs_dir / 'missing_elements.json'
         self.metrics = self._load_metrics()
-        self.missing_elements = self._load_missing_elements()
+        # Registro indexado de elementos faltantes con su propio diario incremental
+        self.missing_elements = MissingElementsRegistry(
+            self.missing_elements_file,
+            self.logs_dir / 'missing_elements_events.jsonl',
+            flush_interval=METRICS_FLUSH_INTERVAL
+        )
+        
+        # metrics.json es una foto consolidada; los eventos posteriores se agregan
+        # a un diario JSONL que un hilo vuelca en segundo plano
+        self._metrics_lock = threading.RLock()
+        self._events_since_compact = 0
+        self.journal = EventJournal(self.logs_dir / 'metrics_events.jsonl', flush_interval=METRICS_FLUSH_INTERVAL)
+        
+        # Versión de los datos: cambia con cada evento y permite al dashboard
+        # saber si tiene algo nuevo que mostrar
+        self.data_version = 0
+        self.dashboard = DashboardRenderer(
+            self.logs_dir / 'dashboard.html',
+            max_missing=Config().get('dashboard_max_missing')
+        )
+        # Progreso del lote en curso (para el servidor del dashboard en vivo)
+        self.progress = ProgressTracker()
         
         # Migrar métricas si es necesario
         self._migrate_metrics()
+        
+        # Recuperar los eventos que no llegaron a consolidarse
+        self._replay_journal()
+        atexit.register(self.close)
 
     def _load_metrics(self):
         if self.metrics_file.exists():
             with open(self.metrics_file, 'r') as f:
-                metrics = json.load(f)
-                # Asegurar que lines_per_file existe
-                if 'lines_per_file' not in metrics:
-                    metrics['lines_per_file'] = []
-                return metrics
+                return json.load(f)
         return {
             'total_predictions': 0,
             'total_files_processed': 0,
-            'processing_times': [],
             'error_count': 0,
             'last_execution': None,
             'model_usage': {},
-            'memory_usage': [],
-            'lines_per_file': []
-        }
-
-    def _load_missing_elements(self):
-        if self.missing_elements_file.exists():
-            with open(self.missing_elements_file, 'r') as f:
-                return json.load(f)
-        return {
-            'elements': {},  # Diccionario para almacenar elementos y fechas
-            'total_count': 0
+            'processing_time_stats': {},
+            'file_time_quantiles': {},
+            'lines_per_file_stats': {},
+            'cpu_seconds_stats': {},
+            'rss_peak_stats': {},
+            'stage_stats': {},
+            'memory_usage': []
         }
 
-    def _save_missing_elements(self):
-        with open(self.missing_elements_file, 'w') as f:
-            json.dump(self.missing_elements, f, indent=4)
-
-    def log_missing_elements(self, elementos_faltantes):
-        """Registrar elementos faltantes con fecha"""
-        current_date = datetime.now().isoformat()
-        
-        for elemento in elementos_faltantes:
-            if elemento not in self.missing_elements['elements']:
-                self.missing_elements['elements'][elemento] = {
-                    'first_seen': current_date,
-                    'last_seen': current_date,
-                    'count': 1
-                }
-            else:
-                self.missing_elements['elements'][elemento]['last_seen'] = current_date
-                self.missing_elements['elements'][elemento]['count'] += 1
-        
-        self.missing_elements['total_count'] = len(self.missing_elements['elements'])
-        self._save_missing_elements()
+    def log_missing_elements(self, elementos_faltantes, source=None):
+        """Registrar elementos faltantes con fecha y el archivo donde aparecieron"""
+        with self._metrics_lock:
+            if self.missing_elements.upsert(elementos_faltantes, source=source, persist=self.metrics_enabled):
+                self.data_version += 1
 
     def log_prediction(self, elemento, predictions, execution_time):
         """Log individual prediction details"""
         self.logger.info(f"Prediction made for elemento: {elemento}")
-        self.metrics['total_predictions'] += 1
-        self.metrics['processing_times'].append(execution_time)
-        self._save_metrics()
+        self._record({'type': 'prediction', 'count': 1, 'execution_time': execution_time})
 
-    def log_file_processed(self, filename, num_predictions, lines_processed):
-        """Log file processing completion"""
-        self.metrics['total_files_processed'] += 1
-        self.metrics['last_execution'] = datetime.now().isoformat()
-        if 'lines_per_file' not in self.metrics:
-            self.metrics['lines_per_file'] = []
-        self.metrics['lines_per_file'].append(lines_processed)
-        self.logger.info(f"Processed file {filename} with {num_predictions} predictions and {lines_processed} total lines")
-        self._save_metrics()
+    def log_batch_prediction(self, num_elementos, num_unique, execution_time):
+        """Log a batched prediction over several elementos"""
+        self.logger.info(f"Batch prediction made for {num_elementos} elementos ({num_unique} unique known)")
+        self._record({'type': 'prediction', 'count': num_elementos, 'execution_time': execution_time})
+
+    def log_file_processed(self, filename, num_predictions, lines_processed, resources=None, stages=None):
+        """Log file processing completion
+
+        resources es el resumen de ResourceSampler del archivo y stages los segundos
+        por etapa ({'process_file/save_predictions': 0.12}); viajan en el mismo evento.
+        """
+        message = f"Processed file {filename} with {num_predictions} predictions and {lines_processed} total lines"
+        if resources:
+            message += (
+                f" (peak RSS {resources['rss_peak_mb']} MB, CPU {resources['cpu_seconds']}s, "
+                f"{resources['threads_max']} threads, {resources['samples']} samples)"
+            )
+        self.logger.info(message)
+        event = {
+            'type': 'file_processed',
+            'timestamp': datetime.now().isoformat(),
+            'file': filename,
+            'lines': lines_processed
+        }
+        if resources:
+            event['resources'] = resources
+        if stages:
+            event['stages'] = stages
+        self._record(event)
 
     def log_error(self, error, context=None):
         """Log error with context"""
-        self.metrics['error_count'] += 1
         self.logger.error(f"Error: {str(error)}", exc_info=True, extra={'context': context})
-        self._save_metrics()
+        self._record({'type': 'error'})
 
     def log_performance(self):
         """Log system performance metrics"""
         memory = psutil.Process().memory_info().rss / 1024 / 1024  # MB
-        self.metrics['memory_usage'].append({
-            'timestamp': datetime.now().isoformat(),
-            'memory_mb': memory
-        })
+        self._record({'type': 'memory', 'timestamp': datetime.now().isoformat(), 'memory_mb': memory})
+
+    def _apply_event(self, event):
+        """Aplicar un evento a las métricas en memoria"""
+        event_type = event['type']
+        if event_type == 'prediction':
+            self.metrics['total_predictions'] += event['count']
+            self.metrics['processing_time_stats'].add(event['execution_time'])
+        elif event_type == 'file_processed':
+            self.metrics['total_files_processed'] += 1
+            self.metrics['last_execution'] = event['timestamp']
+            self.metrics['lines_per_file_stats'].add(event['lines'])
+            resources = event.get('resources')
+            if resources:
+                # Los cuantiles de latencia son por archivo: todo archivo procesado pasa por aquí
+                self.metrics['file_time_quantiles'].add(resources['seconds'])
+                self.metrics['cpu_seconds_stats'].add(resources['cpu_seconds'])
+                self.metrics['rss_peak_stats'].add(resources['rss_peak_mb'])
+                self.metrics['memory_usage'].append({
+                    'timestamp': event['timestamp'],
+                    'memory_mb': resources['rss_peak_mb']
+                })
+            stage_stats = self.metrics['stage_stats']
+            for stage, seconds in event.get('stages', {}).items():
+                if stage not in stage_stats:
+                    stage_stats[stage] = RunningStats()
+                stage_stats[stage].add(seconds)
+        elif event_type == 'error':
+            self.metrics['error_count'] += 1
+        elif event_type == 'memory':
+            self.metrics['memory_usage'].append({
+                'timestamp': event['timestamp'],
+                'memory_mb': event['memory_mb']
+            })
+
+    def _record(self, event):
+        """Registrar un evento: O(1), sin escribir en disco en el hilo que llama"""
+        with self._metrics_lock:
+            self._apply_event(event)
+            self.data_version += 1
+            if not self.metrics_enabled:
+                return
+            self.journal.append(event)
+            self._events_since_compact += 1
+            if self._events_since_compact >= METRICS_COMPACT_EVENTS:
+                self._save_metrics()
+
+    def _replay_journal(self):
+        replayed = 0
+        with self._metrics_lock:
+            for event in self.journal.read_events():
+                self._apply_event(event)
+                replayed += 1
+        # No se consolida aquí: otro proceso puede estar agregando al diario.
+        # Los eventos recuperados se guardan en la próxima consolidación.
+        if replayed:
+            self.logger.info(f"Replayed {replayed} metric events from the journal")
+
+    def flush(self):
+        """Volcar al diario los eventos pendientes"""
+        if self.metrics_enabled:
+            self.journal.flush()
+            self.missing_elements.journal.flush()
+
+    def close(self):
+        """Volcar los eventos pendientes y consolidar metrics.json al terminar"""
+        if not self.metrics_enabled:
+            return
+        self.journal.close()
         self._save_metrics()
+        self.missing_elements.close()
 
-    def generate_dashboard_data(self):
-        """Generate data for the dashboard"""
-        avg_time = sum(self.metrics['processing_times']) / len(self.metrics['processing_times']) if self.metrics['processing_times'] else 0
-        
-        # Ordenar elementos faltantes por fecha de último avistamiento
-        missing_elements_sorted = sorted(
-            self.missing_elements['elements'].items(),
-            key=lambda x: x[1]['last_seen'],
-            reverse=True
-        )
+    def generate_dashboard_data(self, missing_limit=None):
+        """Generate data for the dashboard
+
+        missing_limit acota cuántos elementos faltantes (los más recientes) se incluyen;
+        el registro los mantiene ordenados, así que no se ordena nada aquí.
+        """
+        with self._metrics_lock:
+            return self._dashboard_data(missing_limit)
+
+    def _dashboard_data(self, missing_limit):
+        processing_stats = self.metrics['processing_time_stats']
+        quantiles = self.metrics['file_time_quantiles']
+        memory_usage = self.metrics['memory_usage']
         
         dashboard_data = {
             'total_predictions': self.metrics['total_predictions'],
             'total_files': self.metrics['total_files_processed'],
-            'average_processing_time': round(avg_time, 3),
-            'lines_processed': sum(self.metrics['lines_per_file']) if 'lines_per_file' in self.metrics else 0,
+            'average_processing_time': round(processing_stats.mean, 3),
+            'max_processing_time': round(processing_stats.maximum or 0, 3),
+            # Cuantiles del tiempo de proceso de cada archivo
+            'latency': {
+                name: round(quantiles.quantile(q) or 0, 3)
+                for name, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))
+            },
+            'lines_processed': int(self.metrics['lines_per_file_stats'].total),
             'last_execution': self.metrics['last_execution'],
-            'memory_usage': self.metrics['memory_usage'][-1]['memory_mb'] if self.metrics['memory_usage'] else 0,
+            'memory_usage': memory_usage[-1]['memory_mb'] if memory_usage else 0,
+            'peak_memory_usage': max((sample['memory_mb'] for sample in memory_usage), default=0),
+            'cpu_seconds_per_file': round(self.metrics['cpu_seconds_stats'].mean, 3),
+            'max_rss_peak': self.metrics['rss_peak_stats'].maximum or 0,
+            'stages': {
+                stage: {'mean': round(stats.mean, 4), 'max': round(stats.maximum or 0, 4), 'count': stats.count}
+                for stage, stats in self.metrics['stage_stats'].items()
+            },
             'missing_elements': {
-                'total': self.missing_elements['total_count'],
-                'elements': missing_elements_sorted
+                'total': len(self.missing_elements),
+                'elements': self.missing_elements.recent(missing_limit)
             }
         }
         
         return dashboard_data
 
     def generate_html_dashboard(self):
-        """Generate HTML dashboard"""
-        data = self.generate_dashboard_data()
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Dashboard de Procesamiento</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                .metric {{ background: #f5f5f5; padding: 15px; margin: 10px 0; border-radius: 5px; }}
-                .metric h3 {{ margin: 0 0 10px 0; }}
-                .missing-elements {{ margin-top: 20px; }}
-                .missing-element {{ background: #fff3f3; padding: 10px; margin: 5px 0; border-left: 3px solid #ff4444; }}
-                .timestamp {{ color: #666; font-size: 0.9em; }}
-            </style>
-        </head>
-        <body>
-            <h1>Dashboard de Procesamiento</h1>
-            
-            <div class="metric">
-                <h3>Métricas Generales</h3>
-                <p>Total de Predicciones: {data['total_predictions']}</p>
-                <p>Archivos Procesados: {data['total_files']}</p>
-                <p>Predicciones Procesadas: {data['lines_processed']}</p>
-                <p>Tiempo Promedio de Procesamiento: {data['average_processing_time']}s</p>
-                <p>Última Ejecución: {data['last_execution']}</p>
-                <p>Uso de Memoria: {round(data['memory_usage'], 2)} MB</p>
-            </div>
-            
-            <div class="metric missing-elements">
-                <h3>Elementos Faltantes en Entrenamiento ({data['missing_elements']['total']})</h3>
-                """
-        
-        # Agregar cada elemento faltante al dashboard
-        for elemento, info in data['missing_elements']['elements']:
-            html_content += f"""
-                <div class="missing-element">
-                    <strong>{elemento}</strong><br>
-                    <span class="timestamp">
-                        Primer avistamiento: {info['first_seen']}<br>
-                        Último avistamiento: {info['last_seen']}<br>
-                        Veces encontrado: {info['count']}
-                    </span>
-                </div>
-            """
-        
-        html_content += """
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Guardar dashboard
-        dashboard_path = self.logs_dir / 'dashboard.html'
-        with open(dashboard_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        return str(dashboard_path)
+        """Generate HTML dashboard (solo se reescribe si cambiaron los datos)"""
+        return self.dashboard.render(self.generate_dashboard_data, self.data_version)
 
     def _migrate_metrics(self):
         """Migrar métricas antiguas al nuevo formato"""
@@ -218,12 +277,9 @@ class SystemLogger:
         required_fields = {
             'total_predictions': 0,
             'total_files_processed': 0,
-            'processing_times': [],
             'error_count': 0,
             'last_execution': None,
-            'model_usage': {},
-            'memory_usage': [],
-            'lines_per_file': []
+            'model_usage': {}
         }
         
         for field, default_value in required_fields.items():
@@ -231,12 +287,54 @@ class SystemLogger:
                 self.metrics[field] = default_value
                 needs_save = True
         
+        # Agregados acotados: las listas sin límite de versiones anteriores se
+        # resumen una sola vez en conteos, sumas, extremos y un sketch de cuantiles
+        processing_stats = RunningStats.from_dict(self.metrics.get('processing_time_stats'))
+        # Los cuantiles anteriores mezclaban tiempos por predicción; se empiezan de nuevo por archivo
+        quantiles = QuantileSketch.from_dict(self.metrics.get('file_time_quantiles'))
+        if self.metrics.pop('processing_time_quantiles', None) is not None:
+            needs_save = True
+        lines_stats = RunningStats.from_dict(self.metrics.get('lines_per_file_stats'))
+        cpu_stats = RunningStats.from_dict(self.metrics.get('cpu_seconds_stats'))
+        rss_stats = RunningStats.from_dict(self.metrics.get('rss_peak_stats'))
+        if 'processing_times' in self.metrics:
+            for value in self.metrics.pop('processing_times'):
+                processing_stats.add(value)
+            needs_save = True
+        if 'lines_per_file' in self.metrics:
+            for value in self.metrics.pop('lines_per_file'):
+                lines_stats.add(value)
+            needs_save = True
+        self.metrics['processing_time_stats'] = processing_stats
+        self.metrics['file_time_quantiles'] = quantiles
+        self.metrics['lines_per_file_stats'] = lines_stats
+        self.metrics['cpu_seconds_stats'] = cpu_stats
+        self.metrics['rss_peak_stats'] = rss_stats
+        self.metrics['stage_stats'] = {
+            stage: RunningStats.from_dict(stats) for stage, stats in self.metrics.get('stage_stats', {}).items()
+        }
+        self.metrics['memory_usage'] = deque(self.metrics.get('memory_usage', []), maxlen=MEMORY_SAMPLES)
+        
+        # Los campos nuevos se guardan en la próxima consolidación de metrics.json
         if needs_save:
-            self._save_metrics()
             self.logger.info("Métricas migradas al nuevo formato")
 
+    def _metrics_state(self):
+        """Métricas en formato JSON compacto"""
+        state = dict(self.metrics)
+        for field in ('processing_time_stats', 'file_time_quantiles', 'lines_per_file_stats',
+                      'cpu_seconds_stats', 'rss_peak_stats'):
+            state[field] = self.metrics[field].to_dict()
+        state['stage_stats'] = {stage: stats.to_dict() for stage, stats in self.metrics['stage_stats'].items()}
+        state['memory_usage'] = list(self.metrics['memory_usage'])
+        return state
+
     def _save_metrics(self):
-        with open(self.metrics_file, 'w') as f:
-            json.dump(self.metrics, f, indent=4)
+        """Consolidar las métricas en metrics.json y vaciar el diario"""
+        if not self.metrics_enabled:
+            return
+        with self._metrics_lock:
+            self.journal.compact(lambda: write_json_atomic(self.metrics_file, self._metrics_state(), indent=4))
+            self._events_since_compact = 0
 
 system_logger = SystemLogger()
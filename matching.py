@@ -0,0 +1,89 @@
+import re
+import unicodedata
+import numpy as np
+
+# Modos de búsqueda de elementos (config.json: elemento_matching)
+MATCH_EXACT = 'exact'            # solo el texto idéntico al del entrenamiento
+MATCH_NORMALIZED = 'normalized'  # además, sin distinguir mayúsculas, acentos ni espacios
+MATCH_FUZZY = 'fuzzy'            # además, el elemento más parecido si supera el umbral
+MATCH_MODES = (MATCH_EXACT, MATCH_NORMALIZED, MATCH_FUZZY)
+
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_elemento(elemento):
+    """Forma canónica de un elemento para compararlo
+
+    Minúsculas (casefold), sin acentos y con los espacios repetidos reducidos a
+    uno y recortados en los extremos: 'Engranes dañados ' y 'ENGRANES  DANADOS'
+    dan lo mismo.
+    """
+    text = unicodedata.normalize('NFKD', str(elemento).casefold())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _SPACES.sub(' ', text).strip()
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ElementoMatcher:
+    """Índice de los elementos del entrenamiento para buscarlos sin coincidencia exacta
+
+    Se construye una vez por foto del entrenamiento. La búsqueda normalizada es
+    un diccionario; la aproximada usa un índice invertido de trigramas: cada
+    trigrama guarda los elementos que lo contienen y la similitud (coeficiente
+    de Dice entre los conjuntos de trigramas) se calcula para todos los
+    candidatos a la vez con numpy, así que una consulta no recorre la lista de
+    elementos aunque haya decenas de miles.
+    """
+
+    def __init__(self, elementos, mode=MATCH_NORMALIZED, threshold=0.8):
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Modo de búsqueda de elementos inválido: {mode} (opciones: {', '.join(MATCH_MODES)})")
+        self.mode = mode
+        self.threshold = threshold
+        self.elementos = set(elementos)
+        # Clave normalizada -> elemento del entrenamiento (el primero en orden si varios coinciden)
+        self.by_key = {}
+        for elemento in sorted(self.elementos, key=str):
+            self.by_key.setdefault(normalize_elemento(elemento), elemento)
+        self._keys = list(self.by_key)
+        grams = [_trigrams(key) for key in self._keys]
+        self._gram_counts = np.array([len(key_grams) for key_grams in grams], dtype=np.int32)
+        postings = {}
+        for position, key_grams in enumerate(grams):
+            for gram in key_grams:
+                postings.setdefault(gram, []).append(position)
+        self._postings = {gram: np.array(positions, dtype=np.int32) for gram, positions in postings.items()}
+
+    def similar(self, elemento, limit=3):
+        """Elementos del entrenamiento más parecidos: lista de (elemento, similitud)"""
+        query = _trigrams(normalize_elemento(elemento))
+        hits = [self._postings[gram] for gram in query if gram in self._postings]
+        if not hits:
+            return []
+        shared = np.bincount(np.concatenate(hits), minlength=len(self._keys))
+        # Solo se puntúan los elementos que comparten algún trigrama con la consulta
+        candidates = np.flatnonzero(shared)
+        scores = 2.0 * shared[candidates] / (len(query) + self._gram_counts[candidates])
+        best = np.argsort(-scores, kind='stable')[:limit]
+        return [(self.by_key[self._keys[candidates[i]]], float(scores[i])) for i in best]
+
+    def suggest(self, elemento, limit=3):
+        """Sugerencias para un elemento faltante: las que superan el umbral de similitud"""
+        return [match for match, score in self.similar(elemento, limit) if score >= self.threshold]
+
+    def resolve(self, elemento):
+        """Elemento del entrenamiento que corresponde a elemento según el modo, o None"""
+        if elemento in self.elementos:
+            return elemento
+        if self.mode == MATCH_EXACT or elemento is None or elemento != elemento:
+            return None
+        match = self.by_key.get(normalize_elemento(elemento))
+        if match is None and self.mode == MATCH_FUZZY:
+            best = self.similar(elemento, limit=1)
+            if best and best[0][1] >= self.threshold:
+                match = best[0][0]
+        return match
@@ -0,0 +1,414 @@
+from collections import deque
+import json
+import math
+import os
+import threading
+import time
+import psutil
+
+
+class EventJournal:
+    """Diario de eventos de solo agregado en formato JSONL
+
+    Los eventos se acumulan en memoria y un hilo en segundo plano los agrega
+    al archivo cada flush_interval segundos (o antes si el búfer se llena), de
+    modo que registrar un evento no depende del tamaño del historial.
+    """
+
+    def __init__(self, path, flush_interval=2.0, max_buffer=1000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer = []
+        self._lock = threading.Lock()
+        # Serializa las escrituras al archivo con la consolidación (compact)
+        self._io_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def append(self, event):
+        with self._lock:
+            self._buffer.append(event)
+            full = len(self._buffer) >= self.max_buffer
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            if self._stopped.is_set():
+                return
+            self._thread = threading.Thread(target=self._run, name='metrics-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Agregar al archivo los eventos pendientes"""
+        with self._io_lock:
+            return self._flush_locked()
+
+    def _flush_locked(self):
+        with self._lock:
+            events, self._buffer = self._buffer, []
+        if not events:
+            return 0
+        lines = ''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in events)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+        return len(events)
+
+    def compact(self, write_snapshot):
+        """Consolidar: escribir la foto completa con write_snapshot() y vaciar el diario
+
+        El llamador debe garantizar que la foto incluye todos los eventos agregados.
+        """
+        with self._io_lock:
+            self._flush_locked()
+            write_snapshot()
+            with open(self.path, 'w', encoding='utf-8'):
+                pass
+
+    def read_events(self):
+        """Leer los eventos ya escritos; ignora una última línea incompleta"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Escritura interrumpida: el resto del archivo no es confiable
+                    return
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def close(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+
+
+def write_json_atomic(path, data, indent=None):
+    """Escribir un JSON completo sin dejar el archivo a medias si el proceso se interrumpe"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent)
+    os.replace(temp_path, path)
+
+
+class RunningStats:
+    """Conteo, suma, mínimo y máximo de una serie sin guardar sus valores"""
+
+    def __init__(self, count=0, total=0.0, minimum=None, maximum=None):
+        self.count = count
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    def merge(self, other):
+        for value in (other.minimum, other.maximum):
+            if value is not None:
+                self.minimum = value if self.minimum is None else min(self.minimum, value)
+                self.maximum = value if self.maximum is None else max(self.maximum, value)
+        self.count += other.count
+        self.total += other.total
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def to_dict(self):
+        return {'count': self.count, 'sum': self.total, 'min': self.minimum, 'max': self.maximum}
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(data.get('count', 0), data.get('sum', 0.0), data.get('min'), data.get('max'))
+
+
+class QuantileSketch:
+    """Sketch de cuantiles con error relativo acotado y fusionable (estilo DDSketch)
+
+    Cada valor positivo cae en una cubeta logarítmica de ancho relativo
+    2 * relative_accuracy; el cuantil estimado difiere del real en a lo sumo ese
+    error relativo. La cantidad de cubetas depende del rango de valores, no de
+    cuántos valores se agregan, y se limita a max_bins colapsando las menores.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_bins=2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value, count=1):
+        if value <= 0:
+            self.zero_count += count
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + count
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += count
+
+    def _collapse(self):
+        """Unir las cubetas más bajas para respetar max_bins"""
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins + 1
+        merged = sum(self.bins.pop(key) for key in keys[:excess])
+        target = keys[excess]
+        self.bins[target] = self.bins.get(target, 0) + merged
+
+    def merge(self, other):
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def quantile(self, q):
+        """Valor aproximado del cuantil q (0 <= q <= 1); None si no hay datos"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                # Punto medio (en escala relativa) de la cubeta
+                return 2 * self._gamma ** key / (self._gamma + 1)
+        return 2 * self._gamma ** max(self.bins) / (self._gamma + 1)
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'zero_count': self.zero_count,
+            'bins': {str(key): count for key, count in self.bins.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        sketch = cls(data.get('relative_accuracy', 0.01))
+        sketch.zero_count = data.get('zero_count', 0)
+        sketch.bins = {int(key): count for key, count in data.get('bins', {}).items()}
+        sketch.count = sketch.zero_count + sum(sketch.bins.values())
+        return sketch
+
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+class ResourceSampler:
+    """Muestreo en segundo plano de los recursos del proceso durante un trabajo
+
+    Un hilo toma cada interval segundos la memoria residente (RSS) y la
+    cantidad de hilos, y conserva solo el máximo: no guarda las muestras ni
+    escribe nada en disco. El tiempo de CPU y los bytes de E/S se leen al
+    empezar y al terminar. summary() devuelve un resumen compacto del trabajo.
+    Con interval en 0 o None no se crea el hilo y solo se miden los extremos.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self._process = psutil.Process()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._summary = None
+        self._stat_fd = None
+
+    def _io_counters(self):
+        # No disponible en todas las plataformas (por ejemplo, macOS)
+        try:
+            return self._process.io_counters()
+        except (AttributeError, psutil.Error):
+            return None
+
+    def _read_rss_threads(self):
+        """RSS en bytes y cantidad de hilos
+
+        En Linux se relee /proc/<pid>/stat con el descriptor abierto al empezar
+        (unos 10 µs); abrir el archivo en cada muestra, como hace psutil, cuesta
+        varias veces más después de que el hilo estuvo en espera.
+        """
+        if self._stat_fd is not None:
+            fields = os.pread(self._stat_fd, 1024, 0).rsplit(b')', 1)[1].split()
+            return int(fields[21]) * _PAGE_SIZE, int(fields[17])
+        return self._process.memory_info().rss, self._process.num_threads()
+
+    def _sample(self):
+        start = time.perf_counter()
+        rss, threads = self._read_rss_threads()
+        self.rss_peak = max(self.rss_peak, rss)
+        self.threads_max = max(self.threads_max, threads)
+        self.samples += 1
+        self.sample_seconds += time.perf_counter() - start
+        return rss
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.rss_peak = 0
+        self.threads_max = 0
+        self.samples = 0
+        self.sample_seconds = 0.0
+        self._summary = None
+        self._started_at = time.perf_counter()
+        try:
+            self._stat_fd = os.open(f"/proc/{os.getpid()}/stat", os.O_RDONLY)
+        except (OSError, AttributeError):
+            self._stat_fd = None
+        self._cpu_start = self._process.cpu_times()
+        self._io_start = self._io_counters()
+        self._rss_start = self._sample()
+        self._stopped.clear()
+        if self.interval:
+            self._thread = threading.Thread(target=self._run, name='resource-sampler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        rss_end = self._sample()
+        if self._stat_fd is not None:
+            os.close(self._stat_fd)
+            self._stat_fd = None
+        cpu_end = self._process.cpu_times()
+        io_end = self._io_counters()
+        mb = 1024 * 1024
+        self._summary = {
+            'seconds': round(time.perf_counter() - self._started_at, 3),
+            'cpu_seconds': round((cpu_end.user - self._cpu_start.user) + (cpu_end.system - self._cpu_start.system), 3),
+            'rss_start_mb': round(self._rss_start / mb, 1),
+            'rss_peak_mb': round(self.rss_peak / mb, 1),
+            'rss_end_mb': round(rss_end / mb, 1),
+            'threads_max': self.threads_max,
+            'read_mb': round((io_end.read_bytes - self._io_start.read_bytes) / mb, 3) if io_end else None,
+            'write_mb': round((io_end.write_bytes - self._io_start.write_bytes) / mb, 3) if io_end else None,
+            'samples': self.samples,
+            'sample_us': round(self.sample_seconds / self.samples * 1e6, 1)
+        }
+        return self._summary
+
+    def summary(self):
+        return self._summary
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.stop()
+        return False
+
+
+class ProgressTracker:
+    """Estado en vivo del lote en curso: cola, rendimiento y latencia por archivo
+
+    Solo guarda contadores y una ventana acotada de los últimos archivos
+    terminados. Cada cambio incrementa version y despierta a quien espera en
+    wait_for_change (por ejemplo, el servidor del dashboard).
+    """
+
+    def __init__(self, window=50):
+        self.version = 0
+        self._recent = deque(maxlen=window)
+        self._condition = threading.Condition()
+        self._reset(0, 0)
+
+    def _reset(self, total, workers):
+        self.total = total
+        self.workers = workers
+        self.done = 0
+        self.failed = 0
+        self.rows = 0
+        self.started_at = time.time() if total else None
+        self.finished_at = None
+        self.file_seconds = RunningStats()
+        self._recent.clear()
+
+    def _changed(self):
+        self.version += 1
+        self._condition.notify_all()
+
+    def start_batch(self, total, workers=1):
+        with self._condition:
+            self._reset(total, workers)
+            self._changed()
+
+    def file_done(self, result):
+        with self._condition:
+            self.done += 1
+            if result.get('status') == 'ok':
+                self.rows += result.get('output_rows') or 0
+            elif result.get('status') == 'error':
+                self.failed += 1
+            seconds = result.get('seconds') or 0
+            self.file_seconds.add(seconds)
+            self._recent.append((time.time(), seconds, result.get('file')))
+            if self.done >= self.total:
+                self.finished_at = time.time()
+            self._changed()
+
+    def snapshot(self):
+        with self._condition:
+            now = self.finished_at or time.time()
+            elapsed = now - self.started_at if self.started_at else 0
+            pending = self.total - self.done
+            running = min(pending, self.workers)
+            recent = [seconds for _, seconds, _ in self._recent]
+            return {
+                'version': self.version,
+                'active': bool(self.total) and self.finished_at is None,
+                'total': self.total,
+                'done': self.done,
+                'failed': self.failed,
+                'running': running,
+                'queue_depth': pending - running,
+                'elapsed_seconds': round(elapsed, 3),
+                'files_per_second': round(self.done / elapsed, 3) if elapsed else 0,
+                'rows_per_second': round(self.rows / elapsed, 1) if elapsed else 0,
+                'file_latency': {
+                    'mean': round(self.file_seconds.mean, 3),
+                    'max': round(self.file_seconds.maximum or 0, 3),
+                    'recent_mean': round(sum(recent) / len(recent), 3) if recent else 0
+                },
+                'last_file': self._recent[-1][2] if self._recent else None
+            }
+
+    def wait_for_change(self, version, timeout=None):
+        """Esperar a que version deje de ser la indicada; devuelve la versión actual"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
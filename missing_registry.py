@@ -0,0 +1,193 @@
+import bisect
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from itertools import islice
+import pandas as pd
+from metrics import EventJournal, write_json_atomic
+
+# Archivos de origen recientes que se guardan por elemento
+MAX_SOURCES_PER_ELEMENT = 20
+# Registros en el diario antes de consolidarlos en missing_elements.json
+COMPACT_EVENTS = 1000
+
+
+class MissingElementsRegistry:
+    """Registro de elementos sin entrenamiento con orden por fecha y por conteo
+
+    Cada elemento guarda primera y última fecha, cuántas veces se vio y los
+    últimos archivos donde apareció. Dos órdenes se mantienen al actualizar, de
+    modo que las consultas de los primeros N no ordenan el registro completo:
+
+    - por último avistamiento, con un OrderedDict que mueve al final cada
+      elemento actualizado (las fechas llegan en orden);
+    - por conteo, con cubetas conteo -> elementos y la lista ordenada de los
+      conteos existentes; un elemento solo pasa a la cubeta siguiente.
+
+    Los cambios se agregan a un diario JSONL en segundo plano (un registro por
+    lote) y cada COMPACT_EVENTS lotes se consolidan en el JSON completo, con el
+    mismo formato de missing_elements.json de siempre más los archivos de origen.
+    El archivo se carga la primera vez que se usa el registro, no al crearlo,
+    para que los procesos de trabajo no lo lean.
+    """
+
+    def __init__(self, path, journal_path=None, compact_events=COMPACT_EVENTS, flush_interval=2.0):
+        self.path = str(path)
+        self.compact_events = compact_events
+        self._lock = threading.RLock()
+        # elemento -> {'first_seen', 'last_seen', 'count', 'files'}, del más antiguo al más reciente
+        self._entries = OrderedDict()
+        # conteo -> elementos con ese conteo (en el orden en que lo alcanzaron)
+        self._buckets = {}
+        self._counts = []
+        self._events_since_compact = 0
+        self._loaded = False
+        self.journal = EventJournal(journal_path or f"{os.path.splitext(self.path)[0]}_events.jsonl",
+                                    flush_interval=flush_interval)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            elements = data.get('elements', {})
+            for elemento, info in sorted(elements.items(), key=lambda item: item[1]['last_seen']):
+                entry = {
+                    'first_seen': info['first_seen'],
+                    'last_seen': info['last_seen'],
+                    'count': info['count'],
+                    'files': list(info.get('files', []))
+                }
+                self._entries[elemento] = entry
+                self._add_to_bucket(elemento, entry['count'])
+        # Lotes que no llegaron a consolidarse; se guardan en la próxima consolidación
+        for event in self.journal.read_events():
+            self._apply(event['elementos'], event['timestamp'], event.get('source'))
+            self._events_since_compact += 1
+
+    def _add_to_bucket(self, elemento, count):
+        bucket = self._buckets.get(count)
+        if bucket is None:
+            bucket = self._buckets[count] = OrderedDict()
+            bisect.insort(self._counts, count)
+        bucket[elemento] = None
+
+    def _remove_from_bucket(self, elemento, count):
+        bucket = self._buckets[count]
+        del bucket[elemento]
+        if not bucket:
+            del self._buckets[count]
+            del self._counts[bisect.bisect_left(self._counts, count)]
+
+    def _apply(self, elementos, timestamp, source):
+        for elemento in elementos:
+            entry = self._entries.get(elemento)
+            if entry is None:
+                entry = {'first_seen': timestamp, 'last_seen': timestamp, 'count': 1, 'files': []}
+                self._entries[elemento] = entry
+            else:
+                self._remove_from_bucket(elemento, entry['count'])
+                entry['last_seen'] = timestamp
+                entry['count'] += 1
+                self._entries.move_to_end(elemento)
+            self._add_to_bucket(elemento, entry['count'])
+            if source is not None:
+                files = entry['files']
+                if source in files:
+                    files.remove(source)
+                files.append(source)
+                del files[:-MAX_SOURCES_PER_ELEMENT]
+
+    def upsert(self, elementos, source=None, timestamp=None, persist=True):
+        """Registrar un lote de elementos vistos juntos (por ejemplo, en un archivo)
+
+        Cada elemento suma uno a su conteo aunque aparezca varias veces en el lote.
+        Las celdas vacías (None, NaN o texto en blanco) no son elementos y se
+        ignoran. Con persist=False solo se actualiza la memoria (procesos de trabajo).
+        """
+        elementos = sorted({
+            str(elemento) for elemento in elementos
+            if not pd.isna(elemento) and str(elemento).strip()
+        })
+        if not elementos:
+            return 0
+        timestamp = timestamp or datetime.now().isoformat()
+        with self._lock:
+            self._ensure_loaded()
+            self._apply(elementos, timestamp, source)
+            if persist:
+                self.journal.append({'elementos': elementos, 'timestamp': timestamp, 'source': source})
+                self._events_since_compact += 1
+                if self._events_since_compact >= self.compact_events:
+                    self.save()
+        return len(elementos)
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._entries)
+
+    def __contains__(self, elemento):
+        with self._lock:
+            self._ensure_loaded()
+            return elemento in self._entries
+
+    def get(self, elemento):
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(elemento)
+            return dict(entry, files=list(entry['files'])) if entry else None
+
+    def _page(self, elementos, limit, offset):
+        stop = None if limit is None else offset + limit
+        return [
+            (elemento, dict(self._entries[elemento], files=list(self._entries[elemento]['files'])))
+            for elemento in islice(elementos, offset, stop)
+        ]
+
+    def recent(self, limit=None, offset=0):
+        """Elementos del último avistamiento más reciente al más antiguo: [(elemento, info)]"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._page(reversed(self._entries), limit, offset)
+
+    def most_frequent(self, limit=None, offset=0):
+        """Elementos del conteo mayor al menor (los empates, el más reciente primero)"""
+        def by_count():
+            for count in reversed(self._counts):
+                yield from reversed(self._buckets[count])
+
+        with self._lock:
+            self._ensure_loaded()
+            return self._page(by_count(), limit, offset)
+
+    def _state(self):
+        return {
+            'elements': {
+                elemento: {
+                    'first_seen': entry['first_seen'],
+                    'last_seen': entry['last_seen'],
+                    'count': entry['count'],
+                    'files': entry['files']
+                }
+                for elemento, entry in self._entries.items()
+            },
+            'total_count': len(self._entries)
+        }
+
+    def save(self):
+        """Consolidar el registro completo en el JSON y vaciar el diario"""
+        with self._lock:
+            if not self._loaded:
+                return
+            self.journal.compact(lambda: write_json_atomic(self.path, self._state(), indent=4))
+            self._events_since_compact = 0
+
+    def close(self):
+        self.journal.close()
+        if self._events_since_compact:
+            self.save()
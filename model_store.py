@@ -0,0 +1,188 @@
+import json
+import os
+import re
+import threading
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager
+import joblib
+from logger import system_logger
+
+MODELS_FILE = 'modelos/models.joblib'
+ENCODERS_FILE = 'modelos/encoders.joblib'
+ARTIFACTS_DIR = 'modelos/columnas'
+MANIFEST_FILE = 'manifest.json'
+# Candado de la generación: un proceso a la vez; se descarta si quedó más de
+# BUILD_LOCK_STALE_SECONDS de un proceso que terminó sin borrarlo
+BUILD_LOCK_FILE = '.build.lock'
+BUILD_LOCK_STALE_SECONDS = 300
+
+
+def _artifact_name(index, column):
+    """Nombre de archivo seguro para el modelo de una columna"""
+    slug = re.sub(r'[^0-9A-Za-z]+', '_', column).strip('_').lower()
+    return f"{index:02d}_{slug}.joblib"
+
+
+def _source_key(path):
+    stat = os.stat(path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def _read_manifest(source=MODELS_FILE, target_dir=ARTIFACTS_DIR):
+    """Manifiesto de los archivos por columna, o None si no existe o models.joblib cambió"""
+    manifest_path = os.path.join(target_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if os.path.exists(source) and manifest.get('source_key') != _source_key(source):
+        return None
+    return manifest
+
+
+@contextmanager
+def _build_lock(target_dir, poll_interval=0.1):
+    """Esperar a que ningún otro proceso esté generando los archivos de target_dir
+
+    El candado es un archivo creado con O_EXCL, que se comporta igual en
+    Windows y en Linux.
+    """
+    path = os.path.join(target_dir, BUILD_LOCK_FILE)
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > BUILD_LOCK_STALE_SECONDS:
+                    os.remove(path)
+                    continue
+            except OSError:
+                # Se liberó mientras se revisaba: volver a intentarlo
+                continue
+            time.sleep(poll_interval)
+    try:
+        os.write(fd, str(os.getpid()).encode('ascii'))
+        os.close(fd)
+        yield
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _dump_atomic(value, path):
+    """Escribir un archivo joblib completo o ninguno: un lector nunca ve uno a medias"""
+    temp_path = path + '.tmp'
+    try:
+        joblib.dump(value, temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def build_model_artifacts(source=MODELS_FILE, target_dir=ARTIFACTS_DIR):
+    """Separar models.joblib en un archivo sin comprimir por columna
+
+    Así cada proceso deserializa solo los modelos de las columnas que usa, en
+    lugar de models.joblib completo. No se abren con mmap_mode: los árboles de
+    sklearn copian sus arreglos al deserializarse, de modo que el mapeo no
+    ahorraría memoria y solo dejaría el archivo abierto.
+
+    Si varios procesos lo necesitan a la vez, uno genera los archivos y los
+    demás esperan y usan su manifiesto. Cada archivo se escribe aparte y se
+    reemplaza de una vez, y el manifiesto al final, así que un proceso que
+    carga un modelo mientras otro genera nunca lee un archivo incompleto.
+    """
+    try:
+        os.makedirs(target_dir, exist_ok=True)
+        with _build_lock(target_dir):
+            manifest = _read_manifest(source, target_dir)
+            if manifest is not None:
+                # Otro proceso terminó de generarlos mientras se esperaba el candado
+                return manifest
+            models = joblib.load(source)
+            columns = {}
+            for index, (column, model) in enumerate(models.items()):
+                filename = _artifact_name(index, column)
+                _dump_atomic(model, os.path.join(target_dir, filename))
+                columns[column] = filename
+            manifest = {'source': source, 'source_key': _source_key(source), 'columns': columns}
+            manifest_path = os.path.join(target_dir, MANIFEST_FILE)
+            temp_path = manifest_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=4, ensure_ascii=False)
+            os.replace(temp_path, manifest_path)
+        system_logger.logger.info(f"Model artifacts built for {len(columns)} columns in {target_dir}")
+        return manifest
+    except Exception as e:
+        system_logger.log_error(e, f"Error building model artifacts from: {source}")
+        raise
+
+
+class ModelRegistry(Mapping):
+    """Registro de modelos por columna que se cargan bajo demanda
+
+    Se comporta como el diccionario de models.joblib, pero cada modelo se lee
+    de su archivo la primera vez que se usa y queda residente para el
+    resto del proceso. Las claves salen del manifiesto sin cargar ningún modelo.
+    """
+
+    def __init__(self, source=MODELS_FILE, artifacts_dir=ARTIFACTS_DIR, encoders_path=ENCODERS_FILE):
+        self.source = source
+        self.artifacts_dir = artifacts_dir
+        self.encoders_path = encoders_path
+        self._manifest = None
+        self._models = {}
+        self._encoders = None
+        self._lock = threading.RLock()
+
+    def _load_manifest(self):
+        manifest = _read_manifest(self.source, self.artifacts_dir)
+        if manifest is not None:
+            return manifest
+        # No existe o models.joblib cambió desde la última conversión
+        system_logger.logger.info("Building model artifacts from models.joblib")
+        return build_model_artifacts(self.source, self.artifacts_dir)
+
+    @property
+    def manifest(self):
+        with self._lock:
+            if self._manifest is None:
+                self._manifest = self._load_manifest()
+            return self._manifest
+
+    def __getitem__(self, column):
+        with self._lock:
+            if column not in self._models:
+                filename = self.manifest['columns'][column]
+                path = os.path.join(self.artifacts_dir, filename)
+                self._models[column] = joblib.load(path)
+                system_logger.logger.info(f"Model loaded for column: {column!r}")
+            return self._models[column]
+
+    def __contains__(self, column):
+        # Mapping.__contains__ usaría __getitem__ y cargaría el modelo
+        return column in self.manifest['columns']
+
+    def __iter__(self):
+        return iter(self.manifest['columns'])
+
+    def __len__(self):
+        return len(self.manifest['columns'])
+
+    @property
+    def encoders(self):
+        with self._lock:
+            if self._encoders is None:
+                self._encoders = joblib.load(self.encoders_path)
+            return self._encoders
+
+    def loaded_columns(self):
+        return list(self._models)
+
+
+model_registry = ModelRegistry()
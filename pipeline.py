@@ -0,0 +1,106 @@
+import os
+import threading
+from collections import OrderedDict
+from config import Config
+from file_io import read_table
+
+
+class InputCache:
+    """Caché LRU de archivos ya leídos, invalidada por (mtime, tamaño)
+
+    Permite que la vista previa, la validación, la predicción y el guardado
+    compartan el mismo DataFrame en lugar de volver a leer el archivo.
+    """
+
+    def __init__(self, max_entries=4):
+        self.max_entries = max_entries
+        self.enabled = True
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _file_key(path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def peek(self, path):
+        """Devolver el DataFrame en caché si sigue vigente, sin leer el archivo"""
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is None:
+            return None
+        try:
+            if self._file_key(path) != entry[0]:
+                self.evict(path)
+                return None
+        except OSError:
+            self.evict(path)
+            return None
+        with self._lock:
+            self._entries.move_to_end(path)
+        return entry[1]
+
+    def put(self, path, df):
+        if not self.enabled:
+            return
+        path = os.path.abspath(path)
+        key = self._file_key(path)
+        with self._lock:
+            self._entries[path] = (key, df)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, path):
+        """Obtener el DataFrame del archivo, leyéndolo solo si no está en caché"""
+        df = self.peek(path)
+        if df is None:
+            df = read_table(path)
+            self.put(path, df)
+        return df
+
+    def evict(self, path):
+        with self._lock:
+            self._entries.pop(os.path.abspath(path), None)
+
+
+input_cache = InputCache()
+
+
+def should_stream(path):
+    """Decidir si un archivo se procesa por bloques según su tamaño"""
+    threshold_mb = Config().get('stream_threshold_mb')
+    return (
+        path.endswith(('.csv', '.xlsx'))
+        and threshold_mb is not None
+        and os.path.getsize(path) >= threshold_mb * 1024 * 1024
+    )
+
+
+class FilePipeline:
+    """Archivo de entrada leído una sola vez y compartido entre las etapas
+
+    La vista previa toma el DataFrame de input_cache, y la validación con
+    plantilla y predict.process_file lo vuelven a encontrar ahí. Los archivos
+    que se procesan por bloques no se cargan completos: la vista previa lee
+    solo las primeras filas.
+    """
+
+    def __init__(self, path, cache=None):
+        self.path = path
+        self.cache = cache or input_cache
+
+    @property
+    def streamed(self):
+        return should_stream(self.path)
+
+    @property
+    def frame(self):
+        return self.cache.get(self.path)
+
+    def preview(self, nrows=100):
+        """Primeras filas del archivo; deja el archivo completo en caché si es pequeño"""
+        if self.streamed:
+            return read_table(self.path, nrows=nrows)
+        return self.frame.head(nrows)
@@ -1,35 +1,48 @@
 import pandas as pd
-import joblib
 import os
 import glob
 import shutil
 import time
-from tkinter import messagebox
 from logger import system_logger
+from config import Config
+from metrics import ResourceSampler
+from tracing import flatten, format_trace, profile_run, span, traced_iter
+from file_io import (
+    COLUMNAR_FORMATS, ArrowTableWriter, columnar_available, conform_dtypes, iter_table_chunks, open_table_writer,
+    sidecar_path, write_columnar_sidecar, write_table
+)
+from pipeline import input_cache, should_stream
+from preview import discard_preview_cache
+from training import get_training_index
+from model_store import model_registry
 
 def load_models():
-    """Cargar modelos y encoders guardados"""
+    """Obtener los modelos y encoders guardados
+    
+    Los modelos se cargan bajo demanda por columna desde el registro del proceso,
+    así que esta llamada no lee ningún modelo hasta que se usa.
+    """
     try:
-        models = joblib.load('modelos/models.joblib')
-        encoders = joblib.load('modelos/encoders.joblib')
-        system_logger.logger.info("Models and encoders loaded successfully")
+        models = model_registry
+        encoders = model_registry.encoders
+        system_logger.logger.info("Models and encoders ready")
         return models, encoders
     except Exception as e:
         system_logger.log_error(e, "Error loading models and encoders")
         raise
 
-def validate_elementos(df_input):
-    """Validar que los elementos existan en el archivo de entrenamiento"""
+def validate_elementos(df_input, training=None):
+    """Validar que los elementos existan en el archivo de entrenamiento
+    
+    Un elemento existe si se resuelve a uno del entrenamiento (ver
+    TrainingIndex.resolve); el aviso de los faltantes incluye sugerencias.
+    """
     try:
-        df_train = pd.read_csv('entrenador/entrenador001.csv')
-        elementos_train = set(df_train['Elemento'].unique())
-        elementos_input = set(df_input['Elemento'].unique())
-        
-        elementos_faltantes = elementos_input - elementos_train
+        training = training or get_training_index()
+        elementos_faltantes = training.missing(df_input['Elemento'])
         
         if elementos_faltantes:
-            mensaje = "Los siguientes elementos no existen en el archivo de entrenamiento:\n"
-            mensaje += "\n".join(sorted(elementos_faltantes))
+            mensaje = missing_elements_message(elementos_faltantes, training.suggestions(elementos_faltantes))
             system_logger.logger.warning(mensaje)
             return False, mensaje, elementos_faltantes
         
@@ -38,39 +51,87 @@ def validate_elementos(df_input):
         system_logger.log_error(e, "Error validando elementos")
         raise
 
-def predict_single(elemento, models, encoders):
-    """Hacer predicción para un solo elemento"""
+def missing_elements_message(elementos_faltantes, sugerencias=None):
+    """Construir el aviso de elementos inexistentes en el entrenamiento
+    
+    sugerencias (elemento -> elementos parecidos del entrenamiento) se agregan
+    junto a cada faltante.
+    """
+    sugerencias = sugerencias or {}
+    lineas = []
+    for elemento in sorted(elementos_faltantes, key=str):
+        if elemento in sugerencias:
+            lineas.append(f"{elemento} (¿quiso decir {' o '.join(repr(s) for s in sugerencias[elemento])}?)")
+        else:
+            lineas.append(str(elemento))
+    mensaje = "Los siguientes elementos no existen en el archivo de entrenamiento:\n"
+    mensaje += "\n".join(lineas)
+    return mensaje
+
+def predict_batch(elementos, models, encoders, training=None):
+    """Hacer predicciones para una lista de elementos en bloque
+    
+    Los elementos repetidos se predicen una sola vez: se codifican todos los
+    únicos en una llamada, cada modelo predice una vez sobre el bloque y los
+    resultados se reparten de vuelta a las filas de entrada. Los elementos que
+    no existen en el entrenamiento quedan con valores vacíos.
+    """
     start_time = time.time()
     try:
-        # Verificar si el elemento existe en el entrenamiento
-        df_train = pd.read_csv('entrenador/entrenador001.csv')
-        if elemento not in df_train['Elemento'].unique():
-            # Retornar diccionario con valores vacíos para todas las columnas
-            predictions = {column: "" for column in models.keys() if column != 'Elemento'}
-            execution_time = time.time() - start_time
-            system_logger.logger.warning(f"Elemento no encontrado en entrenamiento: {elemento}")
-            return predictions
+        training = training or get_training_index()
+        columns = [column for column in models.keys() if column != 'Elemento']
+        elementos = pd.Series(elementos, dtype=object).reset_index(drop=True)
+        
+        # Deduplicar: codes indica qué elemento único corresponde a cada fila
+        codes, uniques = pd.factorize(elementos)
+        uniques = list(uniques)
+        resolved = training.resolve(uniques)
+        known = [resolved[elemento] is not None for elemento in uniques]
+        faltantes = [elemento for elemento, is_known in zip(uniques, known) if not is_known]
+        if faltantes:
+            system_logger.logger.warning(
+                f"{len(faltantes)} elementos no encontrados en entrenamiento: {', '.join(map(str, faltantes))}"
+            )
+        
+        # Valores vacíos para los únicos desconocidos y una fila extra para los nulos (code -1)
+        unique_predictions = pd.DataFrame("", index=range(len(uniques) + 1), columns=columns, dtype=object)
+        known_positions = [i for i, is_known in enumerate(known) if is_known]
+        if known_positions:
+            known_elementos = [resolved[uniques[i]] for i in known_positions]
+            sin_codificar = [elemento for elemento in known_elementos if elemento not in training.encoder_view]
+            encoded_extra = dict(zip(sin_codificar, encoders['input'].transform(sin_codificar))) if sin_codificar else {}
+            encoded = [training.encoder_view.get(elemento, encoded_extra.get(elemento)) for elemento in known_elementos]
+            features = pd.DataFrame({'Elemento': encoded})
             
-        elemento_encoded = encoders['input'].transform([elemento])
+            for column in columns:
+                model = models[column]
+                # Los modelos entrenados con nombres de columna los esperan en la entrada
+                X = features if hasattr(model, 'feature_names_in_') else features.to_numpy()
+                pred_encoded = model.predict(X)
+                unique_predictions.loc[known_positions, column] = encoders['output'][column].inverse_transform(pred_encoded)
         
-        predictions = {}
-        for column, model in models.items():
-            if column != 'Elemento':
-                pred_encoded = model.predict([elemento_encoded])[0]
-                predictions[column] = encoders['output'][column].inverse_transform([pred_encoded])[0]
+        # Repartir los resultados a cada fila de entrada
+        codes[codes < 0] = len(uniques)
+        predictions = unique_predictions.iloc[codes].reset_index(drop=True)
+        predictions.insert(0, 'Elemento', elementos)
         
         execution_time = time.time() - start_time
-        system_logger.log_prediction(elemento, predictions, execution_time)
+        system_logger.log_batch_prediction(len(elementos), len(known_positions), execution_time)
         return predictions
     except Exception as e:
-        system_logger.log_error(e, f"Error predicting for elemento: {elemento}")
+        system_logger.log_error(e, f"Error predicting batch of {len(elementos)} elementos")
         raise
 
-def get_training_combinations(elemento):
+def predict_single(elemento, models, encoders, training=None):
+    """Hacer predicción para un solo elemento"""
+    predictions = predict_batch([elemento], models, encoders, training)
+    return predictions.drop(columns='Elemento').iloc[0].to_dict()
+
+def get_training_combinations(elemento, training=None):
     """Obtener todas las combinaciones existentes del elemento en datos de entrenamiento"""
     try:
-        df_train = pd.read_csv('entrenador/entrenador001.csv')
-        return df_train[df_train['Elemento'] == elemento].to_dict('records')
+        training = training or get_training_index()
+        return training.get_combinations(elemento)
     except Exception as e:
         system_logger.log_error(e, "Error getting training combinations")
         raise
@@ -90,22 +151,19 @@ def move_to_backup(input_file):
     """Mover el archivo de entrada a la carpeta backup"""
     try:
         filename = os.path.basename(input_file)
+        os.makedirs('backup', exist_ok=True)
         backup_path = os.path.join('backup', filename)
         shutil.move(input_file, backup_path)
+        discard_preview_cache(input_file)
         system_logger.logger.info(f"File moved to backup: {filename}")
     except Exception as e:
         system_logger.log_error(e, f"Error moving file to backup: {input_file}")
         raise
 
 def read_input_file(file_path):
-    """Leer archivo de entrada en formato CSV o XLSX"""
+    """Leer archivo de entrada en formato CSV o XLSX, reutilizando la lectura previa si existe"""
     try:
-        if file_path.endswith('.csv'):
-            return pd.read_csv(file_path)
-        elif file_path.endswith('.xlsx'):
-            return pd.read_excel(file_path)
-        else:
-            raise ValueError("Formato de archivo no soportado")
+        return input_cache.get(file_path)
     except Exception as e:
         system_logger.log_error(e, f"Error reading input file: {file_path}")
         raise
@@ -113,80 +171,241 @@ def read_input_file(file_path):
 def save_predictions(df_predictions, output_path):
     """Guardar predicciones en el mismo formato que el archivo de entrada"""
     try:
-        if output_path.endswith('.csv'):
-            df_predictions.to_csv(output_path, index=False)
-        elif output_path.endswith('.xlsx'):
-            df_predictions.to_excel(output_path, index=False)
+        write_table(df_predictions, output_path)
         system_logger.logger.info(f"Predictions saved to: {output_path}")
     except Exception as e:
         system_logger.log_error(e, f"Error saving predictions to: {output_path}")
         raise
 
-def main():
-    start_time = time.time()
-    system_logger.log_performance()
+def wants_sidecar(output_path):
+    """Las salidas CSV/XLSX llevan una copia Parquet si pyarrow está instalado"""
+    return Config().get('columnar_sidecar') and not output_path.endswith(COLUMNAR_FORMATS)
+
+def save_sidecar(df_predictions, output_path):
+    """Guardar la copia columnar de la salida; si falla, la salida sigue siendo válida"""
+    try:
+        sidecar = write_columnar_sidecar(df_predictions, output_path)
+        if sidecar:
+            system_logger.logger.info(f"Columnar sidecar saved to: {sidecar}")
+    except Exception as e:
+        system_logger.log_error(e, f"Error saving columnar sidecar for: {output_path}")
+
+def prediction_dtypes(training):
+    """Tipos fijos de las columnas numéricas de la salida
+    
+    Un elemento sin entrenamiento deja vacías las columnas numéricas, que así
+    pasan de enteros a float64 solo en los bloques o archivos que lo tienen.
+    Se escriben siempre como float64 para que la salida no dependa de eso
+    (1.0 en todas las filas, con o sin procesamiento por bloques).
+    """
+    return {
+        column: pd.api.types.pandas_dtype('float64')
+        for column, dtype in training.data.dtypes.items()
+        if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_float_dtype(dtype)
+    }
+
+def expand_predictions(df_input, training):
+    """Expandir las filas de entrada con sus combinaciones de entrenamiento"""
+    # Cada elemento se expande con todas sus combinaciones de entrenamiento;
+    # los que no existen quedan con los campos vacíos
+    df_predictions = training.expand(df_input['Elemento'])
+    
+    # Reordenar columnas para mantener el mismo orden que el archivo original
+    if not df_predictions.empty:
+        column_order = ['Elemento'] + [col for col in df_input.columns if col != 'Elemento']
+        df_predictions = df_predictions.reindex(columns=column_order)
+    return conform_dtypes(df_predictions, prediction_dtypes(training))
+
+def _write_sidecar_chunk(sidecar_writer, df_predictions, output_path):
+    """Agregar un bloque a la copia columnar; si falla se abandona solo la copia"""
+    try:
+        sidecar_writer.write(df_predictions)
+        return sidecar_writer
+    except Exception as e:
+        system_logger.log_error(e, f"Error saving columnar sidecar for: {output_path}")
+        sidecar_writer.close()
+        os.remove(sidecar_writer.path)
+        return None
+
+def process_streaming(input_file, output_path, training, chunk_rows=None):
+    """Procesar un archivo por bloques escribiendo la salida a medida que avanza
     
+    La memoria usada depende del tamaño del bloque y no del archivo. La salida se
+    escribe en un archivo temporal que reemplaza al definitivo al terminar.
+    """
+    chunk_rows = chunk_rows or Config().get('stream_chunk_rows')
+    temp_path = output_path + '.part'
+    # La copia Parquet se escribe en paralelo con la salida, bloque a bloque
+    sidecar = sidecar_path(output_path, '.parquet') if wants_sidecar(output_path) and columnar_available() else None
+    sidecar_writer = None
+    input_rows = 0
+    total_lines = 0
+    elementos_faltantes = set()
     try:
-        # Obtener archivo de entrada
-        input_file = get_input_file()
-        df_input = read_input_file(input_file)
-        input_filename = os.path.basename(input_file)
+        output_format = os.path.splitext(output_path)[1]
+        # Los tipos del entrenamiento se conocen antes del primer bloque: un bloque
+        # sin elementos conocidos no convierte en texto las columnas numéricas
+        dtypes = {**training.data.dtypes.to_dict(), **prediction_dtypes(training)}
+        if sidecar:
+            os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+            sidecar_writer = ArrowTableWriter(sidecar + '.part', dtypes=dtypes)
+        with span('process_streaming') as stage, \
+                open_table_writer(temp_path, file_format=output_format, dtypes=dtypes) as writer:
+            for df_chunk in traced_iter(iter_table_chunks(input_file, chunk_rows), 'read_chunk'):
+                with span('validate_elementos', rows=len(df_chunk)):
+                    elementos_faltantes |= training.missing(df_chunk['Elemento'])
+                with span('expand_predictions') as expand_stage:
+                    df_predictions = expand_predictions(df_chunk, training)
+                    expand_stage.add(rows=len(df_predictions))
+                with span('write_chunk', rows=len(df_predictions)):
+                    writer.write(df_predictions)
+                if sidecar_writer:
+                    with span('save_sidecar', rows=len(df_predictions)):
+                        sidecar_writer = _write_sidecar_chunk(sidecar_writer, df_predictions, output_path)
+                input_rows += len(df_chunk)
+                total_lines += len(df_predictions)
+            stage.add(rows=input_rows, bytes=os.path.getsize(input_file))
+        os.replace(temp_path, output_path)
+        if sidecar_writer:
+            # Se cierra después de la salida para que la copia quede más reciente
+            sidecar_writer.close()
+            sidecar_writer = None
+            os.replace(sidecar + '.part', sidecar)
+        system_logger.logger.info(f"Predictions streamed to: {output_path} ({input_rows} rows in chunks of {chunk_rows})")
+        return input_rows, total_lines, elementos_faltantes
+    except Exception as e:
+        if sidecar_writer:
+            sidecar_writer.close()
+        for path in (temp_path, sidecar and sidecar + '.part'):
+            if path and os.path.exists(path):
+                os.remove(path)
+        system_logger.log_error(e, f"Error streaming predictions for: {input_file}")
+        raise
+
+def report_missing_elements(mensaje, elementos_faltantes, notify=None, source=None):
+    """Avisar de los elementos faltantes y registrarlos para el dashboard
+    
+    notify(titulo, mensaje) permite a la interfaz gráfica mostrar el aviso; sin
+    él solo queda en el log, de modo que este módulo no depende de tkinter.
+    source es el archivo donde aparecieron.
+    """
+    if notify:
+        notify("Elementos No Encontrados", mensaje)
+    else:
+        system_logger.logger.warning(mensaje)
+    # Registrar elementos faltantes para el dashboard
+    system_logger.log_missing_elements(elementos_faltantes, source=source)
+
+def output_path_for(input_file, output_dir='salida', output_format=None):
+    """Ruta de salida de un archivo: mismo nombre, en output_dir y con el formato indicado"""
+    filename = os.path.basename(input_file)
+    if output_format:
+        filename = f"{os.path.splitext(filename)[0]}.{output_format.lstrip('.')}"
+    return os.path.join(output_dir, filename)
+
+def process_file(input_file, training=None, df_input=None, output_dir='salida', output_format=None, backup=True):
+    """Procesar un archivo de entrada y moverlo a backup
+    
+    No registra métricas ni muestra avisos para poder ejecutarse en procesos
+    de trabajo; devuelve un resumen que el llamador registra. df_input evita
+    volver a leer un archivo que ya se leyó (por ejemplo, para la vista previa).
+    output_format ('csv', 'xlsx' o 'json') cambia el formato de salida, que por
+    defecto es el de entrada; backup=False deja el archivo de entrada en su lugar.
+    El resumen incluye en 'resources' la memoria máxima, el tiempo de CPU, la E/S
+    y los hilos del proceso mientras se procesó el archivo (ResourceSampler cada
+    resource_sample_interval segundos, sin escribir nada en disco) y en 'trace'
+    el árbol de etapas con su duración, filas y bytes (tracing.span).
+    """
+    with span('process_file') as stage, profile_run(os.path.basename(input_file)), \
+            ResourceSampler(Config().get('resource_sample_interval')) as sampler:
+        result = _process_file(input_file, training, df_input, output_dir, output_format, backup)
+    result['resources'] = sampler.summary()
+    result['trace'] = stage.to_dict()
+    return result
+
+def _process_file(input_file, training, df_input, output_dir, output_format, backup):
+    # Tomar una foto del entrenamiento: todo el archivo se procesa con ella
+    # aunque el entrenamiento se recargue a mitad del proceso
+    with span('get_training_index'):
+        training = training or get_training_index()
+    input_filename = os.path.basename(input_file)
+    output_file = output_path_for(input_file, output_dir, output_format)
+    os.makedirs(output_dir, exist_ok=True)
+    
+    if should_stream(input_file) and output_file.endswith(('.csv', '.xlsx') + COLUMNAR_FORMATS):
+        # Archivos grandes: leer, expandir y escribir por bloques
+        input_rows, total_lines, elementos_faltantes = process_streaming(input_file, output_file, training)
+        if elementos_faltantes:
+            system_logger.logger.warning(
+                missing_elements_message(elementos_faltantes, training.suggestions(elementos_faltantes))
+            )
+    else:
+        if df_input is None:
+            with span('read_input_file') as stage:
+                df_input = read_input_file(input_file)
+                stage.add(rows=len(df_input), bytes=os.path.getsize(input_file))
         
         # Validar elementos antes de procesar
-        valid, mensaje, elementos_faltantes = validate_elementos(df_input)
-        if not valid:
-            try:
-                messagebox.showwarning("Elementos No Encontrados", mensaje)
-            except:
-                system_logger.logger.warning(mensaje)
-            # Registrar elementos faltantes para el dashboard
-            system_logger.log_missing_elements(elementos_faltantes)
+        with span('validate_elementos', rows=len(df_input)):
+            valid, mensaje, elementos_faltantes = validate_elementos(df_input, training)
         
-        # Cargar modelos y encoders
-        models, encoders = load_models()
-        
-        # Realizar predicciones
-        results = []
-        for _, row in df_input.iterrows():
-            elemento = row['Elemento']
-            # Obtener todas las combinaciones existentes del elemento en el entrenamiento
-            combinations = get_training_combinations(elemento)
+        # Realizar predicciones y guardarlas
+        with span('expand_predictions') as stage:
+            df_predictions = expand_predictions(df_input, training)
+            stage.add(rows=len(df_predictions))
+        with span('save_predictions', rows=len(df_predictions)) as stage:
+            save_predictions(df_predictions, output_file)
+            stage.add(bytes=os.path.getsize(output_file))
+        if wants_sidecar(output_file):
+            with span('save_sidecar', rows=len(df_predictions)):
+                save_sidecar(df_predictions, output_file)
+        input_rows, total_lines = len(df_input), len(df_predictions)
+        # La vista previa de la salida usa este mismo DataFrame
+        input_cache.put(output_file, df_predictions)
+    
+    # Mover archivo de entrada a backup
+    if backup:
+        with span('move_to_backup'):
+            move_to_backup(input_file)
+    input_cache.evict(input_file)
+    
+    return {
+        'file': input_filename,
+        'output_file': output_file,
+        'input_rows': input_rows,
+        'output_rows': total_lines,
+        'missing_elements': elementos_faltantes,
+        'suggestions': training.suggestions(elementos_faltantes)
+    }
+
+def main(input_file=None, notify=None):
+    start_time = time.time()
+    
+    try:
+        with span('main') as run:
+            # Obtener archivo de entrada
+            input_file = input_file or get_input_file()
+            result = process_file(input_file)
             
-            if combinations:
-                # Si existen combinaciones en el entrenamiento, usar todas
-                for combination in combinations:
-                    results.append(combination)
-            else:
-                # Si no existe en el entrenamiento, generar una fila con campos vacíos
-                predictions = {column: "" for column in models.keys() if column != 'Elemento'}
-                predictions['Elemento'] = elemento
-                results.append(predictions)
-        
-        # Crear DataFrame con resultados
-        df_predictions = pd.DataFrame(results)
-        
-        # Reordenar columnas para mantener el mismo orden que el archivo original
-        if not df_predictions.empty:
-            column_order = ['Elemento'] + [col for col in df_input.columns if col != 'Elemento']
-            df_predictions = df_predictions[column_order]
-        
-        # Guardar predicciones
-        output_file = os.path.join('salida', os.path.basename(input_file))
-        save_predictions(df_predictions, output_file)
-        
-        # Registrar métricas
-        total_lines = len(df_predictions)
-        system_logger.log_file_processed(input_filename, len(df_input), total_lines)
-        
-        # Mover archivo de entrada a backup
-        move_to_backup(input_file)
-        
-        # Generar dashboard actualizado
-        dashboard_path = system_logger.generate_html_dashboard()
-        system_logger.logger.info(f"Dashboard actualizado en: {dashboard_path}")
+            if result['missing_elements']:
+                with span('report_missing_elements'):
+                    mensaje = missing_elements_message(result['missing_elements'], result['suggestions'])
+                    report_missing_elements(mensaje, result['missing_elements'], notify, source=result['file'])
+            
+            # Registrar métricas
+            system_logger.log_file_processed(
+                result['file'], result['input_rows'], result['output_rows'], result['resources'], flatten(result['trace'])
+            )
+            
+            # Generar dashboard actualizado
+            with span('generate_html_dashboard'):
+                dashboard_path = system_logger.generate_html_dashboard()
+            system_logger.logger.info(f"Dashboard actualizado en: {dashboard_path}")
         
         execution_time = time.time() - start_time
         system_logger.logger.info(f"Total execution time: {execution_time:.2f} seconds")
+        system_logger.logger.info(f"Stage timings:\n{format_trace(run.to_dict())}")
+        return result
         
     except Exception as e:
         system_logger.log_error(e, "Error in main execution")
@@ -0,0 +1,282 @@
+import bisect
+import hashlib
+import io
+import os
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict
+import pandas as pd
+from file_io import SIDECAR_DIR, CsvTableWriter, columnar_sidecar, iter_table_chunks
+from pipeline import FilePipeline, should_stream
+
+# Filas por página leída del archivo y páginas que se conservan en memoria
+PAGE_ROWS = 500
+MAX_CACHED_PAGES = 8
+# Copias CSV de los XLSX grandes: en la carpeta de la aplicación, fuera de la
+# carpeta de entrada vigilada, y a lo sumo PREVIEW_CACHE_KEEP a la vez
+PREVIEW_CACHE_DIR = os.path.join(SIDECAR_DIR, 'preview')
+PREVIEW_CACHE_KEEP = 8
+
+
+def _preview_cache_prefix(path):
+    return hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16] + '_'
+
+
+def preview_cache_path(path):
+    """Ruta de la copia CSV de un archivo según su ruta, tamaño y fecha (ns)
+
+    Otro archivo que llegue con el mismo nombre tiene otra clave aunque
+    conserve una fecha anterior, salvo que coincidan también en tamaño.
+    """
+    stat = os.stat(path)
+    return os.path.join(PREVIEW_CACHE_DIR, f"{_preview_cache_prefix(path)}{stat.st_size}_{stat.st_mtime_ns}.csv")
+
+
+def discard_preview_cache(path):
+    """Borrar las copias CSV de un archivo (por ejemplo, al moverlo a backup)"""
+    prefix = _preview_cache_prefix(path)
+    try:
+        entries = [entry for entry in os.scandir(PREVIEW_CACHE_DIR) if entry.name.startswith(prefix)]
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def _prune_preview_cache(keep=PREVIEW_CACHE_KEEP):
+    copies = sorted(
+        (entry for entry in os.scandir(PREVIEW_CACHE_DIR) if entry.name.endswith('.csv')),
+        key=lambda entry: entry.stat().st_mtime_ns
+    )
+    for entry in copies[:-keep]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def build_csv_sidecar(path, chunk_rows=PAGE_ROWS * 20):
+    """Convertir un XLSX a una copia CSV por bloques, sin cargarlo completo"""
+    sidecar = preview_cache_path(path)
+    if os.path.exists(sidecar):
+        return sidecar
+    # Las copias de versiones anteriores del mismo archivo ya no sirven
+    discard_preview_cache(path)
+    os.makedirs(PREVIEW_CACHE_DIR, exist_ok=True)
+    temp_path = f"{sidecar}.{os.getpid()}.part"
+    with CsvTableWriter(temp_path) as writer:
+        for df_chunk in iter_table_chunks(path, chunk_rows):
+            writer.write(df_chunk)
+    os.replace(temp_path, sidecar)
+    _prune_preview_cache()
+    return sidecar
+
+
+class CsvRowIndex:
+    """Desplazamientos en bytes del inicio de cada página de filas de un CSV
+
+    Se construye recorriendo el archivo una vez sin interpretarlo; los saltos
+    de línea dentro de campos entre comillas no cuentan como fin de fila.
+    """
+
+    def __init__(self, path, page_rows=PAGE_ROWS):
+        self.path = path
+        self.page_rows = page_rows
+        self.offsets = array('q')
+        self.total_rows = 0
+        self.columns = []
+
+    def build(self, cancelled=None):
+        self.columns = list(pd.read_csv(self.path, nrows=0).columns)
+        offsets = array('q')
+        rows = 0
+        with open(self.path, 'rb') as f:
+            position = 0
+            header_done = False
+            quotes = 0
+            row_start = True
+            for line in f:
+                if row_start and header_done and line.strip():
+                    if rows % self.page_rows == 0:
+                        offsets.append(position)
+                        if cancelled is not None and cancelled():
+                            return self
+                    rows += 1
+                position += len(line)
+                quotes += line.count(b'"')
+                row_start = quotes % 2 == 0
+                if row_start:
+                    quotes = 0
+                    header_done = True
+        self.offsets = offsets
+        self.total_rows = rows
+        return self
+
+    def read_page(self, page):
+        start = self.offsets[page]
+        end = self.offsets[page + 1] if page + 1 < len(self.offsets) else None
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start) if end is not None else f.read()
+        if not data.strip():
+            return []
+        df = pd.read_csv(io.BytesIO(data), header=None, dtype=str, keep_default_na=False)
+        return df.values.tolist()
+
+
+class FramePages:
+    """Páginas de un DataFrame ya cargado (archivos pequeños, compartido con la caché)"""
+
+    def __init__(self, df, page_rows=PAGE_ROWS):
+        self.df = df
+        self.page_rows = page_rows
+        self.columns = list(df.columns)
+        self.total_rows = len(df)
+
+    def read_page(self, page):
+        start = page * self.page_rows
+        chunk = self.df.iloc[start:start + self.page_rows]
+        return chunk.astype(object).where(chunk.notna(), '').values.tolist()
+
+
+class _GroupPages(ABC):
+    """Páginas de un archivo columnar dividido en grupos de filas, un grupo en memoria a la vez"""
+
+    def __init__(self, columns, group_sizes, page_rows=PAGE_ROWS):
+        self.page_rows = page_rows
+        self.columns = columns
+        self.total_rows = sum(group_sizes)
+        # Primera fila de cada grupo
+        self._group_starts = []
+        position = 0
+        for size in group_sizes:
+            self._group_starts.append(position)
+            position += size
+        self._cached_group = (None, None)
+
+    @abstractmethod
+    def _read_group(self, group):
+        """Tabla o lote de Arrow con las filas del grupo"""
+
+    def _group(self, group):
+        if self._cached_group[0] != group:
+            df = self._read_group(group).to_pandas()
+            self._cached_group = (group, df.astype(object).where(df.notna(), ''))
+        return self._cached_group[1]
+
+    def read_page(self, page):
+        start = page * self.page_rows
+        end = min(start + self.page_rows, self.total_rows)
+        rows = []
+        while start < end:
+            group = bisect.bisect_right(self._group_starts, start) - 1
+            offset = start - self._group_starts[group]
+            chunk = self._group(group).iloc[offset:offset + end - start]
+            if chunk.empty:
+                break
+            rows.extend(chunk.values.tolist())
+            start += len(chunk)
+        return rows
+
+
+class ParquetPages(_GroupPages):
+    """Páginas leídas de un archivo Parquet (o su copia), un grupo de filas a la vez"""
+
+    def __init__(self, path, page_rows=PAGE_ROWS):
+        import pyarrow.parquet as pq
+
+        self._file = pq.ParquetFile(path)
+        metadata = self._file.metadata
+        sizes = [metadata.row_group(group).num_rows for group in range(metadata.num_row_groups)]
+        super().__init__(list(self._file.schema_arrow.names), sizes, page_rows)
+
+    def _read_group(self, group):
+        return self._file.read_row_group(group)
+
+
+class FeatherPages(_GroupPages):
+    """Páginas leídas de un archivo Feather (Arrow IPC), un lote de registros a la vez"""
+
+    def __init__(self, path, page_rows=PAGE_ROWS):
+        import pyarrow as pa
+
+        # Se lee del archivo sin mapearlo en memoria, para poder reemplazarlo en
+        # Windows; contar las filas recorre los lotes una vez sin conservarlos
+        self._reader = pa.ipc.open_file(pa.OSFile(path, 'rb'))
+        sizes = [self._reader.get_batch(batch).num_rows for batch in range(self._reader.num_record_batches)]
+        super().__init__(list(self._reader.schema.names), sizes, page_rows)
+
+    def _read_group(self, group):
+        return self._reader.get_batch(group)
+
+
+class PagedTable:
+    """Vista paginada de un archivo CSV, XLSX, Parquet o Feather para recorrerlo sin cargarlo completo
+
+    Parquet y Feather se leen siempre por grupos de filas. De los CSV y XLSX,
+    los pequeños usan el DataFrame de la caché de entrada (el mismo que luego
+    se procesa) y los grandes se leen de su copia Parquet si está
+    vigente o se indexan por desplazamientos en bytes (los XLSX a través de una
+    copia CSV en .sidecar/preview/), y solo se leen las páginas que se muestran; se
+    guardan a lo sumo MAX_CACHED_PAGES en memoria.
+    """
+
+    def __init__(self, path, page_rows=PAGE_ROWS, max_cached_pages=MAX_CACHED_PAGES):
+        self.path = path
+        self.page_rows = page_rows
+        self.max_cached_pages = max_cached_pages
+        self._source = None
+        self._pages = OrderedDict()
+
+    def open(self, cancelled=None):
+        """Preparar el índice de páginas; puede tardar en archivos grandes"""
+        parquet = columnar_sidecar(self.path)
+        # Los formatos columnares se leen por grupos de filas sea cual sea su tamaño
+        if self.path.endswith('.parquet'):
+            self._source = ParquetPages(self.path, self.page_rows)
+        elif self.path.endswith('.feather'):
+            self._source = FeatherPages(self.path, self.page_rows)
+        elif not should_stream(self.path):
+            self._source = FramePages(FilePipeline(self.path).frame, self.page_rows)
+        elif parquet:
+            self._source = ParquetPages(parquet, self.page_rows)
+        else:
+            csv_path = build_csv_sidecar(self.path) if self.path.endswith('.xlsx') else self.path
+            self._source = CsvRowIndex(csv_path, self.page_rows).build(cancelled)
+        return self
+
+    @property
+    def columns(self):
+        return self._source.columns
+
+    @property
+    def total_rows(self):
+        return self._source.total_rows
+
+    def _page(self, page):
+        rows = self._pages.get(page)
+        if rows is None:
+            rows = self._source.read_page(page)
+            self._pages[page] = rows
+            while len(self._pages) > self.max_cached_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page)
+        return rows
+
+    def rows(self, start, count):
+        """Filas [start, start + count) como listas de valores"""
+        end = min(start + count, self.total_rows)
+        result = []
+        position = max(start, 0)
+        while position < end:
+            page, offset = divmod(position, self.page_rows)
+            rows = self._page(page)[offset:offset + end - position]
+            if not rows:
+                break
+            result.extend(rows)
+            position += len(rows)
+        return result
@@ -1,6 +1,157 @@
 import json
 import os
 from pathlib import Path
+import pandas as pd
+
+# Cantidad máxima de filas citadas en el mensaje de error de cada regla
+MAX_ROWS_IN_MESSAGE = 10
+
+
+def _is_string(series):
+    """Máscara de valores que son texto, sin recorrer la serie con apply"""
+    if pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return pd.Series(False, index=series.index)
+    if pd.api.types.is_string_dtype(series.dtype) and series.dtype != object:
+        return series.notna()
+    # Columnas object: si todos los valores son texto se evita la comprobación por fila
+    if pd.api.types.infer_dtype(series, skipna=False) == 'string':
+        return pd.Series(True, index=series.index)
+    return series.map(type).eq(str)
+
+
+def _as_text(series):
+    """Valores no vacíos convertidos a texto"""
+    return series.dropna().astype(str)
+
+
+def _check_type(expected):
+    def check(series):
+        if expected == 'string':
+            return ~_is_string(series)
+        numeric = pd.to_numeric(series, errors='coerce')
+        invalid = series.notna() & numeric.isna()
+        if expected == 'integer':
+            invalid |= numeric.notna() & (numeric % 1 != 0)
+        return invalid
+    return check
+
+
+def _check_required(series):
+    return series.isna()
+
+
+def _check_min_length(min_len):
+    def check(series):
+        lengths = _as_text(series).str.len()
+        return (lengths < min_len).reindex(series.index, fill_value=False)
+    return check
+
+
+def _check_max_length(max_len):
+    def check(series):
+        lengths = _as_text(series).str.len()
+        return (lengths > max_len).reindex(series.index, fill_value=False)
+    return check
+
+
+def _check_regex(pattern):
+    def check(series):
+        matches = _as_text(series).str.fullmatch(pattern)
+        return (~matches.astype(bool)).reindex(series.index, fill_value=False)
+    return check
+
+
+def _check_enum(values):
+    allowed = list(values)
+
+    def check(series):
+        return series.notna() & ~series.isin(allowed)
+    return check
+
+
+def _check_range(minimum, maximum):
+    def check(series):
+        numeric = pd.to_numeric(series, errors='coerce')
+        invalid = series.notna() & numeric.isna()
+        if minimum is not None:
+            invalid |= numeric < minimum
+        if maximum is not None:
+            invalid |= numeric > maximum
+        return invalid
+    return check
+
+
+def _check_unique(series):
+    return series.notna() & series.duplicated(keep=False)
+
+
+def compile_rules(column, rules):
+    """Convertir las reglas de una columna en comprobaciones vectorizadas
+
+    Cada comprobación devuelve una máscara booleana con las filas que fallan.
+    """
+    checks = []
+    if 'type' in rules:
+        messages = {
+            'string': "debe contener solo texto",
+            'number': "debe contener solo números",
+            'integer': "debe contener solo números enteros"
+        }
+        if rules['type'] not in messages:
+            raise ValueError(f"Tipo '{rules['type']}' no soportado en la columna '{column}'")
+        checks.append(('type', messages[rules['type']], _check_type(rules['type'])))
+    if rules.get('required'):
+        checks.append(('required', "no puede contener valores vacíos", _check_required))
+    if 'min_length' in rules:
+        checks.append(('min_length', f"debe tener al menos {rules['min_length']} caracteres",
+                       _check_min_length(rules['min_length'])))
+    if 'max_length' in rules:
+        checks.append(('max_length', f"debe tener como máximo {rules['max_length']} caracteres",
+                       _check_max_length(rules['max_length'])))
+    if 'regex' in rules:
+        checks.append(('regex', f"debe cumplir el patrón {rules['regex']}", _check_regex(rules['regex'])))
+    if 'enum' in rules:
+        checks.append(('enum', f"solo admite los valores {rules['enum']}", _check_enum(rules['enum'])))
+    if 'min' in rules or 'max' in rules:
+        minimum, maximum = rules.get('min'), rules.get('max')
+        checks.append(('range', f"debe estar entre {minimum} y {maximum}", _check_range(minimum, maximum)))
+    if rules.get('unique'):
+        checks.append(('unique', "no puede contener valores repetidos", _check_unique))
+    return [(column, rule, f"Columna '{column}' {message}", check) for rule, message, check in checks]
+
+
+class CompiledTemplate:
+    """Plantilla con sus reglas compiladas una sola vez"""
+
+    def __init__(self, template):
+        self.required_columns = list(template['required_columns'])
+        self.checks = []
+        for column, rules in template.get('validation_rules', {}).items():
+            self.checks.extend(compile_rules(column, rules))
+
+    def run(self, df):
+        """Aplicar las comprobaciones y devolver un reporte con las filas que fallan"""
+        missing_columns = sorted(set(self.required_columns) - set(df.columns))
+        errors = []
+        for column, rule, message, check in self.checks:
+            if column not in df.columns:
+                continue
+            failed = check(df[column])
+            rows = df.index[failed.to_numpy(dtype=bool)].tolist()
+            if rows:
+                errors.append({
+                    'column': column,
+                    'rule': rule,
+                    'message': message,
+                    'count': len(rows),
+                    'rows': rows
+                })
+        return {
+            'valid': not missing_columns and not errors,
+            'total_rows': len(df),
+            'missing_columns': missing_columns,
+            'errors': errors
+        }
 
 class TemplateManager:
     def __init__(self):
@@ -11,6 +162,7 @@ class TemplateManager:
     
     def load_templates(self):
         """Cargar plantillas existentes"""
+        self._compiled = {}
         if self.templates_file.exists():
             with open(self.templates_file, 'r') as f:
                 self.templates = json.load(f)
@@ -47,57 +199,49 @@ class TemplateManager:
             'optional_columns': optional_columns or [],
             'validation_rules': validation_rules or {}
         }
+        self._compiled.pop(template_id, None)
         self.save_templates()
         return template_id
     
     def validate_file(self, filepath, template_id='default'):
         """Validar archivo contra una plantilla"""
-        import pandas as pd
-        
-        template = self.templates.get(template_id)
-        if not template:
-            raise ValueError(f"Plantilla '{template_id}' no encontrada")
+        from pipeline import input_cache
         
-        # Leer archivo
-        if filepath.endswith('.csv'):
-            df = pd.read_csv(filepath)
-        elif filepath.endswith('.xlsx'):
-            df = pd.read_excel(filepath)
-        else:
-            raise ValueError("Formato de archivo no soportado")
+        # Leer archivo (o reutilizar la lectura previa del mismo archivo)
+        return self.validate_dataframe(input_cache.get(filepath), template_id)
+    
+    def validate_dataframe(self, df, template_id='default'):
+        """Validar un DataFrame ya leído contra una plantilla"""
+        report = self.validation_report(df, template_id)
         
         # Validar columnas requeridas
-        missing_columns = set(template['required_columns']) - set(df.columns)
-        if missing_columns:
-            raise ValueError(f"Columnas requeridas faltantes: {missing_columns}")
+        if report['missing_columns']:
+            raise ValueError(f"Columnas requeridas faltantes: {set(report['missing_columns'])}")
         
-        # Validar reglas
-        errors = []
-        for column, rules in template.get('validation_rules', {}).items():
-            if column in df.columns:
-                # Validar tipo de datos
-                if rules.get('type') == 'string':
-                    non_string = df[df[column].apply(lambda x: not isinstance(x, str))][column]
-                    if not non_string.empty:
-                        errors.append(f"Columna '{column}' debe contener solo texto")
-                
-                # Validar requerido
-                if rules.get('required'):
-                    if df[column].isnull().any():
-                        errors.append(f"Columna '{column}' no puede contener valores vacíos")
-                
-                # Validar longitud mínima
-                if 'min_length' in rules:
-                    min_len = rules['min_length']
-                    short_values = df[df[column].str.len() < min_len][column]
-                    if not short_values.empty:
-                        errors.append(f"Columna '{column}' debe tener al menos {min_len} caracteres")
-        
-        if errors:
+        if report['errors']:
+            errors = []
+            for error in report['errors']:
+                rows = ", ".join(str(row) for row in error['rows'][:MAX_ROWS_IN_MESSAGE])
+                if error['count'] > MAX_ROWS_IN_MESSAGE:
+                    rows += f" (+{error['count'] - MAX_ROWS_IN_MESSAGE} más)"
+                errors.append(f"{error['message']} (filas: {rows})")
             raise ValueError("Errores de validación:\n" + "\n".join(errors))
         
         return True
     
+    def validation_report(self, df, template_id='default'):
+        """Reporte estructurado de validación con los índices de las filas que fallan"""
+        return self.compile_template(template_id).run(df)
+    
+    def compile_template(self, template_id):
+        """Obtener la plantilla compilada, compilándola solo la primera vez"""
+        if template_id not in self._compiled:
+            template = self.templates.get(template_id)
+            if not template:
+                raise ValueError(f"Plantilla '{template_id}' no encontrada")
+            self._compiled[template_id] = CompiledTemplate(template)
+        return self._compiled[template_id]
+    
     def get_template_list(self):
         """Obtener lista de plantillas disponibles"""
         return [(id, template['name']) for id, template in self.templates.items()]
@@ -1 +1,5 @@
+from logger import system_logger
 
+# Las pruebas no deben reescribir logs/metrics.json ni los registros de faltantes
+# del repositorio: se desactiva la persistencia antes de importar cualquier módulo
+system_logger.metrics_enabled = False
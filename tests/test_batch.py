@@ -0,0 +1,78 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from batch import BatchEngine
+from logger import system_logger
+
+
+class BatchEngineTest(unittest.TestCase):
+    """Procesa archivos pequeños con el entrenamiento de entrenador/ en dos procesos"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self._tmp.name, 'entrada')
+        self.output_dir = os.path.join(self._tmp.name, 'salida')
+        os.makedirs(self.input_dir)
+        self.engine = BatchEngine(max_workers=2, output_dir=self.output_dir, backup=False)
+        # El panel HTML del repositorio no se reescribe durante las pruebas
+        patcher = mock.patch.object(system_logger, 'generate_html_dashboard', return_value='dashboard.html')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.engine.shutdown()
+        self._tmp.cleanup()
+
+    def write_input(self, name, df):
+        path = os.path.join(self.input_dir, name)
+        df.to_csv(path, index=False)
+        return path
+
+    def test_results_per_file_in_input_order(self):
+        files = [
+            self.write_input('a.csv', pd.DataFrame({'Elemento': ['Motor', 'Chumacera']})),
+            # Sin columna Elemento: falla solo este archivo
+            self.write_input('b.csv', pd.DataFrame({'Otro': ['Motor']})),
+            self.write_input('c.csv', pd.DataFrame({'Elemento': ['Chumacera', 'Nope']})),
+        ]
+        progress = []
+        results = self.engine.process(files, progress_callback=lambda done, total, result: progress.append((done, total)))
+
+        self.assertEqual([result['input_file'] for result in results], files)
+        self.assertEqual([result['status'] for result in results], ['ok', 'error', 'ok'])
+        self.assertIn('KeyError', results[1]['error'])
+        self.assertEqual(progress, [(1, 3), (2, 3), (3, 3)])
+        for result in (results[0], results[2]):
+            df_output = pd.read_csv(result['output_file'])
+            self.assertEqual(result['output_rows'], len(df_output))
+            self.assertGreater(result['output_rows'], result['input_rows'])
+        self.assertEqual(results[0]['missing_elements'], set())
+        self.assertEqual(results[2]['missing_elements'], {'Nope'})
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, 'b.csv')))
+
+    def test_cancel_skips_files_not_started(self):
+        files = [
+            self.write_input(f'{i}.csv', pd.DataFrame({'Elemento': ['Motor'] * 50})) for i in range(10)
+        ]
+        cancel_event = threading.Event()
+        results = self.engine.process(
+            files, progress_callback=lambda done, total, result: cancel_event.set(), cancel_event=cancel_event
+        )
+
+        statuses = [result['status'] for result in results]
+        self.assertEqual(set(statuses) - {'ok', 'cancelled'}, set())
+        self.assertIn('cancelled', statuses)
+        for path, result in zip(files, results):
+            output_exists = os.path.exists(os.path.join(self.output_dir, os.path.basename(path)))
+            self.assertEqual(output_exists, result['status'] == 'ok')
+            # Sin backup, la entrada queda siempre en su carpeta
+            self.assertTrue(os.path.exists(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
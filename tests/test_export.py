@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from export import export_file, export_files, export_targets
+from file_io import columnar_available
+
+
+class ExportTargetsTest(unittest.TestCase):
+    def test_unique_names_keep_plain_target(self):
+        targets = export_targets(['salida/a.csv', 'salida/b.xlsx'], 'exportados', 'jsonl')
+        self.assertEqual(targets, [os.path.join('exportados', 'a.jsonl'), os.path.join('exportados', 'b.jsonl')])
+
+    def test_same_name_keeps_source_extension(self):
+        targets = export_targets(['salida/x.csv', 'salida/X.xlsx', 'otra/x.csv'], 'exportados', 'parquet')
+        names = [os.path.basename(target) for target in targets]
+        self.assertEqual(names, ['x_csv.parquet', 'X_xlsx.parquet', 'x_csv_2.parquet'])
+
+    @unittest.skipUnless(columnar_available(), "requiere pyarrow")
+    def test_same_name_sources_export_to_separate_files(self):
+        with tempfile.TemporaryDirectory() as folder:
+            csv_path = os.path.join(folder, 'x.csv')
+            parquet_path = os.path.join(folder, 'x.parquet')
+            pd.DataFrame({'Elemento': ['Polea'] * 3}).to_csv(csv_path, index=False)
+            pd.DataFrame({'Elemento': ['Motor'] * 5}).to_parquet(parquet_path, index=False)
+            export_dir = os.path.join(folder, 'exportados')
+
+            results = export_files([csv_path, parquet_path], export_dir, 'jsonl', max_workers=2)
+
+            self.assertEqual([result['status'] for result in results], ['ok', 'ok'])
+            self.assertEqual(sorted(os.listdir(export_dir)), ['x_csv.jsonl', 'x_parquet.jsonl'])
+            df_csv = pd.read_json(os.path.join(export_dir, 'x_csv.jsonl'), lines=True)
+            df_parquet = pd.read_json(os.path.join(export_dir, 'x_parquet.jsonl'), lines=True)
+            self.assertEqual(df_csv['Elemento'].tolist(), ['Polea'] * 3)
+            self.assertEqual(df_parquet['Elemento'].tolist(), ['Motor'] * 5)
+
+
+class ExportFileTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.folder = self._tmp.name
+        # Con bloques de 2 filas, Seguridad es numérica en el primero y texto en el segundo,
+        # y Severidad es entera en el primero y tiene un vacío en el segundo
+        self.source = os.path.join(self.folder, 'x.csv')
+        with open(self.source, 'w', encoding='utf-8') as f:
+            f.write('Elemento,Seguridad,Severidad\nPolea,1,3\nMotor,2,4\nChumacera,texto,\nReductor,3,5\n')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def export(self, extension):
+        target = os.path.join(self.folder, f'x{extension}')
+        result = export_file(self.source, target, chunk_rows=2)
+        self.assertEqual(result['status'], 'ok', result.get('error'))
+        self.assertEqual(result['rows'], 4)
+        return target
+
+    def test_column_types_are_fixed_across_chunks(self):
+        extensions = ['.json', '.jsonl'] + (['.parquet', '.feather'] if columnar_available() else [])
+        for extension in extensions:
+            with self.subTest(extension=extension):
+                target = self.export(extension)
+                if extension in ('.json', '.jsonl'):
+                    df = pd.read_json(target, lines=extension == '.jsonl', dtype=False)
+                else:
+                    df = pd.read_parquet(target) if extension == '.parquet' else pd.read_feather(target)
+                self.assertEqual(df['Seguridad'].tolist(), ['1', '2', 'texto', '3'])
+                self.assertEqual(df['Severidad'].tolist()[:2], [3.0, 4.0])
+                self.assertTrue(pd.isna(df['Severidad'][2]))
+
+    def test_json_lines_write_every_chunk_alike(self):
+        with open(self.export('.jsonl'), encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], '{"Elemento":"Polea","Seguridad":"1","Severidad":3.0}')
+        self.assertEqual(lines[3], '{"Elemento":"Reductor","Seguridad":"3","Severidad":5.0}')
+
+
+if __name__ == '__main__':
+    unittest.main()
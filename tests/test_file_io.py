@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from file_io import (
+    ArrowTableWriter, _iter_json_chunks, columnar_available, iter_table_chunks, read_table, write_columnar_sidecar,
+    write_table
+)
+
+
+@unittest.skipUnless(columnar_available(), "requiere pyarrow")
+class ArrowTableWriterTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.folder = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_chunks_are_appended_in_order(self):
+        path = os.path.join(self.folder, 'salida.parquet')
+        chunks = [
+            pd.DataFrame({'Elemento': [f'E{i}', f'E{i + 1}'], 'Seguridad': [i, i + 1]})
+            for i in range(0, 6, 2)
+        ]
+        with ArrowTableWriter(path) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+        self.assertEqual(writer.rows_written, 6)
+        df = pd.read_parquet(path)
+        self.assertEqual(df['Elemento'].tolist(), [f'E{i}' for i in range(6)])
+        self.assertEqual(df['Seguridad'].tolist(), list(range(6)))
+
+    def test_empty_first_chunk_keeps_declared_numeric_type(self):
+        path = os.path.join(self.folder, 'salida.parquet')
+        first = pd.DataFrame({'Elemento': ['Nope', 'Nope'], 'Seguridad': [np.nan, np.nan]})
+        second = pd.DataFrame({'Elemento': ['Polea', 'Motor'], 'Seguridad': [1, 3]})
+        with ArrowTableWriter(path, dtypes={'Seguridad': 'int64'}) as writer:
+            writer.write(first)
+            writer.write(second)
+        df = pd.read_parquet(path)
+        self.assertTrue(pd.api.types.is_float_dtype(df['Seguridad']))
+        self.assertEqual(df['Seguridad'].tolist()[2:], [1.0, 3.0])
+
+    def test_undeclared_empty_first_chunk_accepts_text_later(self):
+        path = os.path.join(self.folder, 'salida.feather')
+        with ArrowTableWriter(path, '.feather') as writer:
+            writer.write(pd.DataFrame({'Nota': [np.nan]}))
+            writer.write(pd.DataFrame({'Nota': ['revisar']}))
+        self.assertEqual(pd.read_feather(path)['Nota'].tolist()[1], 'revisar')
+
+    def test_sidecar_round_trip_keeps_csv_dtypes(self):
+        path = os.path.join(self.folder, 'salida.csv')
+        df = pd.DataFrame({
+            'Elemento': ['Polea', 'Nope', 'Motor'],
+            'Modos_de_falla': pd.Categorical(['Desgaste', None, 'Ruido']),
+            'Seguridad': [1.0, np.nan, 3.0],
+            'Severidad': [2, 4, 5],
+            'Vacia': [np.nan] * 3,
+        })
+        write_table(df, path)
+        write_columnar_sidecar(df, path)
+        pd.testing.assert_frame_equal(read_table(path), pd.read_csv(path))
+
+
+class TableChunksTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.df = pd.DataFrame({
+            'Elemento': ['Polea', 'Motor', 'Chumacera', 'Reductor', 'Rodillos'],
+            'Modos_de_falla': ['Desgaste, ranura', 'Ruido', 'Vibración "alta"', 'Fuga', 'Atasco'],
+            'Seguridad': [1, 2, 3, 4, 5],
+        })
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def read_chunks(self, extension):
+        path = os.path.join(self._tmp.name, f'salida{extension}')
+        write_table(self.df, path)
+        chunks = list(iter_table_chunks(path, 2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        return pd.concat(chunks, ignore_index=True)
+
+    def test_every_output_format_reads_in_chunks(self):
+        extensions = ['.csv', '.xlsx', '.json', '.jsonl'] + (['.parquet', '.feather'] if columnar_available() else [])
+        for extension in extensions:
+            with self.subTest(extension=extension):
+                pd.testing.assert_frame_equal(self.read_chunks(extension), self.df, check_dtype=False)
+
+    def test_json_records_split_across_reads(self):
+        path = os.path.join(self._tmp.name, 'salida.json')
+        write_table(self.df, path)
+        chunks = list(_iter_json_chunks(path, 2, read_size=7))
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), self.df)
+
+    def test_empty_json_array(self):
+        path = os.path.join(self._tmp.name, 'salida.json')
+        write_table(self.df.head(0), path)
+        self.assertEqual(list(iter_table_chunks(path, 2)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
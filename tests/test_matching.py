@@ -0,0 +1,74 @@
+import unittest
+
+from matching import MATCH_EXACT, MATCH_FUZZY, MATCH_NORMALIZED, ElementoMatcher, normalize_elemento
+
+ELEMENTOS = ['Polea', 'Engranes', 'Engranaje', 'Engrasador', 'Motor eléctrico', 'Correa']
+
+
+class NormalizeElementoTest(unittest.TestCase):
+    def test_case_accents_and_spaces(self):
+        self.assertEqual(normalize_elemento(' Polea '), 'polea')
+        self.assertEqual(normalize_elemento('engranes'), normalize_elemento('ENGRANES'))
+        self.assertEqual(normalize_elemento('Engranes dañados '), normalize_elemento('ENGRANES  DANADOS'))
+        self.assertEqual(normalize_elemento('Motor\teléctrico'), 'motor electrico')
+
+    def test_compatibility_forms(self):
+        # NFKD separa ligaduras y formas de ancho completo; casefold convierte la ß
+        self.assertEqual(normalize_elemento('Eﬁciencia'), 'eficiencia')
+        self.assertEqual(normalize_elemento('ＭＯＴＯＲ'), 'motor')
+        self.assertEqual(normalize_elemento('Straße'), 'strasse')
+
+
+class ElementoMatcherTest(unittest.TestCase):
+    def matcher(self, mode, threshold=0.8):
+        return ElementoMatcher(ELEMENTOS, mode=mode, threshold=threshold)
+
+    def test_exact_mode(self):
+        matcher = self.matcher(MATCH_EXACT)
+        self.assertEqual(matcher.resolve('Polea'), 'Polea')
+        self.assertIsNone(matcher.resolve(' polea '))
+        self.assertIsNone(matcher.resolve('Correas'))
+
+    def test_normalized_mode(self):
+        matcher = self.matcher(MATCH_NORMALIZED)
+        self.assertEqual(matcher.resolve(' polea '), 'Polea')
+        self.assertEqual(matcher.resolve('MOTOR ELECTRICO'), 'Motor eléctrico')
+        self.assertIsNone(matcher.resolve('Correas'))
+
+    def test_fuzzy_mode(self):
+        matcher = self.matcher(MATCH_FUZZY)
+        self.assertEqual(matcher.resolve(' polea '), 'Polea')
+        self.assertEqual(matcher.resolve('engrane'), 'Engranes')
+        self.assertIsNone(matcher.resolve('Poleas'))
+
+    def test_missing_values_never_match(self):
+        for mode in (MATCH_EXACT, MATCH_NORMALIZED, MATCH_FUZZY):
+            with self.subTest(mode=mode):
+                self.assertIsNone(self.matcher(mode).resolve(None))
+                self.assertIsNone(self.matcher(mode).resolve(float('nan')))
+
+    def test_threshold_is_inclusive(self):
+        matcher = self.matcher(MATCH_FUZZY)
+        # 'correas' comparte 6 de 7 y 8 trigramas con 'correa': 2 * 6 / 15 = 0.8
+        self.assertEqual(matcher.similar('Correas', limit=1), [('Correa', 0.8)])
+        self.assertEqual(matcher.resolve('Correas'), 'Correa')
+        self.assertEqual(matcher.suggest('Correas'), ['Correa'])
+        self.assertIsNone(self.matcher(MATCH_FUZZY, threshold=0.81).resolve('Correas'))
+
+    def test_suggestions_are_ordered_by_similarity(self):
+        matcher = self.matcher(MATCH_NORMALIZED, threshold=0.5)
+        similar = matcher.similar('engranajes', limit=3)
+        self.assertEqual([elemento for elemento, _ in similar], ['Engranaje', 'Engranes', 'Engrasador'])
+        self.assertEqual([score for _, score in similar], sorted((score for _, score in similar), reverse=True))
+        # suggest respeta el límite y descarta las que no llegan al umbral
+        self.assertEqual(matcher.suggest('engranajes', limit=2), ['Engranaje', 'Engranes'])
+        self.assertEqual(matcher.suggest('engranajes'), ['Engranaje', 'Engranes'])
+        self.assertEqual(matcher.suggest('xyz'), [])
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            ElementoMatcher(ELEMENTOS, mode='aproximado')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+import numpy as np
+
+from logger import system_logger
+from metrics import QuantileSketch
+
+
+class QuantileSketchTest(unittest.TestCase):
+    def setUp(self):
+        self.values = np.random.default_rng(7).lognormal(mean=0.0, sigma=1.5, size=20000)
+
+    def assert_within_accuracy(self, sketch, values):
+        for q in (0.01, 0.25, 0.5, 0.9, 0.95, 0.99, 1.0):
+            expected = np.quantile(values, q, method='lower')
+            self.assertLessEqual(abs(sketch.quantile(q) - expected), sketch.relative_accuracy * expected, q)
+
+    def test_quantiles_within_relative_accuracy(self):
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for value in self.values:
+            sketch.add(value)
+        self.assertEqual(sketch.count, len(self.values))
+        self.assert_within_accuracy(sketch, self.values)
+
+    def test_merge_matches_single_sketch(self):
+        left, right, combined = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for i, value in enumerate(self.values):
+            (left if i % 3 else right).add(value)
+            combined.add(value)
+        left.merge(right)
+        self.assertEqual(left.count, combined.count)
+        self.assertEqual(left.bins, combined.bins)
+        self.assert_within_accuracy(left, self.values)
+
+    def test_round_trip_and_edge_cases(self):
+        sketch = QuantileSketch()
+        self.assertIsNone(sketch.quantile(0.5))
+        for value in (0.0, 0.0, 2.0, 4.0):
+            sketch.add(value)
+        restored = QuantileSketch.from_dict(sketch.to_dict())
+        self.assertEqual(restored.count, 4)
+        self.assertEqual(restored.quantile(0.0), 0.0)
+        self.assertAlmostEqual(restored.quantile(1.0), 4.0, delta=0.04)
+
+    def test_max_bins_bounds_memory(self):
+        sketch = QuantileSketch(max_bins=256)
+        for value in self.values:
+            sketch.add(value)
+        self.assertLessEqual(len(sketch.bins), 256)
+        # Las cubetas colapsadas son las menores: los cuantiles altos no cambian
+        expected = np.quantile(self.values, 0.99, method='lower')
+        self.assertLessEqual(abs(sketch.quantile(0.99) - expected), sketch.relative_accuracy * expected)
+
+
+class FileLatencyTest(unittest.TestCase):
+    def test_processed_files_feed_latency_quantiles(self):
+        before = system_logger.metrics['file_time_quantiles'].count
+        resources = {
+            'seconds': 1.5, 'cpu_seconds': 1.2, 'rss_peak_mb': 120.0, 'threads_max': 3, 'samples': 30
+        }
+        system_logger.log_file_processed('prueba.csv', 10, 40, resources)
+        self.assertEqual(system_logger.metrics['file_time_quantiles'].count, before + 1)
+        self.assertGreater(system_logger.generate_dashboard_data(0)['latency']['p99'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from missing_registry import MAX_SOURCES_PER_ELEMENT, MissingElementsRegistry
+
+
+class MissingElementsRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, 'missing_elements.json')
+        self.journal_path = os.path.join(self._tmp.name, 'missing_elements_events.jsonl')
+        self.registries = []
+
+    def tearDown(self):
+        for registry in self.registries:
+            registry.journal.close()
+        self._tmp.cleanup()
+
+    def open_registry(self, **options):
+        registry = MissingElementsRegistry(self.path, self.journal_path, **options)
+        self.registries.append(registry)
+        return registry
+
+    def fill(self, registry):
+        registry.upsert(['Nope', 'Otro'], source='a.csv', timestamp='2024-01-01T00:00:00')
+        # Un elemento repetido en el mismo lote cuenta una sola vez
+        registry.upsert(['Otro', 'Otro'], source='b.csv', timestamp='2024-01-02T00:00:00')
+        registry.upsert(['Ventosa'], source='c.csv', timestamp='2024-01-03T00:00:00')
+        registry.upsert(['Nope'], source='d.csv', timestamp='2024-01-04T00:00:00')
+
+    def names(self, entries):
+        return [elemento for elemento, _ in entries]
+
+    def test_orders_by_recency_and_by_count(self):
+        registry = self.open_registry()
+        self.fill(registry)
+        self.assertEqual(len(registry), 3)
+        self.assertEqual(self.names(registry.recent()), ['Nope', 'Ventosa', 'Otro'])
+        self.assertEqual(self.names(registry.recent(limit=1, offset=1)), ['Ventosa'])
+        # Nope y Otro tienen 2 avistamientos: primero el que llegó a 2 más recientemente
+        self.assertEqual(self.names(registry.most_frequent()), ['Nope', 'Otro', 'Ventosa'])
+        self.assertEqual(self.names(registry.most_frequent(limit=2, offset=1)), ['Otro', 'Ventosa'])
+
+        otro = registry.get('Otro')
+        self.assertEqual(otro['count'], 2)
+        self.assertEqual(otro['first_seen'], '2024-01-01T00:00:00')
+        self.assertEqual(otro['last_seen'], '2024-01-02T00:00:00')
+        self.assertEqual(otro['files'], ['a.csv', 'b.csv'])
+
+    def test_sources_are_capped_and_move_to_the_end(self):
+        registry = self.open_registry()
+        for i in range(MAX_SOURCES_PER_ELEMENT + 5):
+            registry.upsert(['Nope'], source=f'{i}.csv', persist=False)
+        registry.upsert(['Nope'], source='10.csv', persist=False)
+        files = registry.get('Nope')['files']
+        self.assertEqual(len(files), MAX_SOURCES_PER_ELEMENT)
+        self.assertEqual(files[-1], '10.csv')
+        self.assertEqual(files.count('10.csv'), 1)
+
+    def test_empty_values_are_not_registered(self):
+        registry = self.open_registry()
+        self.assertEqual(registry.upsert([None, np.nan, pd.NA, '', '  ', 'Nope'], source='a.csv', persist=False), 1)
+        self.assertEqual(registry.upsert([np.nan, None], source='b.csv', persist=False), 0)
+        self.assertEqual(self.names(registry.recent()), ['Nope'])
+        self.assertNotIn('nan', registry)
+
+    def test_journal_replay_restores_unsaved_batches(self):
+        registry = self.open_registry()
+        self.fill(registry)
+        registry.journal.flush()
+        self.assertFalse(os.path.exists(self.path))
+
+        replayed = self.open_registry()
+        self.assertEqual(registry.recent(), replayed.recent())
+        self.assertEqual(registry.most_frequent(), replayed.most_frequent())
+
+    def test_compaction_writes_snapshot_and_empties_journal(self):
+        registry = self.open_registry(compact_events=3)
+        self.fill(registry)
+        registry.journal.flush()
+        with open(self.path) as f:
+            snapshot = json.load(f)
+        self.assertEqual(snapshot['total_count'], 3)
+        # El cuarto lote queda solo en el diario hasta la próxima consolidación
+        reopened = self.open_registry()
+        self.assertEqual(registry.most_frequent(), reopened.most_frequent())
+        registry.close()
+        self.assertEqual(os.path.getsize(self.journal_path), 0)
+
+    def test_loads_previous_json_format(self):
+        with open(self.path, 'w') as f:
+            json.dump({
+                'elements': {
+                    'Nope': {'first_seen': '2024-01-01', 'last_seen': '2024-01-05', 'count': 2},
+                    'Otro': {'first_seen': '2024-01-02', 'last_seen': '2024-01-03', 'count': 7},
+                },
+                'total_count': 2
+            }, f)
+        registry = self.open_registry()
+        self.assertEqual(self.names(registry.recent()), ['Nope', 'Otro'])
+        self.assertEqual(self.names(registry.most_frequent()), ['Otro', 'Nope'])
+        self.assertEqual(registry.get('Otro')['files'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
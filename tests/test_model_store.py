@@ -0,0 +1,52 @@
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+
+from model_store import BUILD_LOCK_FILE, BUILD_LOCK_STALE_SECONDS, ModelRegistry, build_model_artifacts
+
+
+class ModelArtifactsTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self._tmp.name, 'models.joblib')
+        self.target_dir = os.path.join(self._tmp.name, 'columnas')
+        joblib.dump({'Modos_de_falla': ['modelo', 1], 'Seguridad (1-5)': {'modelo': 2}}, self.source)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_concurrent_builds_leave_complete_artifacts(self):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            manifests = list(executor.map(lambda _: build_model_artifacts(self.source, self.target_dir), range(8)))
+        self.assertTrue(all(manifest == manifests[0] for manifest in manifests))
+        # Sin temporales ni candado sobrantes
+        self.assertEqual(sorted(os.listdir(self.target_dir)), [
+            '00_modos_de_falla.joblib', '01_seguridad_1_5.joblib', 'manifest.json'
+        ])
+        registry = ModelRegistry(self.source, self.target_dir)
+        self.assertEqual(registry['Seguridad (1-5)'], {'modelo': 2})
+
+    def test_stale_lock_is_discarded(self):
+        os.makedirs(self.target_dir)
+        lock_path = os.path.join(self.target_dir, BUILD_LOCK_FILE)
+        open(lock_path, 'w').close()
+        old = time.time() - BUILD_LOCK_STALE_SECONDS - 10
+        os.utime(lock_path, (old, old))
+        manifest = build_model_artifacts(self.source, self.target_dir)
+        self.assertEqual(list(manifest['columns']), ['Modos_de_falla', 'Seguridad (1-5)'])
+        self.assertFalse(os.path.exists(lock_path))
+
+    def test_rebuilds_when_source_changes(self):
+        first = ModelRegistry(self.source, self.target_dir)
+        self.assertEqual(list(first), ['Modos_de_falla', 'Seguridad (1-5)'])
+        joblib.dump({'Severidad': 'nuevo'}, self.source)
+        second = ModelRegistry(self.source, self.target_dir)
+        self.assertEqual(second['Severidad'], 'nuevo')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+from sklearn.tree import DecisionTreeClassifier
+
+from predict import expand_predictions, predict_batch, predict_single, process_streaming, save_predictions
+from training import TrainingIndex
+
+
+def training_index():
+    return TrainingIndex(pd.DataFrame({
+        'Elemento': ['Polea', 'Polea', 'Motor', 'Chumacera'],
+        'Modos_de_falla': ['Desgaste', 'Desalineación', 'Ruido', 'Vibración'],
+        'Seguridad': [1, 2, 3, 2],
+        'Severidad': [3, 2, 5, 2],
+    }))
+
+
+class StreamingOutputTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.folder = self._tmp.name
+        self.training = training_index()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write_input(self, elementos):
+        path = os.path.join(self.folder, 'entrada.csv')
+        pd.DataFrame({
+            'Elemento': elementos, 'Modos_de_falla': None, 'Seguridad': None, 'Severidad': None
+        }).to_csv(path, index=False)
+        return path
+
+    def outputs(self, input_file, extension):
+        streamed = os.path.join(self.folder, f'por_bloques{extension}')
+        in_memory = os.path.join(self.folder, f'completo{extension}')
+        process_streaming(input_file, streamed, self.training, chunk_rows=2)
+        save_predictions(expand_predictions(pd.read_csv(input_file), self.training), in_memory)
+        with open(streamed, 'rb') as f_streamed, open(in_memory, 'rb') as f_in_memory:
+            return f_streamed.read(), f_in_memory.read()
+
+    def test_streamed_output_matches_in_memory_output(self):
+        # El primer bloque solo tiene elementos conocidos y el segundo uno sin entrenamiento
+        input_file = self.write_input(['Polea', 'Motor', 'Nope', 'Chumacera', 'Motor'])
+        for extension in ('.csv', '.jsonl'):
+            with self.subTest(extension=extension):
+                streamed, in_memory = self.outputs(input_file, extension)
+                self.assertEqual(streamed, in_memory)
+
+    def test_numeric_columns_are_float_without_missing_elements(self):
+        df_input = pd.DataFrame(columns=['Elemento', 'Modos_de_falla', 'Seguridad', 'Severidad'])
+        df_input['Elemento'] = ['Polea', 'Motor']
+        df_predictions = expand_predictions(df_input, self.training)
+        self.assertEqual(str(df_predictions['Seguridad'].dtype), 'float64')
+        self.assertEqual(df_predictions['Seguridad'].tolist(), [1.0, 2.0, 3.0])
+
+
+class PredictBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.training = training_index()
+        elementos = ['Polea', 'Motor', 'Chumacera']
+        modos = ['Desgaste', 'Ruido', 'Vibración']
+        seguridad = [1, 3, 2]
+        input_encoder = LabelEncoder().fit(elementos)
+        output_encoders = {'Modos_de_falla': LabelEncoder().fit(modos), 'Seguridad': LabelEncoder().fit(seguridad)}
+        X = input_encoder.transform(elementos).reshape(-1, 1)
+        self.models = {
+            column: DecisionTreeClassifier(random_state=0).fit(X, output_encoders[column].transform(y))
+            for column, y in (('Modos_de_falla', modos), ('Seguridad', seguridad))
+        }
+        self.encoders = {'input': input_encoder, 'output': output_encoders}
+
+    def test_batch_matches_single_predictions(self):
+        # Repetidos, uno escrito distinto, uno sin entrenamiento y un vacío
+        elementos = ['Polea', 'Motor', 'Polea', 'Nope', ' motor ', 'Chumacera', None, 'Nope', 'Motor']
+        df_batch = predict_batch(elementos, self.models, self.encoders, self.training)
+        self.assertEqual(len(df_batch), len(elementos))
+        self.assertEqual(df_batch['Elemento'].tolist(), elementos)
+        for i, elemento in enumerate(elementos):
+            with self.subTest(elemento=elemento, row=i):
+                expected = predict_single(elemento, self.models, self.encoders, self.training)
+                self.assertEqual(df_batch.drop(columns='Elemento').iloc[i].to_dict(), expected)
+        self.assertEqual(df_batch['Modos_de_falla'].tolist()[:4], ['Desgaste', 'Ruido', 'Desgaste', ''])
+        self.assertEqual(df_batch.loc[4, 'Modos_de_falla'], 'Ruido')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+import preview
+from file_io import ArrowTableWriter, columnar_available
+from preview import CsvRowIndex, FeatherPages, PagedTable, ParquetPages, discard_preview_cache, preview_cache_path
+
+
+class CsvRowIndexTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, 'entrada.csv')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def build(self, content, page_rows=2):
+        with open(self.path, 'wb') as f:
+            f.write(content)
+        return CsvRowIndex(self.path, page_rows=page_rows).build()
+
+    def read_all(self, index):
+        return [row for page in range(len(index.offsets)) for row in index.read_page(page)]
+
+    def test_quoted_newlines_do_not_split_rows(self):
+        index = self.build(
+            b'Elemento,Modos_de_falla\n'
+            b'Polea,"Desgaste\nen la ranura"\n'
+            b'Motor,Ruido\n'
+            b'Chumacera,"Vibraci\xc3\xb3n ""alta""\ncon\ncalor"\n'
+            b'Reductor,Fuga\n'
+            b'Rodillos,Atasco\n'
+        )
+        self.assertEqual(index.columns, ['Elemento', 'Modos_de_falla'])
+        self.assertEqual(index.total_rows, 5)
+        self.assertEqual(len(index.offsets), 3)
+        rows = self.read_all(index)
+        self.assertEqual([row[0] for row in rows], ['Polea', 'Motor', 'Chumacera', 'Reductor', 'Rodillos'])
+        self.assertEqual(rows[0][1], 'Desgaste\nen la ranura')
+        self.assertEqual(rows[2][1], 'Vibración "alta"\ncon\ncalor')
+
+    def test_crlf_line_endings(self):
+        index = self.build(
+            b'Elemento,Modos_de_falla\r\n'
+            b'Polea,"Desgaste\r\nen la ranura"\r\n'
+            b'Motor,Ruido\r\n'
+            b'Reductor,Fuga\r\n'
+            b'\r\n'
+        )
+        self.assertEqual(index.total_rows, 3)
+        rows = self.read_all(index)
+        self.assertEqual([row[0] for row in rows], ['Polea', 'Motor', 'Reductor'])
+        self.assertEqual(rows[0][1], 'Desgaste\r\nen la ranura')
+        self.assertEqual(rows[2][1], 'Fuga')
+
+    def test_header_only(self):
+        index = self.build(b'Elemento,Modos_de_falla\n')
+        self.assertEqual(index.total_rows, 0)
+        self.assertEqual(len(index.offsets), 0)
+
+
+@unittest.skipUnless(columnar_available(), "requiere pyarrow")
+class ColumnarPagesTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write_chunks(self, extension):
+        # Cada bloque queda en su propio grupo de filas (Parquet) o lote (Feather)
+        path = os.path.join(self._tmp.name, f'salida{extension}')
+        with ArrowTableWriter(path, extension) as writer:
+            for start in range(0, 12, 5):
+                writer.write(pd.DataFrame({'Elemento': [f'E{i}' for i in range(start, min(start + 5, 12))]}))
+        return path
+
+    def test_pages_cross_row_groups(self):
+        for extension, pages_class in (('.parquet', ParquetPages), ('.feather', FeatherPages)):
+            with self.subTest(extension=extension):
+                table = PagedTable(self.write_chunks(extension), page_rows=3).open()
+                self.assertIsInstance(table._source, pages_class)
+                self.assertEqual(table.columns, ['Elemento'])
+                self.assertEqual(table.total_rows, 12)
+                self.assertEqual([row[0] for row in table.rows(4, 5)], ['E4', 'E5', 'E6', 'E7', 'E8'])
+                self.assertEqual([row[0] for row in table.rows(10, 10)], ['E10', 'E11'])
+
+
+class PreviewCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.folder = self._tmp.name
+        self._cache_dir = preview.PREVIEW_CACHE_DIR
+        preview.PREVIEW_CACHE_DIR = os.path.join(self.folder, 'cache')
+        self.path = os.path.join(self.folder, 'entrada', 'x.xlsx')
+        os.makedirs(os.path.dirname(self.path))
+
+    def tearDown(self):
+        preview.PREVIEW_CACHE_DIR = self._cache_dir
+        self._tmp.cleanup()
+
+    def write_source(self, content, mtime_ns):
+        with open(self.path, 'wb') as f:
+            f.write(content)
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_key_changes_with_size_even_if_mtime_is_older(self):
+        self.write_source(b'primera version', 2_000_000_000_000_000_000)
+        first = preview_cache_path(self.path)
+        self.write_source(b'otra version, mas larga', 1_000_000_000_000_000_000)
+        second = preview_cache_path(self.path)
+        self.assertNotEqual(first, second)
+        # La copia no queda en la carpeta de entrada
+        self.assertNotEqual(os.path.dirname(second), os.path.dirname(self.path))
+
+    def test_discard_removes_only_copies_of_that_file(self):
+        self.write_source(b'contenido', 1_000_000_000_000_000_000)
+        os.makedirs(preview.PREVIEW_CACHE_DIR)
+        own = preview_cache_path(self.path)
+        other = os.path.join(preview.PREVIEW_CACHE_DIR, 'otro_1_1.csv')
+        for path in (own, other):
+            open(path, 'w').close()
+        discard_preview_cache(self.path)
+        self.assertFalse(os.path.exists(own))
+        self.assertTrue(os.path.exists(other))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import joblib
+from sklearn.preprocessing import LabelEncoder
+
+from config import Config
+from training import TrainingCache
+
+CSV_HEADER = "Elemento,Modos_de_falla,Seguridad,Severidad\n"
+
+
+class TrainingCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.folder = self._tmp.name
+        self.csv_path = os.path.join(self.folder, 'entrenador.csv')
+        self.encoders_path = os.path.join(self.folder, 'encoders.joblib')
+        self.mtime_ns = 1_700_000_000_000_000_000
+        self.write_csv(['Polea,Desgaste,1,3'])
+        self.write_encoders(['Polea'])
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def touch(self, path):
+        # Fechas crecientes explícitas: la prueba no depende de la resolución del reloj
+        self.mtime_ns += 1_000_000_000
+        os.utime(path, ns=(self.mtime_ns, self.mtime_ns))
+
+    def write_csv(self, rows):
+        with open(self.csv_path, 'w', encoding='utf-8') as f:
+            f.write(CSV_HEADER + ''.join(row + '\n' for row in rows))
+        self.touch(self.csv_path)
+
+    def write_encoders(self, clases):
+        joblib.dump({'input': LabelEncoder().fit(clases), 'output': {}}, self.encoders_path)
+        self.touch(self.encoders_path)
+
+    def open_cache(self):
+        return TrainingCache(
+            self.csv_path, self.encoders_path, check_interval=0,
+            store_path=os.path.join(self.folder, 'entrenamiento.store')
+        )
+
+    def each_source(self):
+        """Repetir la prueba leyendo del almacén compilado y del CSV"""
+        for use_store in (True, False):
+            with self.subTest(training_store=use_store), \
+                    mock.patch.dict(Config()._config, {'training_store': use_store}):
+                yield
+
+    def test_reloads_when_training_csv_changes(self):
+        for _ in self.each_source():
+            self.write_csv(['Polea,Desgaste,1,3'])
+            cache = self.open_cache()
+            first = cache.snapshot()
+            self.assertEqual(first.elementos, {'Polea'})
+
+            self.write_csv(['Polea,Desgaste,1,3', 'Motor,Ruido,3,5'])
+            self.assertTrue(cache.check_for_changes(background=False))
+            second = cache.snapshot()
+            self.assertEqual(second.elementos, {'Polea', 'Motor'})
+            self.assertNotEqual(first.version, second.version)
+            # La foto anterior no cambia
+            self.assertEqual(first.elementos, {'Polea'})
+
+    def test_same_content_keeps_snapshot(self):
+        for _ in self.each_source():
+            cache = self.open_cache()
+            first = cache.snapshot()
+            self.touch(self.csv_path)
+            self.assertTrue(cache.check_for_changes(background=False))
+            self.assertIs(cache.snapshot(), first)
+            self.assertFalse(cache.check_for_changes(background=False))
+
+    def test_encoders_change_rebuilds_encoder_view(self):
+        for _ in self.each_source():
+            self.write_csv(['Polea,Desgaste,1,3', 'Motor,Ruido,3,5'])
+            self.write_encoders(['Polea'])
+            cache = self.open_cache()
+            first = cache.snapshot()
+            self.assertEqual(set(first.encoder_view), {'Polea'})
+
+            # Solo cambian los encoders: el contenido del entrenamiento es el mismo
+            self.write_encoders(['Motor', 'Polea'])
+            self.assertTrue(cache.check_for_changes(background=False))
+            second = cache.snapshot()
+            self.assertIsNot(second, first)
+            self.assertEqual(second.encoder_view, {'Motor': 0, 'Polea': 1})
+            self.assertEqual(second.version, first.version)
+
+
+if __name__ == '__main__':
+    unittest.main()
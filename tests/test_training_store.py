@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from training_store import (
+    TrainingStore, TrainingStoreError, build_training_store, compact_training_frame, load_training_store,
+    read_training_csv
+)
+
+CSV_HEADER = "Elemento,Modos_de_falla,Seguridad,Severidad\n"
+
+
+class TrainingStoreTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.folder = self._tmp.name
+        self.store_path = os.path.join(self.folder, 'entrenamiento.store')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write_csv(self, name, rows, header=CSV_HEADER):
+        path = os.path.join(self.folder, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(header + ''.join(row + '\n' for row in rows))
+        return path
+
+    def test_frame_matches_csv(self):
+        path = self.write_csv('entrenador.csv', [
+            'Polea,Desgaste,1,3',
+            'Motor,Sobrecalentamiento,2,4',
+            'Polea,Desalineación,1,2',
+            'Motor,Ruido,3,5',
+        ])
+        build_training_store([path], self.store_path)
+        store = TrainingStore.open(self.store_path)
+        self.assertTrue(store.verify())
+
+        df_store = store.frame()
+        df_csv = compact_training_frame(read_training_csv(path))
+        for elemento, rows in store.groups().items():
+            expected = df_csv[df_csv['Elemento'] == elemento].reset_index(drop=True)
+            pd.testing.assert_frame_equal(df_store.iloc[rows].reset_index(drop=True), expected)
+        self.assertEqual(sorted(store.groups()), ['Motor', 'Polea'])
+
+    def test_single_source_keeps_duplicate_rows(self):
+        path = self.write_csv('entrenador.csv', ['Polea,Desgaste,1,3', 'Polea,Desgaste,1,3'])
+        header = build_training_store([path], self.store_path)
+        self.assertEqual(header['rows'], 2)
+        self.assertEqual(header['duplicates_dropped'], 0)
+
+    def test_merge_drops_rows_repeated_across_sources(self):
+        current = self.write_csv('entrenador.csv', ['Polea,Desgaste,1,3', 'Motor,Ruido,3,5'])
+        legacy = self.write_csv(
+            'anterior.csv',
+            ['Polea,Desgaste ,1,3', 'Chumacera,Vibración,2,2'],
+            # Nombres de columna de una versión anterior, con salto de línea
+            header='Elemento,Modos de falla,"Severidad (SEV)\nSeguridad (1-5)",Severidad (SEV)\n'
+        )
+        header = build_training_store([current, legacy], self.store_path)
+        self.assertEqual(header['rows'], 3)
+        self.assertEqual(header['duplicates_dropped'], 1)
+        df_store = TrainingStore.open(self.store_path).frame()
+        self.assertEqual(sorted(df_store['Elemento']), ['Chumacera', 'Motor', 'Polea'])
+        self.assertEqual(list(df_store.columns), ['Elemento', 'Modos_de_falla', 'Seguridad', 'Severidad'])
+
+    def test_rejects_other_files(self):
+        path = self.write_csv('entrenador.csv', ['Polea,Desgaste,1,3'])
+        with self.assertRaises(TrainingStoreError):
+            TrainingStore.open(path)
+
+    def test_rejects_truncated_or_corrupted_store(self):
+        path = self.write_csv('entrenador.csv', ['Polea,Desgaste,1,3', 'Motor,Ruido,3,5'])
+        build_training_store([path], self.store_path)
+        with open(self.store_path, 'rb') as f:
+            content = f.read()
+        corrupted = bytearray(content)
+        corrupted[-9] ^= 0xFF
+        for damaged in (content[:-8], bytes(corrupted)):
+            with open(self.store_path, 'wb') as f:
+                f.write(damaged)
+            with self.assertRaises(TrainingStoreError):
+                TrainingStore.open(self.store_path)
+        # load_training_store recompila un almacén dañado
+        self.assertTrue(load_training_store(self.store_path, path).verify())
+
+    def test_concurrent_builds_leave_a_valid_store(self):
+        path = self.write_csv('entrenador.csv', [f'Elemento{i},Modo{i},1,3' for i in range(500)])
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda _: build_training_store([path], self.store_path), range(8)))
+        self.assertEqual(TrainingStore.open(self.store_path).header['rows'], 500)
+        # Sin archivos temporales sobrantes
+        self.assertEqual(sorted(os.listdir(self.folder)), ['entrenador.csv', 'entrenamiento.store'])
+
+    def test_load_rebuilds_when_source_changes(self):
+        path = self.write_csv('entrenador.csv', ['Polea,Desgaste,1,3'])
+        first = load_training_store(self.store_path, path)
+        self.write_csv('entrenador.csv', ['Polea,Desgaste,1,3', 'Motor,Ruido,3,5'])
+        second = load_training_store(self.store_path, path)
+        self.assertNotEqual(first.checksum, second.checksum)
+        self.assertIn('Motor', second.groups())
+
+
+if __name__ == '__main__':
+    unittest.main()
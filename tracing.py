@@ -0,0 +1,159 @@
+"""Medición por etapas del procesamiento y perfiles opcionales con cProfile
+
+Las etapas se marcan con span('nombre'), que se anida con la etapa en curso
+del mismo hilo. Las etapas hijas con el mismo nombre se acumulan (por ejemplo,
+los bloques de un archivo grande: expand_predictions x12) en lugar de guardar
+una entrada por repetición, así que el árbol no crece con el tamaño del archivo.
+
+    with span('save_predictions', rows=len(df)) as stage:
+        write_table(df, path)
+        stage.add(bytes=os.path.getsize(path))
+
+Con "profile_runs": true en config.json, profile_run() guarda además un perfil
+de cProfile por archivo en logs/profiles/ (se ve con python -m pstats o snakeviz).
+"""
+import cProfile
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from config import Config
+from logger import system_logger
+
+PROFILES_DIR = os.path.join('logs', 'profiles')
+
+_local = threading.local()
+
+
+class Span:
+    """Una etapa: duración total, repeticiones, filas, bytes y etapas hijas por nombre"""
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.count = 0
+        self.rows = 0
+        self.bytes = 0
+        self.children = {}
+
+    def add(self, rows=0, bytes=0):
+        """Sumar filas o bytes procesados a la etapa"""
+        self.rows += rows or 0
+        self.bytes += bytes or 0
+
+    def child(self, name):
+        span = self.children.get(name)
+        if span is None:
+            span = self.children[name] = Span(name)
+        return span
+
+    def to_dict(self):
+        data = {'name': self.name, 'seconds': round(self.seconds, 4), 'count': self.count}
+        if self.rows:
+            data['rows'] = self.rows
+        if self.bytes:
+            data['bytes'] = self.bytes
+        if self.children:
+            data['children'] = [child.to_dict() for child in self.children.values()]
+        return data
+
+
+def current_span():
+    return getattr(_local, 'span', None)
+
+
+@contextmanager
+def span(name, rows=0, bytes=0):
+    """Medir una etapa anidada en la etapa en curso de este hilo (o como raíz)"""
+    parent = current_span()
+    stage = parent.child(name) if parent is not None else Span(name)
+    stage.add(rows, bytes)
+    _local.span = stage
+    start = time.perf_counter()
+    try:
+        yield stage
+    finally:
+        stage.seconds += time.perf_counter() - start
+        stage.count += 1
+        _local.span = parent
+
+
+def traced_iter(iterable, name):
+    """Recorrer un iterable midiendo cada paso como la etapa name (filas = len del elemento)"""
+    iterator = iter(iterable)
+    while True:
+        with span(name) as stage:
+            item = next(iterator, None)
+            if item is not None:
+                stage.add(rows=len(item))
+        if item is None:
+            return
+        yield item
+
+
+def flatten(trace, prefix=''):
+    """Árbol de to_dict() como {'process_file/save_predictions': segundos}"""
+    path = f"{prefix}/{trace['name']}" if prefix else trace['name']
+    stages = {path: trace['seconds']}
+    for child in trace.get('children', []):
+        stages.update(flatten(child, path))
+    return stages
+
+
+def format_trace(trace, indent=0):
+    """Árbol de etapas en texto, una línea por etapa"""
+    details = [f"{trace['seconds'] * 1000:.1f} ms"]
+    if trace['count'] > 1:
+        details.append(f"x{trace['count']}")
+    if trace.get('rows'):
+        details.append(f"{trace['rows']} rows")
+    if trace.get('bytes'):
+        details.append(f"{trace['bytes'] / 1024:.1f} KB")
+    lines = [f"{'  ' * indent}{trace['name']}: {', '.join(details)}"]
+    for child in trace.get('children', []):
+        lines.append(format_trace(child, indent + 1))
+    return '\n'.join(lines)
+
+
+def _prune_profiles(keep):
+    profiles = sorted(
+        (entry for entry in os.scandir(PROFILES_DIR) if entry.name.endswith('.prof')),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in profiles[:-keep] if keep else []:
+        os.remove(entry.path)
+
+
+@contextmanager
+def profile_run(name):
+    """Guardar un perfil de cProfile de lo ejecutado dentro del bloque, si profile_runs está activo
+
+    Solo se perfila el hilo que llama; si ya hay otro perfil activo en el
+    proceso se omite. Se conservan los últimos profile_keep perfiles.
+    """
+    config = Config()
+    if not config.get('profile_runs'):
+        yield None
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Otro perfilador activo en este proceso (por ejemplo, otro archivo en paralelo)
+        yield None
+        return
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        try:
+            os.makedirs(PROFILES_DIR, exist_ok=True)
+            slug = re.sub(r'[^0-9A-Za-z._-]+', '_', name)
+            path = os.path.join(PROFILES_DIR, f"{datetime.now():%Y%m%d_%H%M%S_%f}_{os.getpid()}_{slug}.prof")
+            profiler.dump_stats(path)
+            _prune_profiles(config.get('profile_keep'))
+            system_logger.logger.info(f"Profile saved to: {path}")
+        except Exception as e:
+            system_logger.log_error(e, f"Error saving profile for: {name}")
@@ -0,0 +1,280 @@
+import hashlib
+import io
+import os
+import threading
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from config import Config
+from logger import system_logger
+from matching import ElementoMatcher
+from training_store import TRAINING_FILE, TRAINING_STORE, compact_training_frame, load_training_store, read_training_csv
+
+ENCODERS_FILE = 'modelos/encoders.joblib'
+
+
+class TrainingIndex:
+    """Índice en memoria de los datos de entrenamiento agrupados por Elemento
+
+    Una instancia es una foto inmutable de los datos: la caché la reemplaza
+    completa cuando el archivo cambia, nunca la modifica.
+    """
+
+    def __init__(self, df_train, encoders=None, version=None, groups=None):
+        if groups is None:
+            self.data = compact_training_frame(df_train.dropna(subset=['Elemento']).reset_index(drop=True))
+            groups = self.data.groupby('Elemento', sort=False, observed=True).indices
+        else:
+            # Datos del almacén compilado: ya compactos y con el rango de filas de cada Elemento
+            self.data = df_train
+        self.columns = list(self.data.columns)
+        # Mapa Elemento -> posiciones de sus filas en data
+        self.groups = groups
+        self.elementos = set(groups)
+        self.version = version
+        self.encoder_view = self._build_encoder_view(encoders)
+        config = Config()
+        self.matcher = ElementoMatcher(
+            self.elementos,
+            mode=config.get('elemento_matching'),
+            threshold=config.get('elemento_match_threshold')
+        )
+        # Resoluciones ya calculadas: elemento de entrada -> elemento del entrenamiento o None
+        self._resolved = {}
+
+    def _build_encoder_view(self, encoders):
+        """Codificar de una vez los elementos del entrenamiento que conoce el encoder"""
+        if not encoders:
+            return {}
+        encoder = encoders['input']
+        clases = set(encoder.classes_)
+        conocidos = [elemento for elemento in self.elementos if elemento in clases]
+        if not conocidos:
+            return {}
+        return dict(zip(conocidos, encoder.transform(conocidos)))
+
+    def get_combinations(self, elemento):
+        """Obtener las combinaciones de un elemento sin recorrer el entrenamiento"""
+        positions = self.groups.get(elemento)
+        if positions is None:
+            return []
+        return self.data.iloc[positions].to_dict('records')
+
+    def resolve(self, elementos):
+        """Elemento del entrenamiento de cada valor distinto de elementos (None si no hay)
+
+        Según elemento_matching, un elemento escrito con otras mayúsculas, acentos
+        o espacios, o uno parecido, se resuelve al del entrenamiento; cada valor
+        se busca una sola vez por foto y las resoluciones no exactas quedan en el log.
+        """
+        resolved = {}
+        for elemento in pd.unique(pd.Series(elementos, dtype=object)):
+            if elemento not in self._resolved:
+                match = self.matcher.resolve(elemento)
+                if match is not None and match != elemento:
+                    system_logger.logger.info(f"Elemento '{elemento}' resolved to training elemento '{match}'")
+                self._resolved[elemento] = match
+            resolved[elemento] = self._resolved[elemento]
+        return resolved
+
+    def missing(self, elementos):
+        """Elementos sin correspondencia en el entrenamiento"""
+        return {elemento for elemento, match in self.resolve(elementos).items() if match is None}
+
+    def suggestions(self, elementos):
+        """Elementos del entrenamiento parecidos a cada faltante (solo los que tienen alguno)"""
+        suggestions = {elemento: self.matcher.suggest(elemento) for elemento in elementos if isinstance(elemento, str)}
+        return {elemento: matches for elemento, matches in suggestions.items() if matches}
+
+    def expand(self, elementos):
+        """Expandir una serie de elementos con todas sus combinaciones de entrenamiento
+
+        Los elementos sin combinaciones conservan una fila con el resto de campos vacíos
+        y se respeta el orden original de las filas de entrada. Las columnas de
+        texto del entrenamiento llegan como categorías hasta que se escriben. Los
+        elementos resueltos por similitud se expanden con las combinaciones del
+        elemento del entrenamiento pero conservan el texto de la entrada.
+        """
+        originales = pd.Series(elementos, dtype=object).to_numpy()
+        resolved = self.resolve(originales)
+        renamed = {elemento: match for elemento, match in resolved.items() if match is not None and match != elemento}
+        if not renamed:
+            df_elementos = pd.DataFrame({'Elemento': originales})
+            return df_elementos.merge(self.data, on='Elemento', how='left', sort=False)
+        claves = pd.Series(originales).replace(renamed).to_numpy()
+        df_elementos = pd.DataFrame({'Elemento': claves, '_fila': np.arange(len(originales))})
+        df_expanded = df_elementos.merge(self.data, on='Elemento', how='left', sort=False)
+        df_expanded['Elemento'] = originales[df_expanded.pop('_fila').to_numpy()]
+        return df_expanded
+
+
+class TrainingCache:
+    """Caché del índice de entrenamiento invalidada por cambios en el archivo
+
+    La clave es (mtime, tamaño) del CSV, del almacén compilado y de los
+    encoders, y el hash del contenido del entrenamiento. Cuando cambian
+    (también si solo cambian los encoders, de los que sale encoder_view), el
+    índice se reconstruye en segundo plano y se intercambia de forma atómica;
+    quien ya obtuvo una foto con snapshot() la conserva. El índice se abre desde el almacén binario (training_store.py),
+    que se recompila solo si el CSV cambió; con training_store desactivado en
+    config.json, o si el almacén falla, se lee el CSV directamente.
+    """
+
+    def __init__(self, path=TRAINING_FILE, encoders_path=ENCODERS_FILE, check_interval=1.0, store_path=TRAINING_STORE):
+        self.path = path
+        self.store_path = store_path
+        self.encoders_path = encoders_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._snapshot = None
+        self._stat_key = None
+        # (hash del contenido, clave de los encoders) de la foto vigente
+        self._content_key = None
+        self._failed_key = None
+        self._last_check = 0.0
+        self._reload_thread = None
+        self._watcher = None
+        self._stop_watcher = threading.Event()
+
+    @staticmethod
+    def _stat(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _file_key(self):
+        """(mtime, tamaño) del CSV, del almacén y de los encoders (None si no existen)"""
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size), self._stat(self.store_path), self._stat(self.encoders_path)
+
+    def _load_encoders(self):
+        if not os.path.exists(self.encoders_path):
+            system_logger.logger.warning(f"Encoders not found, encoder view disabled: {self.encoders_path}")
+            return None
+        return joblib.load(self.encoders_path)
+
+    def _build(self):
+        """Abrir el almacén compilado, o el CSV si el almacén está desactivado o falla"""
+        if Config().get('training_store'):
+            try:
+                store = load_training_store(self.store_path, self.path)
+                stat_key = self._file_key()
+                content_key = (store.checksum, stat_key[2])
+                if content_key == self._content_key:
+                    return stat_key, content_key, None
+                index = TrainingIndex(
+                    store.frame(),
+                    encoders=self._load_encoders(),
+                    version=store.checksum,
+                    groups=store.groups()
+                )
+                return stat_key, content_key, index
+            except Exception as e:
+                system_logger.log_error(e, f"Error opening training store, reading {self.path} instead")
+        return self._build_from_csv()
+
+    def _build_from_csv(self):
+        """Leer el archivo una sola vez y construir el índice a partir de esos bytes"""
+        stat_key = self._file_key()
+        with open(self.path, 'rb') as f:
+            content = f.read()
+        content_hash = hashlib.sha256(content).hexdigest()
+        content_key = (content_hash, stat_key[2])
+        if content_key == self._content_key:
+            return stat_key, content_key, None
+        index = TrainingIndex(
+            read_training_csv(io.BytesIO(content)),
+            encoders=self._load_encoders(),
+            version=content_hash
+        )
+        return stat_key, content_key, index
+
+    def _reload(self):
+        try:
+            stat_key, content_key, index = self._build()
+            with self._lock:
+                self._stat_key = stat_key
+                self._failed_key = None
+                if index is not None:
+                    self._content_key = content_key
+                    self._snapshot = index
+            if index is not None:
+                system_logger.logger.info(
+                    f"Training index built with {len(index.elementos)} elementos from {self.path} ({index.version[:12]})"
+                )
+        except Exception as e:
+            # Conservar la foto anterior; se reintenta cuando el archivo vuelva a cambiar
+            with self._lock:
+                self._failed_key = self._stat_key_or_none()
+            system_logger.log_error(e, f"Error loading training data: {self.path}")
+            if self._snapshot is None:
+                raise
+
+    def _stat_key_or_none(self):
+        try:
+            return self._file_key()
+        except OSError:
+            return None
+
+    def check_for_changes(self, background=True):
+        """Revisar si el archivo cambió y, de ser así, reconstruir el índice"""
+        self._last_check = time.monotonic()
+        stat_key = self._stat_key_or_none()
+        if stat_key is None or stat_key == self._stat_key or stat_key == self._failed_key:
+            return False
+        if not background:
+            self._reload()
+            return True
+        with self._lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return False
+            self._reload_thread = threading.Thread(target=self._reload, daemon=True)
+            self._reload_thread.start()
+        return True
+
+    def snapshot(self):
+        """Obtener la foto vigente del índice
+
+        La primera llamada carga el índice de forma síncrona; las siguientes
+        devuelven la foto actual mientras una recarga ocurre en segundo plano.
+        """
+        if self._snapshot is None:
+            with self._load_lock:
+                if self._snapshot is None:
+                    self._reload()
+        elif time.monotonic() - self._last_check >= self.check_interval:
+            self.check_for_changes()
+        return self._snapshot
+
+    def reload(self):
+        """Forzar la recarga síncrona del índice"""
+        self._reload()
+        return self._snapshot
+
+    def start_watcher(self, interval=2.0):
+        """Vigilar el archivo en un hilo para aplicar los cambios sin reiniciar"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+
+        def watch():
+            while not self._stop_watcher.wait(interval):
+                self.check_for_changes()
+
+        self._stop_watcher.clear()
+        self._watcher = threading.Thread(target=watch, daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop_watcher.set()
+
+
+training_cache = TrainingCache()
+
+
+def get_training_index():
+    """Obtener la foto vigente del índice de entrenamiento"""
+    return training_cache.snapshot()
@@ -0,0 +1,347 @@
+"""Almacén binario precompilado de los datos de entrenamiento
+
+Uso:
+    python training_store.py build                  # desde entrenador/entrenador001.csv
+    python training_store.py build entrenador/entrenador001.csv entrenador/bk/*.csv
+    python training_store.py info
+    python training_store.py verify
+
+El almacén guarda el entrenamiento ya compacto: cada columna de texto como un
+diccionario de valores distintos más un arreglo de códigos, las numéricas como
+arreglos numpy, las filas agrupadas por Elemento con el rango de filas de cada
+uno y una suma sha256 del contenido. Abrirlo es leer el archivo y envolver esos
+arreglos sin interpretar texto, en lugar de analizar el CSV en cada arranque.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+from logger import system_logger
+
+TRAINING_FILE = 'entrenador/entrenador001.csv'
+TRAINING_STORE = 'entrenador/entrenamiento.store'
+
+MAGIC = b'IA4TRAIN'
+FORMAT_VERSION = 1
+_PRELUDE = struct.Struct('<8sII')  # firma, versión del formato, tamaño del encabezado JSON
+_ALIGN = 8
+
+# Nombres de columna de versiones anteriores del entrenamiento (entrenador/bk/)
+COLUMN_ALIASES = {
+    'Modos de falla': 'Modos_de_falla',
+    'Causa de la falla': 'Causa_de_la_falla',
+    'Severidad (SEV) Seguridad (1-5)': 'Seguridad',
+    'Severidad (SEV) Ambiente (1-5)': 'Ambiente',
+    'Severidad (SEV) Operación (1-5)': 'Operación',
+    'Detección (1-5)': 'Detección',
+    'Severidad (SEV)': 'Severidad',
+    'Tiempo de la estrategia (min/hr)': 'Tiempo',
+    'Puesto de trabajo': 'Puesto_de_trabajo',
+    'Tipo de Mantenimiento': 'Tipo_de_Mantenimiento'
+}
+
+
+class TrainingStoreError(ValueError):
+    """El archivo no es un almacén válido o su formato es de otra versión"""
+
+
+def compact_training_frame(df_train):
+    """Representación compacta del entrenamiento
+
+    Se quitan las columnas sin nombre que no tienen ningún valor (las comas
+    sobrantes al final de cada fila del CSV) y las columnas de texto pasan a
+    categorías: los mismos pocos textos se repiten en cientos de filas y, al
+    expandir, cada fila de salida guarda un código en lugar de una referencia.
+    Las columnas numéricas no cambian para que la salida se escriba igual.
+    """
+    empty_unnamed = [
+        column for column in df_train.columns
+        if str(column).startswith('Unnamed:') and df_train[column].isna().all()
+    ]
+    df_train = df_train.drop(columns=empty_unnamed)
+    text_columns = [
+        column for column in df_train.columns
+        if pd.api.types.is_object_dtype(df_train[column]) or pd.api.types.is_string_dtype(df_train[column])
+    ]
+    return df_train.astype({column: 'category' for column in text_columns})
+
+
+def canonical_column(column):
+    """Nombre actual de una columna, aceptando los nombres anteriores con saltos de línea"""
+    collapsed = re.sub(r'\s+', ' ', str(column)).strip()
+    return COLUMN_ALIASES.get(collapsed, column)
+
+
+def read_training_csv(path):
+    """Leer un CSV de entrenamiento con los nombres de columna actuales"""
+    df_train = pd.read_csv(path)
+    return df_train.rename(columns=canonical_column)
+
+
+def _source_info(path, rows):
+    with open(path, 'rb') as f:
+        content_hash = hashlib.sha256(f.read()).hexdigest()
+    stat = os.stat(path)
+    return {'path': path, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': content_hash, 'rows': rows}
+
+
+def merge_training_sources(paths):
+    """Unir uno o más CSV de entrenamiento
+
+    Con una sola fuente se conservan todas sus filas, igual que al leer el CSV
+    directamente (training_store desactivado): el almacén no cambia la salida.
+    Con varias, las columnas se alinean por nombre (con los alias de versiones
+    anteriores) y se descartan las filas repetidas entre ellas: dos filas son
+    la misma si coinciden todos sus valores, sin contar los espacios en los
+    extremos de los textos; se conserva la primera aparición, así que el orden
+    de paths decide qué versión del texto queda.
+    Devuelve (DataFrame, información de cada fuente, filas descartadas).
+    """
+    frames = []
+    sources = []
+    for path in paths:
+        df_source = read_training_csv(path).dropna(subset=['Elemento'])
+        frames.append(df_source)
+        sources.append(_source_info(path, len(df_source)))
+    df_train = compact_training_frame(pd.concat(frames, ignore_index=True))
+    if len(frames) == 1:
+        return df_train, sources, 0
+    keys = df_train.astype(object).apply(lambda column: column.map(lambda value: value.strip() if isinstance(value, str) else value))
+    duplicated = keys.duplicated(keep='first').to_numpy()
+    if duplicated.any():
+        df_train = df_train[~duplicated]
+    return df_train.reset_index(drop=True), sources, int(duplicated.sum())
+
+
+def _group_by_elemento(df_train):
+    """Ordenar las filas agrupando cada Elemento (en orden de primera aparición)
+
+    El orden relativo de las filas de un mismo elemento no cambia, de modo que
+    la expansión da las combinaciones en el mismo orden que el CSV.
+    """
+    codes, uniques = pd.factorize(df_train['Elemento'])
+    order = np.argsort(codes, kind='stable')
+    df_train = df_train.iloc[order].reset_index(drop=True)
+    stops = np.cumsum(np.bincount(codes, minlength=len(uniques)))
+    starts = stops - np.bincount(codes, minlength=len(uniques))
+    offsets = {str(elemento): [int(start), int(stop)] for elemento, start, stop in zip(uniques, starts, stops)}
+    return df_train, offsets
+
+
+def _aligned(length):
+    return -length % _ALIGN
+
+
+def build_training_store(sources=(TRAINING_FILE,), target=TRAINING_STORE):
+    """Compilar uno o más CSV de entrenamiento en el almacén binario"""
+    try:
+        sources = list(sources)
+        df_train, source_info, duplicates = merge_training_sources(sources)
+        df_train, offsets = _group_by_elemento(df_train)
+
+        columns = []
+        chunks = []
+        position = 0
+        for column in df_train.columns:
+            series = df_train[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                array = series.cat.codes.to_numpy()
+                entry = {'name': column, 'kind': 'category', 'categories': [str(value) for value in series.cat.categories]}
+            elif pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+                array = series.to_numpy()
+                entry = {'name': column, 'kind': 'numeric'}
+            else:
+                raise TypeError(f"Tipo de columna no soportado en el almacén: {column} ({series.dtype})")
+            data = np.ascontiguousarray(array).tobytes()
+            entry.update(dtype=array.dtype.str, offset=position, length=len(data))
+            columns.append(entry)
+            chunks.append(data + b'\0' * _aligned(len(data)))
+            position += len(chunks[-1])
+        data = b''.join(chunks)
+
+        header = {
+            'format_version': FORMAT_VERSION,
+            'checksum': hashlib.sha256(data).hexdigest(),
+            'rows': len(df_train),
+            'duplicates_dropped': duplicates,
+            'sources': source_info,
+            'columns': columns,
+            'elementos': offsets
+        }
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        prelude = _PRELUDE.pack(MAGIC, FORMAT_VERSION, len(header_bytes))
+        padding = b'\0' * _aligned(len(prelude) + len(header_bytes))
+
+        # Archivo temporal propio: varios procesos pueden recompilar a la vez
+        # (por ejemplo, los de un pool al arrancar) y el último reemplazo gana
+        folder = os.path.dirname(target) or '.'
+        os.makedirs(folder, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=folder, prefix=os.path.basename(target) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(prelude + header_bytes + padding + data)
+            os.replace(temp_path, target)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        system_logger.logger.info(
+            f"Training store built with {len(df_train)} rows and {len(offsets)} elementos from "
+            f"{len(sources)} sources ({duplicates} duplicate rows dropped) in {target}"
+        )
+        return header
+    except Exception as e:
+        system_logger.log_error(e, f"Error building training store from: {sources}")
+        raise
+
+
+class TrainingStore:
+    """Almacén abierto: encabezado y arreglos sobre los bytes del archivo
+
+    El archivo se lee completo de una vez (no se mapea en memoria para poder
+    reemplazarlo en Windows mientras una foto anterior sigue en uso) y los
+    arreglos apuntan a esos bytes sin copiarlos. Al abrirlo se comprueban el
+    largo de los datos y su suma sha256: un archivo truncado o dañado se
+    rechaza con TrainingStoreError en lugar de leerse.
+    """
+
+    def __init__(self, path, header, buffer, data_start):
+        self.path = path
+        self.header = header
+        self._buffer = buffer
+        self._data_start = data_start
+
+    @classmethod
+    def open(cls, path=TRAINING_STORE, verify=True):
+        with open(path, 'rb') as f:
+            buffer = f.read()
+        if len(buffer) < _PRELUDE.size:
+            raise TrainingStoreError(f"Almacén de entrenamiento incompleto: {path}")
+        magic, version, header_length = _PRELUDE.unpack_from(buffer)
+        if magic != MAGIC:
+            raise TrainingStoreError(f"No es un almacén de entrenamiento: {path}")
+        if version != FORMAT_VERSION:
+            raise TrainingStoreError(f"Versión de almacén {version} no soportada (se esperaba {FORMAT_VERSION}): {path}")
+        header_end = _PRELUDE.size + header_length
+        if len(buffer) < header_end:
+            raise TrainingStoreError(f"Almacén de entrenamiento incompleto: {path}")
+        try:
+            header = json.loads(buffer[_PRELUDE.size:header_end].decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise TrainingStoreError(f"Encabezado dañado en el almacén de entrenamiento: {path}") from e
+        store = cls(path, header, buffer, header_end + _aligned(header_end))
+        if verify:
+            expected = sum(entry['length'] + _aligned(entry['length']) for entry in header['columns'])
+            if len(buffer) - store._data_start != expected:
+                raise TrainingStoreError(f"Almacén de entrenamiento incompleto: {path}")
+            if not store.verify():
+                raise TrainingStoreError(f"La suma sha256 del almacén de entrenamiento no coincide: {path}")
+        return store
+
+    @property
+    def checksum(self):
+        return self.header['checksum']
+
+    @property
+    def sources(self):
+        return self.header['sources']
+
+    def is_fresh(self):
+        """True si ninguna fuente cambió (fecha y tamaño) desde que se compiló"""
+        for source in self.sources:
+            try:
+                stat = os.stat(source['path'])
+            except OSError:
+                return False
+            if (stat.st_mtime_ns, stat.st_size) != (source['mtime_ns'], source['size']):
+                return False
+        return True
+
+    def verify(self):
+        """Comparar la suma sha256 del contenido con la del encabezado"""
+        data = memoryview(self._buffer)[self._data_start:]
+        return hashlib.sha256(data).hexdigest() == self.checksum
+
+    def _array(self, entry):
+        dtype = np.dtype(entry['dtype'])
+        return np.frombuffer(
+            self._buffer, dtype=dtype, count=entry['length'] // dtype.itemsize,
+            offset=self._data_start + entry['offset']
+        )
+
+    def frame(self):
+        """DataFrame del entrenamiento (texto como categorías, sin copiar los arreglos)"""
+        data = {}
+        for entry in self.header['columns']:
+            array = self._array(entry)
+            if entry['kind'] == 'category':
+                data[entry['name']] = pd.Categorical.from_codes(array, entry['categories'])
+            else:
+                data[entry['name']] = array
+        return pd.DataFrame(data, copy=False)
+
+    def groups(self):
+        """Elemento -> rango de sus filas en frame()"""
+        return {elemento: slice(start, stop) for elemento, (start, stop) in self.header['elementos'].items()}
+
+
+def load_training_store(target=TRAINING_STORE, default_source=TRAINING_FILE):
+    """Abrir el almacén, compilándolo antes si no existe o si alguna fuente cambió
+
+    Al recompilar se usan las mismas fuentes que tenía (las que sigan
+    existiendo), así que una unión de varios CSV se conserva.
+    """
+    sources = [default_source]
+    if os.path.exists(target):
+        try:
+            store = TrainingStore.open(target)
+            if store.is_fresh():
+                return store
+            sources = [source['path'] for source in store.sources if os.path.exists(source['path'])] or sources
+            system_logger.logger.info(f"Training sources changed, rebuilding training store: {target}")
+        except (TrainingStoreError, ValueError, KeyError) as e:
+            system_logger.log_error(e, f"Invalid training store, rebuilding: {target}")
+    build_training_store(sources, target)
+    return TrainingStore.open(target)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compilar y revisar el almacén binario de entrenamiento")
+    parser.add_argument('command', choices=('build', 'info', 'verify'))
+    parser.add_argument('sources', nargs='*', help="CSV de entrenamiento a unir, en orden de prioridad (build)")
+    parser.add_argument('-o', '--store', default=TRAINING_STORE, help=f"Ruta del almacén (predeterminado: {TRAINING_STORE})")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        sources = []
+        for pattern in args.sources or [TRAINING_FILE]:
+            matches = sorted(glob.glob(pattern)) or [pattern]
+            sources.extend(matches)
+        header = build_training_store(list(dict.fromkeys(sources)), args.store)
+        print(f"{header['rows']} filas, {len(header['elementos'])} elementos, "
+              f"{header['duplicates_dropped']} filas repetidas descartadas -> {args.store}")
+        return 0
+
+    store = TrainingStore.open(args.store, verify=False)
+    if args.command == 'verify':
+        ok = store.verify()
+        print(f"{args.store}: {'correcto' if ok else 'la suma sha256 no coincide'}")
+        return 0 if ok else 1
+    print(f"Almacén:   {args.store} (formato {store.header['format_version']})")
+    print(f"Suma:      {store.checksum}")
+    print(f"Filas:     {store.header['rows']} ({len(store.header['elementos'])} elementos)")
+    print(f"Vigente:   {'sí' if store.is_fresh() else 'no, alguna fuente cambió'}")
+    for source in store.sources:
+        print(f"Fuente:    {source['path']} ({source['rows']} filas, {source['sha256'][:12]})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
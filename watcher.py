@@ -0,0 +1,206 @@
+import os
+import queue
+import threading
+import time
+from batch import BatchEngine
+from config import Config
+from logger import system_logger
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog es opcional: sin él se revisa la carpeta periódicamente
+    Observer = None
+    FileSystemEventHandler = object
+
+INPUT_EXTENSIONS = ('.csv', '.xlsx')
+
+
+def _is_input_file(path):
+    filename = os.path.basename(path)
+    # Archivos temporales de Excel (~$archivo.xlsx) y copias a medias
+    return filename.endswith(INPUT_EXTENSIONS) and not filename.startswith(('~$', '.'))
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    """Traduce los eventos de watchdog (inotify en Linux) en avisos al watcher"""
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        for path in (getattr(event, 'dest_path', None), event.src_path):
+            if path and _is_input_file(path):
+                self.watcher.notify(path)
+
+
+class FolderWatcher:
+    """Servicio que procesa automáticamente los archivos que llegan a una carpeta
+
+    Detecta los archivos nuevos con watchdog (inotify) o, si no está instalado,
+    revisando la carpeta cada poll_interval segundos. Un archivo se encola
+    cuando su tamaño y fecha no cambian durante debounce segundos (la copia
+    terminó) y los archivos en cola se procesan por lotes con BatchEngine, que
+    limita la concurrencia a max_workers y los mueve a backup/ al terminar.
+    """
+
+    def __init__(self, folder='entrada', debounce=None, poll_interval=1.0, engine=None, use_watchdog=True):
+        self.folder = folder
+        self.debounce = Config().get('watch_debounce_seconds') if debounce is None else debounce
+        self.poll_interval = poll_interval
+        self.engine = engine or BatchEngine()
+        self.use_watchdog = use_watchdog and Observer is not None
+        self.processed = 0
+        # ruta -> (firma (mtime, tamaño), último cambio observado, primera vez visto)
+        self._pending = {}
+        # Archivos en cola o en proceso, y firmas de los ya tratados que siguen en
+        # la carpeta (fallidos o sin mover a backup): no se repiten hasta que cambien
+        self._queued = set()
+        self._handled = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+        self._observer = None
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def notify(self, path):
+        """Marcar un archivo como posiblemente nuevo o modificado"""
+        path = os.path.normpath(path)
+        with self._lock:
+            if path in self._queued:
+                return
+            entry = self._pending.get(path)
+            first_seen = entry[2] if entry else time.time()
+            self._pending[path] = (None, time.time(), first_seen)
+        self._wakeup.set()
+
+    def _scan(self):
+        """Revisar la carpeta completa (arranque y modo sin watchdog)"""
+        try:
+            entries = list(os.scandir(self.folder))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.is_file() and _is_input_file(entry.path):
+                path = os.path.normpath(entry.path)
+                with self._lock:
+                    known = path in self._pending or path in self._queued
+                if not known:
+                    self.notify(path)
+
+    def _check_pending(self):
+        """Encolar los archivos cuyo tamaño y fecha no cambiaron durante debounce segundos"""
+        now = time.time()
+        with self._lock:
+            pending = list(self._pending.items())
+        for path, (signature, changed_at, first_seen) in pending:
+            try:
+                current = self._signature(path)
+            except OSError:
+                # El archivo desapareció (movido o borrado) antes de terminar de copiarse
+                with self._lock:
+                    self._pending.pop(path, None)
+                continue
+            with self._lock:
+                if current != signature:
+                    self._pending[path] = (current, now, first_seen)
+                elif now - changed_at >= self.debounce:
+                    del self._pending[path]
+                    if self._handled.get(path) == current:
+                        continue
+                    self._handled.pop(path, None)
+                    self._queued.add(path)
+                    self._queue.put((path, current, first_seen))
+
+    def _monitor(self):
+        self._scan()
+        while not self._stopped.is_set():
+            if not self.use_watchdog:
+                self._scan()
+            self._check_pending()
+            with self._lock:
+                waiting = bool(self._pending)
+            # Con archivos en espera se revisan a menudo para cumplir el debounce
+            self._wakeup.wait(min(self.poll_interval, self.debounce / 2 or 0.1) if waiting else self.poll_interval)
+            self._wakeup.clear()
+
+    def _dispatch(self):
+        while not self._stopped.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            # Tomar todo lo que ya esté en cola para procesarlo en un mismo lote
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch):
+        paths = [path for path, _, _ in batch]
+        try:
+            results = self.engine.process(paths)
+        except Exception as e:
+            system_logger.log_error(e, f"Error processing watched files: {paths}")
+            results = [{'status': 'error'} for _ in paths]
+        finished = time.time()
+        with self._lock:
+            for (path, signature, first_seen), result in zip(batch, results):
+                self._queued.discard(path)
+                if result['status'] == 'ok':
+                    self.processed += 1
+                    system_logger.logger.info(
+                        f"Watched file {os.path.basename(path)} processed {finished - first_seen:.2f} seconds after arrival"
+                    )
+                if os.path.exists(path):
+                    self._handled[path] = signature
+
+    def start(self):
+        if self._threads:
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        self._stopped.clear()
+        if self.use_watchdog:
+            self._observer = Observer()
+            self._observer.schedule(_ChangeHandler(self), self.folder, recursive=False)
+            self._observer.start()
+        for target, name in ((self._monitor, 'watcher-monitor'), (self._dispatch, 'watcher-dispatch')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        mode = 'watchdog' if self.use_watchdog else f"polling every {self.poll_interval}s"
+        system_logger.logger.info(f"Watching {self.folder} for new files ({mode}, debounce {self.debounce}s)")
+
+    def stop(self):
+        """Detener el servicio; el lote en curso termina antes de volver"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.engine.shutdown()
+
+    def run_forever(self):
+        """Ejecutar el servicio hasta Ctrl+C"""
+        self.start()
+        try:
+            while not self._stopped.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()